@@ -1,7 +1,8 @@
-from datetime import datetime
-from typing import Dict, List
+from typing import Dict, List, Optional
 import random
 
+from clock import clock
+
 class AIPredictor:
     """AI-powered predictions and recommendations for smart home automation"""
     
@@ -9,10 +10,10 @@ class AIPredictor:
         self.usage_patterns = {}
         self.learning_data = []
     
-    def analyze_pattern(self, device_logs: List[Dict]) -> Dict:
-        """Analyze usage patterns and provide AI-driven recommendations"""
-        current_hour = datetime.now().hour
-        current_day = datetime.now().strftime('%A')
+    def analyze_pattern(self, device_logs: List[Dict], optimization: Optional[Dict] = None) -> Dict:
+        """Analyze usage patterns and provide AI-driven recommendations; `optimization` is the latest optimizer result"""
+        current_hour = clock.now().hour
+        current_day = clock.now().strftime('%A')
         
         # Simulated AI pattern analysis based on time and usage
         predictions = {
@@ -36,13 +37,22 @@ class AIPredictor:
             },
             "summary": {
                 "day": current_day,
-                "time": datetime.now().strftime('%I:%M %p'),
+                "time": clock.now().strftime('%I:%M %p'),
                 "overall_efficiency": f"{random.randint(70, 95)}%",
                 "devices_active": random.randint(1, 3)
             }
         }
         
+        if optimization and optimization['scheduled']:
+            predictions["energy"]["optimization"] = self._describe_optimization(optimization)
         return predictions
+
+    def _describe_optimization(self, optimization: Dict) -> str:
+        """Summarize an optimizer result as advice"""
+        runs = ", ".join(f"{entry['device']} {entry['start']}-{entry['end']}"
+                         for entry in optimization['schedule'] if entry['scheduled'])
+        saving = optimization['cost_at_window_start'] - optimization['cost']
+        return f"Run {runs} to save {optimization['currency']}{saving:.2f} per day."
     
     def _predict_fan(self, hour: int) -> str:
         """Predict fan usage based on time patterns"""
@@ -171,8 +181,12 @@ class AIPredictor:
         ]
         return tips
     
-    def get_device_insights(self, device: str) -> Dict:
-        """Get detailed insights for a specific device"""
+    def get_device_insights(self, device: str, usage: Optional[Dict] = None, rate: Optional[float] = None) -> Dict:
+        """
+        Get detailed insights for a specific device. `usage` (from the energy meter)
+        replaces the estimated figures; `rate` is the household's effective tariff
+        rate per kWh, used for the monthly cost when known.
+        """
         insights = {
             "fan": {
                 "avg_daily_usage": "6.5 hours",
@@ -191,14 +205,38 @@ class AIPredictor:
                 "recommendation": "Use motion sensors to auto-OFF when room is empty"
             }
         }
-        return insights.get(device, {})
+        if usage is None:
+            return insights.get(device, {})
+
+        monthly_cost = usage['kwh_per_day'] * 30 * rate if rate else usage['cost_per_day'] * 30
+        result = dict(insights.get(device, {}))
+        result.update({
+            "avg_daily_usage": f"{usage['on_hours_per_day']} hours",
+            "energy_consumption": f"{usage['kwh_per_day']} kWh/day",
+            "cost_per_month": f"{usage['currency']}{round(monthly_cost)}",
+            "total_energy": f"{usage['energy_kwh']} kWh",
+            "total_cost": f"{usage['currency']}{usage['cost']}",
+            "current_power": f"{usage['current_watts']} W",
+            "metered_days": usage['days_metered'],
+        })
+        return result
     
-    def get_weekly_summary(self) -> Dict:
-        """Get weekly energy and usage summary"""
+    def get_weekly_summary(self, cost: Optional[Dict] = None) -> Dict:
+        """Get weekly energy and usage summary; `cost` is the tariff cost of the last 7 days"""
+        if cost is not None:
+            energy = {
+                "total_energy_used": f"{cost['energy_kwh']:.1f} kWh",
+                "avg_daily_usage": f"{cost['energy_kwh'] / 7:.1f} kWh",
+                "cost_this_week": f"{cost['currency']}{cost['total']:.0f}",
+            }
+        else:
+            energy = {
+                "total_energy_used": f"{random.uniform(45, 65):.1f} kWh",
+                "avg_daily_usage": f"{random.uniform(6, 9):.1f} kWh",
+                "cost_this_week": f"₹{random.randint(180, 280)}",
+            }
         return {
-            "total_energy_used": f"{random.uniform(45, 65):.1f} kWh",
-            "avg_daily_usage": f"{random.uniform(6, 9):.1f} kWh",
-            "cost_this_week": f"₹{random.randint(180, 280)}",
+            **energy,
             "savings_vs_last_week": f"{random.randint(5, 25)}%",
             "carbon_footprint": f"{random.uniform(15, 25):.1f} kg CO2",
             "solar_contribution": f"{random.randint(35, 55)}%",
@@ -0,0 +1,272 @@
+import os
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Sequence, Union
+
+from metrics import metrics
+from records import MaintenanceAlert, SecurityAlert, SensorReading
+from logging_config import get_logger
+
+log = get_logger("anomaly")
+
+HOURS_PER_WEEK = 7 * 24
+# Per-stream state of a StreamDetector, one row per stream
+_STATE_ARRAYS = ('count', 'mean', 'var', 'level', 'season_count', 'season_mean', 'season_var', 'active', 'last',
+                 'repeats')
+
+
+def hour_of_week(ms: int) -> int:
+    moment = datetime.fromtimestamp(ms / 1000)
+    return moment.weekday() * 24 + moment.hour
+
+
+class StreamDetector:
+    """
+    Anomaly scores for a fixed set of numeric streams, updated together in
+    O(1) per sample. Each stream keeps an EWMA mean/variance overall and per
+    hour of the week (the seasonal baseline, used once that hour has enough
+    samples), so memory is constant however long the history grows.
+
+    A stream is anomalous when its level (the sample, or an EWMA of samples
+    when `smoothing` < 1, which targets slow drift rather than spikes) is more
+    than `threshold` standard deviations and at least `min_delta` away from
+    the baseline. With `stuck_after`, a stream repeating the exact same value
+    that many times is reported as stuck. Both are edge-triggered: a stream is
+    reported once per episode.
+    """
+
+    def __init__(self, size: int, alpha: float = 0.02, season_alpha: float = 0.005, threshold: float = 4.0,
+                 min_delta: float = 0.0, min_samples: int = 30, season_min_samples: int = 60,
+                 smoothing: float = 1.0, stuck_after: Optional[int] = None):
+        import numpy as np  # deferred: detectors are built on the first sample, after startup
+
+        self.size = size
+        self.alpha = alpha
+        self.season_alpha = season_alpha
+        self.threshold = threshold
+        self.min_delta = min_delta
+        self.min_samples = min_samples
+        self.season_min_samples = season_min_samples
+        self.smoothing = smoothing
+        self.stuck_after = stuck_after
+
+        self.count = np.zeros(size, dtype=np.int64)
+        self.mean = np.zeros(size)
+        self.var = np.zeros(size)
+        self.level = np.zeros(size)
+        self.season_count = np.zeros((size, HOURS_PER_WEEK), dtype=np.int32)
+        self.season_mean = np.zeros((size, HOURS_PER_WEEK))
+        self.season_var = np.zeros((size, HOURS_PER_WEEK))
+        self.active = np.zeros(size, dtype=bool)
+        self.last = np.full(size, np.nan)
+        self.repeats = np.zeros(size, dtype=np.int64)
+
+    @property
+    def nbytes(self) -> int:
+        return sum(getattr(self, name).nbytes for name in _STATE_ARRAYS)
+
+    def grow(self, size: int):
+        """Add fresh streams up to `size`, keeping the baselines of the existing ones"""
+        import numpy as np
+
+        if size <= self.size:
+            return
+        for name in _STATE_ARRAYS:
+            state = getattr(self, name)
+            fresh = np.full((size - self.size,) + state.shape[1:], np.nan if name == 'last' else 0, dtype=state.dtype)
+            setattr(self, name, np.concatenate([state, fresh]))
+        self.size = size
+
+    def update(self, values: Sequence[float], bucket: int) -> Dict[str, List[tuple]]:
+        """
+        Score then learn one sample per stream (NaN for no sample). Returns
+        {'anomaly': [(stream, level, expected)], 'stuck': [(stream, value)]}
+        for streams that just entered either condition.
+        """
+        import numpy as np
+
+        x = np.asarray(values, dtype=np.float64)
+        seen = ~np.isnan(x)
+        first = seen & (self.count == 0)
+        self.level = np.where(first, x, np.where(seen, self.level + self.smoothing * (x - self.level), self.level))
+
+        # Score against the baseline as it was before this sample
+        season_mean = self.season_mean[:, bucket]
+        season_var = self.season_var[:, bucket]
+        warm = self.season_count[:, bucket] >= self.season_min_samples
+        expected = np.where(warm, season_mean, self.mean)
+        # The variance EWMA starts from zero; undo that bias while it has few samples
+        var = self.var / np.maximum(1 - (1 - self.alpha) ** np.maximum(self.count - 1, 0), 1e-9)
+        std = np.sqrt(np.where(warm, season_var, var)) + 1e-9
+        deviation = np.abs(self.level - expected)
+        anomalous = seen & (self.count >= self.min_samples) & (deviation > self.threshold * std) \
+            & (deviation >= self.min_delta)
+        entered = anomalous & ~self.active
+        self.active = np.where(seen, anomalous, self.active)
+
+        # Learn: exponentially weighted mean and variance, overall and for this hour of the week.
+        # Anomalous samples are learnt ten times slower, so a fault doesn't widen its own
+        # baseline while a lasting change in the normal level is still absorbed eventually
+        damping = np.where(anomalous, 0.1, 1.0)
+        alpha = self.alpha * damping
+        diff = np.where(seen, x - self.mean, 0.0)
+        self.mean = np.where(first, x, self.mean + alpha * diff)
+        self.var = np.where(first, 0.0, (1 - alpha) * (self.var + alpha * diff * diff))
+        season_alpha = self.season_alpha * damping
+        season_first = seen & (self.season_count[:, bucket] == 0)
+        season_diff = np.where(seen, x - season_mean, 0.0)
+        self.season_mean[:, bucket] = np.where(season_first, x, season_mean + season_alpha * season_diff)
+        self.season_var[:, bucket] = np.where(
+            season_first, self.var, (1 - season_alpha) * (season_var + season_alpha * season_diff ** 2))
+        self.season_count[:, bucket] += seen
+        self.count += seen
+
+        events = {'anomaly': [(int(i), float(self.level[i]), float(expected[i])) for i in np.flatnonzero(entered)],
+                  'stuck': []}
+        if self.stuck_after:
+            same = seen & (x == self.last)
+            self.repeats = np.where(same, self.repeats + 1, np.where(seen, 0, self.repeats))
+            self.last = np.where(seen, x, self.last)
+            events['stuck'] = [(int(i), float(x[i])) for i in np.flatnonzero(self.repeats == self.stuck_after)]
+        return events
+
+
+class StandbyDetector:
+    """Devices drawing more than `threshold_watts` while switched OFF for `after` consecutive samples"""
+
+    def __init__(self, size: int, threshold_watts: float = 2.0, after: int = 3):
+        import numpy as np
+
+        self.size = size
+        self.threshold_watts = threshold_watts
+        self.after = after
+        self.run = np.zeros(size, dtype=np.int64)
+
+    def update(self, watts: Sequence[float], on: Sequence[bool]) -> List[int]:
+        import numpy as np
+
+        drawing = (np.asarray(watts, dtype=np.float64) > self.threshold_watts) & ~np.asarray(on, dtype=bool)
+        self.run = np.where(drawing, self.run + 1, 0)
+        return np.flatnonzero(self.run == self.after).tolist()
+
+
+class AnomalyMonitor:
+    """
+    Runs the detectors over the energy and sensor streams and hands alerts to
+    `raise_alert(target, alert)`, where target is 'security' (unusual
+    consumption) or 'maintenance' (sensor or device faults). Faults a device
+    command can clear are passed to `respond(device, state)`: a device drawing
+    power while switched OFF is sent OFF again.
+    """
+
+    def __init__(self, raise_alert: Callable[[str, Union[SecurityAlert, MaintenanceAlert]], None], spike_watts: float = 500.0,
+                 drift_temperature: float = 3.0, drift_humidity: float = 10.0, stuck_after: int = 120,
+                 standby_watts: float = 2.0, threshold: float = 4.0,
+                 respond: Optional[Callable[[str, str], None]] = None):
+        self.raise_alert = raise_alert
+        self.respond = respond
+        self.spike_watts = spike_watts
+        self.drift_temperature = drift_temperature
+        self.drift_humidity = drift_humidity
+        self.stuck_after = stuck_after
+        self.standby_watts = standby_watts
+        self.threshold = threshold
+        self.energy: Optional[StreamDetector] = None
+        self.standby: Optional[StandbyDetector] = None
+        self.temperature: Optional[StreamDetector] = None
+        self.humidity: Optional[StreamDetector] = None
+        self.counts = {'spike': 0, 'drift': 0, 'stuck': 0, 'standby': 0}
+
+    @classmethod
+    def from_env(cls, raise_alert, respond=None) -> 'AnomalyMonitor':
+        """ANOMALY_SPIKE_WATTS, ANOMALY_STUCK_SAMPLES, ANOMALY_STANDBY_WATTS, ANOMALY_THRESHOLD (standard deviations)"""
+        return cls(
+            raise_alert,
+            respond=respond,
+            spike_watts=float(os.getenv("ANOMALY_SPIKE_WATTS", "500")),
+            stuck_after=int(os.getenv("ANOMALY_STUCK_SAMPLES", "120")),
+            standby_watts=float(os.getenv("ANOMALY_STANDBY_WATTS", "2")),
+            threshold=float(os.getenv("ANOMALY_THRESHOLD", "4")),
+        )
+
+    def _report(self, kind: str, target: str, alert: Union[SecurityAlert, MaintenanceAlert]):
+        self.counts[kind] += 1
+        metrics.inc("anomalies_total", kind=kind)
+        message = alert.status if isinstance(alert, SecurityAlert) else alert.message
+        log.warning("Anomaly (%s): %s", kind, message, extra={'kind': kind})
+        self.raise_alert(target, alert)
+
+    def observe_energy(self, total_watts: float, names: List[str], watts: List[float], on: List[bool], now: int):
+        """One energy tick: household total for spikes, per-device draw for standby power"""
+        if self.energy is None:
+            self.energy = StreamDetector(1, threshold=self.threshold, min_delta=self.spike_watts)
+        for _, level, expected in self.energy.update([total_watts], hour_of_week(now))['anomaly']:
+            self._report('spike', 'security', SecurityAlert(
+                "ENERGY",
+                f"Unusual consumption: {level:.0f} W (expected about {expected:.0f} W)",
+                "Main Meter",
+                "WARNING",
+            ))
+
+        if self.standby is None or self.standby.size != len(names):
+            self.standby = StandbyDetector(len(names), self.standby_watts)
+        for i in self.standby.update(watts, on):
+            self._report('standby', 'maintenance', MaintenanceAlert(
+                names[i].replace("_", " ").title(),
+                f"Drawing {watts[i]:.1f} W while switched OFF",
+                "HIGH",
+                "STANDBY_POWER",
+                "Check relay and wiring",
+                "-",
+            ))
+            if self.respond is not None:
+                self.respond(names[i], "OFF")
+
+    def observe_sensors(self, readings: List[SensorReading], now: int):
+        """One sensor tick; each reading's node selects its stream"""
+        nodes = 1 + max(reading.node for reading in readings) if readings else 0
+        if self.temperature is None:
+            # Drift: a smoothed level leaving a slow baseline (about the last 1000 readings)
+            self.temperature = StreamDetector(nodes, alpha=0.001, season_alpha=0.001, threshold=self.threshold,
+                                              min_delta=self.drift_temperature, smoothing=0.1,
+                                              stuck_after=self.stuck_after)
+            self.humidity = StreamDetector(nodes, alpha=0.001, season_alpha=0.001, threshold=self.threshold,
+                                           min_delta=self.drift_humidity, smoothing=0.1,
+                                           stuck_after=self.stuck_after)
+        elif self.temperature.size < nodes:
+            # A node seen for the first time joins without resetting the others' baselines
+            self.temperature.grow(nodes)
+            self.humidity.grow(nodes)
+        bucket = hour_of_week(now)
+        for name, detector, unit in (('temperature', self.temperature, '°C'), ('humidity', self.humidity, '%')):
+            values = [float('nan')] * detector.size
+            for reading in readings:
+                value = getattr(reading, name)
+                if value is not None:
+                    values[reading.node] = value
+            events = detector.update(values, bucket)
+            for node, level, expected in events['anomaly']:
+                self._report('drift', 'maintenance', MaintenanceAlert(
+                    f"Sensor {node}",
+                    f"{name.capitalize()} drifted to {level:.1f}{unit} (usually {expected:.1f}{unit})",
+                    "MEDIUM",
+                    "SENSOR_DRIFT",
+                    "Check sensor placement and calibration",
+                    "-",
+                ))
+            for node, value in events['stuck']:
+                self._report('stuck', 'maintenance', MaintenanceAlert(
+                    f"Sensor {node}",
+                    f"{name.capitalize()} stuck at {value:.1f}{unit} for {self.stuck_after} readings",
+                    "HIGH",
+                    "STUCK_SENSOR",
+                    "Check sensor power and connection",
+                    "-",
+                ))
+
+    def get_stats(self) -> Dict:
+        detectors = [d for d in (self.energy, self.temperature, self.humidity) if d is not None]
+        return {
+            'streams': sum(d.size for d in detectors) + (self.standby.size if self.standby else 0),
+            'state_bytes': sum(d.nbytes for d in detectors) + (self.standby.run.nbytes if self.standby else 0),
+            'alerts': dict(self.counts),
+        }
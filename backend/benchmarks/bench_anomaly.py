@@ -0,0 +1,67 @@
+"""
+Update cost, state size and detection rate of the streaming anomaly detector
+for thousands of streams, with spikes and stuck values injected after warm-up.
+
+    cd backend
+    python benchmarks/bench_anomaly.py --streams 1000,5000,10000 --ticks 600
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+import numpy as np  # noqa: E402
+
+from anomaly import StreamDetector  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the streaming anomaly detector")
+    parser.add_argument('--streams', default='1000,5000,10000')
+    parser.add_argument('--ticks', type=int, default=600)
+    parser.add_argument('--faults', type=float, default=0.01, help="share of streams given a spike and a stuck run")
+    parser.add_argument('--seed', type=int, default=7)
+    args = parser.parse_args()
+
+    print(f"{'streams':>8}{'tick ms':>9}{'us/stream':>11}{'bytes/stream':>14}"
+          f"{'spikes found':>14}{'stuck found':>13}{'false alarms':>14}")
+    for count in [int(n) for n in args.streams.split(',')]:
+        rng = np.random.default_rng(args.seed)
+        detector = StreamDetector(count, min_delta=5.0, stuck_after=30)
+        base = rng.uniform(50, 500, count)
+        noise = base * 0.02
+
+        faulty = rng.choice(count, max(1, int(count * args.faults)), replace=False)
+        faulty_set = set(faulty.tolist())
+        spike_tick = args.ticks - 60
+        stuck_from = args.ticks - 40
+
+        times, spikes, stuck, false_alarms = [], set(), set(), 0
+        for tick in range(args.ticks):
+            values = base + rng.normal(0, 1, count) * noise
+            if tick == spike_tick:
+                values[faulty] = base[faulty] * 3
+            if tick >= stuck_from:
+                values[faulty] = base[faulty]
+            started = time.perf_counter()
+            events = detector.update(values, tick // 60 % 168)
+            times.append((time.perf_counter() - started) * 1000)
+
+            found = {stream for stream, _, _ in events['anomaly']}
+            if tick == spike_tick:
+                spikes |= found & faulty_set
+            false_alarms += len(found - faulty_set)
+            stuck |= {stream for stream, _ in events['stuck']}
+
+        tick_ms = statistics.median(times)
+        print(f"{count:>8}{tick_ms:>9.3f}{tick_ms * 1000 / count:>11.3f}{detector.nbytes / count:>14.0f}"
+              f"{len(spikes):>8}/{len(faulty):<5}{len(stuck & faulty_set):>7}/{len(faulty):<5}"
+              f"{false_alarms:>14}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""
+Parse throughput of free-text device commands:
+
+    keywords  the client's previous approach: chained substring scans per keyword list
+    matcher   CommandParser with the parse cache bypassed (every phrase is new)
+    cached    CommandParser on a stream where phrases repeat, as voice commands do
+
+Run against the two demo devices and against a generated fleet registry,
+where the keyword approach needs one scan per device name. The parser's
+results for a set of known phrases are checked first.
+
+    cd backend
+    python benchmarks/bench_command_parser.py --phrases 20000 --fleet 1000
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from command_parser import PREFIX_ACTIONS, CommandParser  # noqa: E402
+
+TEMPLATES = [
+    "turn {a} the {d}",
+    "please switch {a} {d}",
+    "{d} {a}",
+    "could you turn {a} the {d} and the {d2}",
+    "turn {a} the {d}, {d2} {b}",
+    "what is the temperature right now",
+]
+
+
+# Phrase -> expected actions, against the devices light, fan and ac
+EXPECTED = {
+    "turn on the lights and switch the fan off": [('light', 'ON'), ('fan', 'OFF')],
+    "turn on the lights and the fan off": [('light', 'ON'), ('fan', 'OFF')],
+    "fan on then off": [('fan', 'OFF')],
+    "light and fan off": [('light', 'OFF'), ('fan', 'OFF')],
+    "turn off the light and turn on the fan": [('light', 'OFF'), ('fan', 'ON')],
+    "turn on the light but turn off the fan": [('light', 'ON'), ('fan', 'OFF')],
+    "turn off everything but the fan": [('light', 'OFF'), ('ac', 'OFF')],
+    "turn on everything except the fan and the ac": [('light', 'ON')],
+    "turn on all lights": [('light', 'ON')],
+    "turn all off": [('light', 'OFF'), ('fan', 'OFF'), ('ac', 'OFF')],
+    "is the light on?": [],
+    "turn on the fan, is the light on?": [('fan', 'ON')],
+    "what is the temperature right now": [],
+}
+
+
+def check_results() -> int:
+    """Parse every EXPECTED phrase; returns the number of mismatches"""
+    parser = CommandParser(['light', 'fan', 'ac'])
+    failures = 0
+    for phrase, expected in EXPECTED.items():
+        got = parser.parse(phrase)
+        if got != expected:
+            failures += 1
+            print(f"  MISMATCH {phrase!r}: expected {expected}, got {got}")
+    print(f"results: {len(EXPECTED) - failures}/{len(EXPECTED)} phrases parsed as expected")
+    return failures
+
+
+def make_phrases(devices, count: int, distinct: int, seed: int):
+    rng = random.Random(seed)
+    spoken = [d.replace('_', ' ') for d in devices]
+    pool = []
+    for _ in range(distinct):
+        a, b = rng.sample(['on', 'off'], 2)
+        pool.append(rng.choice(TEMPLATES).format(a=a, b=b, d=rng.choice(spoken), d2=rng.choice(spoken)))
+    return [rng.choice(pool) for _ in range(count)]
+
+
+def keyword_parse(text: str, devices):
+    """Chained _containsAny scans, one list per action and one per device"""
+    text = text.lower()
+    for state, phrases in PREFIX_ACTIONS.items():
+        if any(phrase in text for phrase in phrases):
+            for device in devices:
+                if any(name in text for name in (device, device + 's', device.replace('_', ' '))):
+                    return [(device, state)]
+    return []
+
+
+def rate(func, phrases) -> float:
+    started = time.perf_counter()
+    for phrase in phrases:
+        func(phrase)
+    return len(phrases) / (time.perf_counter() - started)
+
+
+def run(label: str, devices, args):
+    phrases = make_phrases(devices, args.phrases, args.distinct, args.seed)
+    unique = make_phrases(devices, args.phrases, args.phrases, args.seed + 1)
+
+    started = time.perf_counter()
+    parser = CommandParser(devices, cache_size=args.cache_size)
+    build_ms = (time.perf_counter() - started) * 1000
+
+    results = {
+        'keywords': rate(lambda p: keyword_parse(p, devices), phrases),
+        'matcher': rate(parser._parse, unique),
+        'cached': rate(parser.parse, phrases),
+    }
+    print(f"\n{label}: {len(devices)} devices, {parser.pattern_count} patterns, built in {build_ms:.1f}ms")
+    for name, per_second in results.items():
+        print(f"  {name:<10}{per_second:>12,.0f} parses/s")
+    stats = parser.get_stats()
+    print(f"  cache hit rate {stats['cache_hits'] / max(1, stats['cache_hits'] + stats['cache_misses']):.0%}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark free-text command parsing")
+    parser.add_argument('--phrases', type=int, default=20000)
+    parser.add_argument('--distinct', type=int, default=200, help="distinct phrases in the repeating stream")
+    parser.add_argument('--fleet', type=int, default=1000, help="devices in the generated registry")
+    parser.add_argument('--cache-size', type=int, default=1024)
+    parser.add_argument('--seed', type=int, default=7)
+    args = parser.parse_args()
+
+    if check_results():
+        sys.exit(1)
+    run("demo", ['light', 'fan'], args)
+    kinds = ['light', 'fan', 'ac', 'heater', 'plug']
+    run("fleet", [f"{kinds[i % len(kinds)]}_{i:05d}" for i in range(args.fleet)], args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""
+Latency of an "evening scene" - hundreds of schedules due in the same minute -
+applied one device at a time (a DB transaction each, as the scheduler used to)
+versus through the prioritized, batching ActionDispatcher. A user command is
+issued just after the scene starts to show how long it waits.
+
+    cd backend
+    python benchmarks/bench_dispatch.py --devices 100,500,2000 --workers 4 --batch 100
+"""
+import argparse
+import asyncio
+import os
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from database import Database  # noqa: E402
+from dispatcher import ActionDispatcher  # noqa: E402
+from fleet_simulator import FleetSimulator  # noqa: E402
+
+
+async def setup(path: str, devices: int):
+    db = Database(path)
+    await db.init_db()
+    fleet = FleetSimulator(num_devices=devices, num_sensors=1, seed=1)
+    with sqlite3.connect(path) as conn:
+        conn.executemany('INSERT INTO devices (name, state) VALUES (?, ?)', [(n, 'OFF') for n in fleet.device_names])
+    return db, fleet
+
+
+async def sequential(db: Database, fleet: FleetSimulator, user_device: str):
+    async def apply(device):
+        await db.update_device_state(device, 'ON')
+        fleet.control_device(device, 'ON')
+
+    done = {}
+    started = time.perf_counter()
+
+    async def scene():
+        for device in fleet.device_names:
+            await apply(device)
+            done[device] = time.perf_counter() - started
+
+    async def user():
+        await asyncio.sleep(0)
+        await apply(user_device)
+        return time.perf_counter() - started
+
+    _, user_latency = await asyncio.gather(scene(), user())
+    return time.perf_counter() - started, list(done.values()), user_latency, len(fleet.device_names) + 1
+
+
+async def dispatched(db: Database, fleet: FleetSimulator, user_device: str, workers: int, batch: int):
+    async def apply_batch(actions):
+        await db.update_device_states([(device, state) for device, state, _ in actions])
+        return [fleet.control_device(device, state) for device, state, _ in actions]
+
+    dispatcher = ActionDispatcher(apply_batch, workers=workers, batch_size=batch)
+    started = time.perf_counter()
+    done = []
+
+    async def fire(device):
+        await dispatcher.submit(device, 'ON', 'schedule')
+        done.append(time.perf_counter() - started)
+
+    async def user():
+        await asyncio.sleep(0)
+        await dispatcher.submit(user_device, 'ON', 'user')
+        return time.perf_counter() - started
+
+    results = await asyncio.gather(user(), *(fire(device) for device in fleet.device_names))
+    for task in dispatcher.tasks:
+        task.cancel()
+    return time.perf_counter() - started, done, results[0], dispatcher.counts['batches']
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark concurrent dispatch of due scheduled actions")
+    parser.add_argument('--devices', default='100,500,2000')
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--batch', type=int, default=100)
+    args = parser.parse_args()
+
+    print(f"{'devices':>8}{'mode':>12}{'scene ms':>10}{'p50 ms':>9}{'max ms':>9}{'user ms':>9}{'writes':>8}")
+    for count in [int(n) for n in args.devices.split(',')]:
+        for mode in ('sequential', 'dispatcher'):
+            path = os.path.join(tempfile.mkdtemp(prefix='bench-dispatch-'), 'bench.db')
+
+            async def run():
+                db, fleet = await setup(path, count + 1)
+                user_device = fleet.device_names.pop()
+                if mode == 'sequential':
+                    return await sequential(db, fleet, user_device)
+                return await dispatched(db, fleet, user_device, args.workers, args.batch)
+
+            total, done, user_latency, writes = asyncio.run(run())
+            print(f"{count:>8}{mode:>12}{total * 1000:>10.0f}{statistics.median(done) * 1000:>9.0f}"
+                  f"{max(done) * 1000:>9.0f}{user_latency * 1000:>9.1f}{writes:>8}")
+
+
+if __name__ == "__main__":
+    main()
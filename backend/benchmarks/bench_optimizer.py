@@ -0,0 +1,73 @@
+"""
+Solve time and result quality of the load-shifting optimizer for generated
+households of flexible devices, with and without the improvement passes.
+
+    cd backend
+    python benchmarks/bench_optimizer.py --devices 100,300,1000 --repeat 3
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from optimizer import SLOTS_PER_DAY, slot_prices, slot_time, solve  # noqa: E402
+from tariff import Tariff, DEFAULT_TARIFF  # noqa: E402
+
+
+def make_problem(devices: int, seed: int, cap_factor: float):
+    rng = random.Random(seed)
+    jobs = []
+    for i in range(devices):
+        start = rng.randrange(SLOTS_PER_DAY)
+        window = rng.randint(16, SLOTS_PER_DAY)
+        jobs.append({
+            'device': f"device_{i:05d}",
+            'power_watts': rng.choice([60, 150, 500, 1200, 2000]),
+            'duration_minutes': rng.randint(1, min(window, 16)) * 15,
+            'window_start': slot_time(start),
+            'window_end': slot_time(start + window),
+        })
+    base_load = [300 + 200 * rng.random() for _ in range(SLOTS_PER_DAY)]
+    # Cap relative to the average load if every run were spread evenly over the day
+    mean_extra = sum(j['power_watts'] * j['duration_minutes'] / 15 for j in jobs) / SLOTS_PER_DAY
+    tariff = Tariff(**DEFAULT_TARIFF)
+    return {
+        'jobs': jobs,
+        'prices': slot_prices(tariff.marginal_rate(0), tariff.hour_multiplier),
+        'base_load': base_load,
+        'peak_cap_watts': (max(base_load) + mean_extra) * cap_factor,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the load-shifting optimizer")
+    parser.add_argument('--devices', default='100,300,1000')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--cap-factor', type=float, default=1.5,
+                        help="peak cap as a multiple of the evenly spread load")
+    parser.add_argument('--seed', type=int, default=11)
+    args = parser.parse_args()
+
+    print(f"{'devices':>8}{'mode':>10}{'solve ms':>11}{'passes':>8}{'cost':>11}{'at start':>11}"
+          f"{'saving':>8}{'unplaced':>10}{'peak/cap':>10}")
+    for count in [int(n) for n in args.devices.split(',')]:
+        problem = make_problem(count, args.seed, args.cap_factor)
+        for mode, improve in (('greedy', False), ('improved', True)):
+            times = []
+            for _ in range(args.repeat):
+                started = time.perf_counter()
+                result = solve(dict(problem, improve=improve))
+                times.append((time.perf_counter() - started) * 1000)
+            saving = 1 - result['cost'] / result['cost_at_window_start'] if result['cost_at_window_start'] else 0
+            print(f"{count:>8}{mode:>10}{statistics.median(times):>11.1f}{result['improvement_passes']:>8}"
+                  f"{result['cost']:>11.2f}{result['cost_at_window_start']:>11.2f}{saving:>8.1%}"
+                  f"{len(result['unscheduled']):>10}{result['peak_watts'] / result['peak_cap_watts']:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""
+Memory held per million alerts and sensor readings: the plain dicts these
+used to be (ISO timestamp strings, per-instance key tables) against the
+`__slots__` records in records.py. Measured with tracemalloc, so the figures
+count every object a buffer keeps alive.
+
+    cd backend
+    python benchmarks/bench_records.py --events 1000000
+"""
+import argparse
+import gc
+import os
+import random
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from records import MaintenanceAlert, SecurityAlert, SensorReading  # noqa: E402
+
+START_MS = int(datetime(2024, 1, 1).timestamp() * 1000)
+LOCATIONS = ["Main Door", "Back Door", "Living Room", "Kitchen", "Hallway", "Backyard"]
+SEVERITIES = ["INFO", "WARNING", "CRITICAL"]
+
+
+def iso(ms: int) -> str:
+    return datetime.fromtimestamp(ms / 1000).isoformat()
+
+
+def security_dict(i: int, rng: random.Random) -> dict:
+    return {"type": "MOTION", "status": "DETECTED", "location": rng.choice(LOCATIONS),
+            "timestamp": iso(START_MS + i * 1000), "severity": rng.choice(SEVERITIES),
+            "id": i + 1, "acknowledged": False}
+
+
+def security_record(i: int, rng: random.Random) -> SecurityAlert:
+    return SecurityAlert("MOTION", "DETECTED", rng.choice(LOCATIONS), rng.choice(SEVERITIES),
+                         START_MS + i * 1000, i + 1)
+
+
+def maintenance_dict(i: int, rng: random.Random) -> dict:
+    return {"device": f"Sensor {i % 1000}", "message": "Temperature stuck at 24.0°C for 120 readings",
+            "priority": "HIGH", "type": "STUCK_SENSOR", "action_required": "Check sensor power and connection",
+            "estimated_cost": "-", "timestamp": iso(START_MS + i * 1000)}
+
+
+def maintenance_record(i: int, rng: random.Random) -> MaintenanceAlert:
+    return MaintenanceAlert(f"Sensor {i % 1000}", "Temperature stuck at 24.0°C for 120 readings", "HIGH",
+                            "STUCK_SENSOR", "Check sensor power and connection", "-", START_MS + i * 1000)
+
+
+def reading_dict(i: int, rng: random.Random) -> dict:
+    return {"node": i % 1000, "temperature": round(rng.uniform(20, 30), 1), "humidity": round(rng.uniform(40, 70), 1),
+            "motion": rng.random() < 0.05, "door": "CLOSED", "timestamp": iso(START_MS + (i // 1000) * 5000)}
+
+
+def reading_record(i: int, rng: random.Random) -> SensorReading:
+    return SensorReading(i % 1000, round(rng.uniform(20, 30), 1), round(rng.uniform(40, 70), 1),
+                         rng.random() < 0.05, "CLOSED", START_MS + (i // 1000) * 5000)
+
+
+KINDS = {
+    'security alert': (security_dict, security_record),
+    'maintenance alert': (maintenance_dict, maintenance_record),
+    'sensor reading': (reading_dict, reading_record),
+}
+
+
+def measure(build, count: int):
+    """Bytes held by `count` built events, and the build time"""
+    rng = random.Random(1)
+    gc.collect()
+    tracemalloc.start()
+    started = time.perf_counter()
+    events = [build(i, rng) for i in range(count)]
+    elapsed = time.perf_counter() - started
+    held, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del events
+    return held, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark memory of alert and reading representations")
+    parser.add_argument('--events', type=int, default=1000000)
+    args = parser.parse_args()
+
+    per_million = 1000000 / args.events
+    print(f"{'event':>18}{'dict MB/M':>11}{'record MB/M':>13}{'saved':>8}{'dict s':>8}{'record s':>10}")
+    for name, (as_dict, as_record) in KINDS.items():
+        dict_bytes, dict_time = measure(as_dict, args.events)
+        record_bytes, record_time = measure(as_record, args.events)
+        print(f"{name:>18}{dict_bytes * per_million / 1e6:>11.0f}{record_bytes * per_million / 1e6:>13.0f}"
+              f"{1 - record_bytes / dict_bytes:>8.0%}{dict_time:>8.2f}{record_time:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
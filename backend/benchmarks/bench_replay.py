@@ -0,0 +1,99 @@
+"""
+Whole-system benchmark: generates a reproducible synthetic recording (a fleet
+of sensors ticking every 5 s, user commands, MQTT commands and a schedule per
+device) and replays it against the backend on an accelerated clock, reporting
+database write throughput and scheduler firing accuracy.
+
+    cd backend
+    python benchmarks/bench_replay.py --hours 24 --devices 200 --sensors 100 --speed 200
+
+Use --keep to write the recording to a file for replay.py.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import tempfile
+from datetime import datetime
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from fleet_simulator import FleetSimulator  # noqa: E402
+from recorder import Recorder  # noqa: E402
+
+
+def generate(path: str, hours: float, devices: int, sensors: int, seed: int, commands_per_hour: int):
+    """A deterministic recording starting at local midnight of 2024-01-01"""
+    rng = random.Random(seed)
+    names = FleetSimulator(num_devices=devices, num_sensors=1, seed=seed).device_names
+    start = int(datetime(2024, 1, 1).timestamp() * 1000)
+    duration = int(hours * 3600 * 1000)
+    recorder = Recorder(path, start_ms=start)
+
+    # Schedules first, so they are in place before their times come round
+    for name in names:
+        on = rng.randrange(24 * 60)
+        off = (on + rng.randint(15, 240)) % (24 * 60)
+        recorder.record('schedule', {'device': name, 'time': f"{on // 60:02d}:{on % 60:02d}", 'action': 'ON',
+                                     'enabled': True, 'days': None,
+                                     'until': f"{off // 60:02d}:{off % 60:02d}"}, at_ms=start)
+
+    commands = [(rng.randrange(duration), rng.random() < 0.3) for _ in range(int(hours * commands_per_hour))]
+    commands.sort()
+    temperature = [22 + rng.uniform(-2, 2) for _ in range(sensors)]
+    humidity = [55 + rng.uniform(-5, 5) for _ in range(sensors)]
+    door = [0] * sensors
+    pending = 0
+    for offset in range(0, duration, 5000):
+        while pending < len(commands) and commands[pending][0] < offset:
+            at, via_mqtt = commands[pending]
+            name, state = rng.choice(names), rng.choice(('ON', 'OFF'))
+            if via_mqtt:
+                recorder.record('mqtt', [f"home/{name}", {'state': state}], at_ms=start + at)
+            else:
+                recorder.record('command', [name, state], at_ms=start + at)
+            pending += 1
+        rows = []
+        for node in range(sensors):
+            temperature[node] += rng.uniform(-0.2, 0.2)
+            humidity[node] += rng.uniform(-0.8, 0.8)
+            if rng.random() < 0.002:
+                door[node] ^= 1
+            rows.append([node, round(temperature[node], 1), round(humidity[node], 1), int(rng.random() < 0.03),
+                         door[node]])
+        recorder.record('sensors', rows, at_ms=start + offset)
+    recorder.close()
+    return recorder.count
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay a synthetic day against the backend")
+    parser.add_argument('--hours', type=float, default=24)
+    parser.add_argument('--devices', type=int, default=200)
+    parser.add_argument('--sensors', type=int, default=100)
+    parser.add_argument('--commands-per-hour', type=int, default=60)
+    parser.add_argument('--speed', type=float, default=200)
+    parser.add_argument('--seed', type=int, default=3)
+    parser.add_argument('--keep', help="write the recording to this path")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='bench-replay-')
+    path = args.keep or os.path.join(workdir, 'recording.ndjson.gz')
+    events = generate(path, args.hours, args.devices, args.sensors, args.seed, args.commands_per_hour)
+    print(f"recording: {events} events, {os.path.getsize(path) / 1024:.0f} KB")
+
+    # The backend builds the same fleet as the generator
+    os.environ["SIM_DEVICES"] = str(args.devices)
+    os.environ["SIM_SENSORS"] = str(args.sensors)
+    os.environ["SIM_SEED"] = str(args.seed)
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+    from replay import replay
+    report = asyncio.run(replay(path, args.speed, os.path.join(workdir, 'replay.db')))
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
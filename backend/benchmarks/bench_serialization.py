@@ -0,0 +1,85 @@
+"""
+Time JSON serialization of history responses built three ways:
+
+    default   dicts per row, FastAPI's jsonable_encoder + json.dumps (previous path)
+    orjson    dicts per row, FastJSONResponse rendering (orjson when installed)
+    rows      row tuples encoded directly by RowEncoder (no per-row dicts)
+
+    cd backend
+    python benchmarks/bench_serialization.py --rows 10000 --repeat 20
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from fastapi.encoders import jsonable_encoder  # noqa: E402
+from starlette.responses import JSONResponse  # noqa: E402
+
+from database import door_name, from_epoch_ms  # noqa: E402
+from export import ENERGY_COLUMNS, SENSOR_COLUMNS  # noqa: E402
+from serialization import FastJSONResponse, RowEncoder, orjson  # noqa: E402
+
+
+def make_rows(kind: str, count: int, seed: int):
+    rng = random.Random(seed)
+    start = 1704067200000
+    if kind == 'energy':
+        return [(i, start + 5000 * i, rng.uniform(20, 3000)) for i in range(count)]
+    return [
+        (i, start + 5000 * i, i % 4, round(rng.uniform(20, 35), 1), round(rng.uniform(40, 80), 1),
+         int(rng.random() < 0.05), int(rng.random() < 0.1))
+        for i in range(count)
+    ]
+
+
+def to_dicts(kind: str, rows):
+    """What the database layer's dict readers produce"""
+    if kind == 'energy':
+        return [{'id': r[0], 'timestamp': from_epoch_ms(r[1]), 'watts': r[2]} for r in rows]
+    return [
+        {'id': r[0], 'timestamp': from_epoch_ms(r[1]), 'node': r[2], 'temperature': r[3], 'humidity': r[4],
+         'motion': r[5], 'door': door_name(r[6])}
+        for r in rows
+    ]
+
+
+def measure(func, repeat: int) -> float:
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - started)
+    return best * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark history response serialization")
+    parser.add_argument('--rows', type=int, default=10000)
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    print(f"{args.rows} rows, best of {args.repeat}; orjson {'installed' if orjson else 'not installed'}")
+    print(f"{'table':<8}{'default ms':>12}{'orjson ms':>12}{'rows ms':>12}{'speedup':>10}")
+    for kind, columns in (('energy', ENERGY_COLUMNS), ('sensors', SENSOR_COLUMNS)):
+        rows = make_rows(kind, args.rows, args.seed)
+        encoder = RowEncoder(columns)
+
+        default_body = JSONResponse(jsonable_encoder({'history': to_dicts(kind, rows)})).body
+        rows_body = b'{"history":' + encoder.encode(rows) + b'}'
+        assert json.loads(default_body) == json.loads(rows_body), "row encoder output differs"
+
+        default_ms = measure(lambda: JSONResponse(jsonable_encoder({'history': to_dicts(kind, rows)})), args.repeat)
+        fast_ms = measure(lambda: FastJSONResponse({'history': to_dicts(kind, rows)}), args.repeat)
+        rows_ms = measure(lambda: b'{"history":' + encoder.encode(rows) + b'}', args.repeat)
+        print(f"{kind:<8}{default_ms:>12.2f}{fast_ms:>12.2f}{rows_ms:>12.2f}{default_ms / rows_ms:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
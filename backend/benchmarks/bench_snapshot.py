@@ -0,0 +1,76 @@
+"""
+Cost of warm-restart snapshots: how long the event loop is held while state
+is encoded, the total save time (compression runs in a worker thread), the
+stored size and the restore time at startup, for a fleet of sensor nodes and
+one schedule per device.
+
+    cd backend
+    python benchmarks/bench_snapshot.py --sensors 100,1000,10000 --devices 1000
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from database import Database  # noqa: E402
+from fleet_simulator import FleetSimulator  # noqa: E402
+from records import SecurityAlert  # noqa: E402
+from scheduler import DeviceScheduler  # noqa: E402
+from security import SecurityMonitor  # noqa: E402
+from snapshot import SnapshotStore  # noqa: E402
+
+
+def build(sensors: int, devices: int):
+    fleet = FleetSimulator(num_devices=devices, num_sensors=sensors, seed=1)
+    fleet.step_sensors()
+    scheduler = DeviceScheduler()
+    for i, name in enumerate(fleet.device_names):
+        scheduler.add_schedule(name, f"{i % 24:02d}:{i % 60:02d}", 'ON', until=f"{(i + 2) % 24:02d}:00")
+    security = SecurityMonitor()
+    for i in range(50):
+        security.add_alert(SecurityAlert('MOTION', 'DETECTED', 'Hallway', 'WARNING'))
+    return {'sensors': fleet, 'scheduler': scheduler, 'security': security}
+
+
+async def measure(path: str, sensors: int, devices: int):
+    db = Database(path)
+    await db.init_db()
+    store = SnapshotStore(db)
+    for name, component in build(sensors, devices).items():
+        store.register(name, component)
+
+    started = time.perf_counter()
+    store._encode()
+    encode_ms = (time.perf_counter() - started) * 1000
+    await store.save()
+    save_ms = store.stats['last_save_ms']
+    size = sum(store.stats['bytes'].values())
+
+    # A fresh process: new components, restored from the table
+    restored = SnapshotStore(db)
+    for name, component in build(sensors, devices).items():
+        restored.register(name, component)
+    await restored.load()
+    return encode_ms, save_ms, size, restored.stats['restore_ms']
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark warm-restart snapshot save and restore")
+    parser.add_argument('--sensors', default='100,1000,10000')
+    parser.add_argument('--devices', type=int, default=1000)
+    args = parser.parse_args()
+
+    print(f"{'sensors':>8}{'devices':>9}{'on-loop ms':>12}{'save ms':>9}{'KB':>8}{'restore ms':>12}")
+    for sensors in [int(n) for n in args.sensors.split(',')]:
+        path = os.path.join(tempfile.mkdtemp(prefix='bench-snapshot-'), 'bench.db')
+        encode_ms, save_ms, size, restore_ms = asyncio.run(measure(path, sensors, args.devices))
+        print(f"{sensors:>8}{args.devices:>9}{encode_ms:>12.2f}{save_ms:>9.1f}{size / 1024:>8.1f}{restore_ms:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""
+Measure backend cold-start time: a fresh interpreter importing main.py and
+running the startup handlers, under several feature-flag configurations.
+Each run uses an empty database in a temporary directory. Exits non-zero if
+the median of the default configuration exceeds --target-ms.
+
+    cd backend
+    python benchmarks/bench_startup.py --runs 5 --target-ms 500
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CHILD = """
+import asyncio, json, sys, time
+started = time.perf_counter()
+sys.path.insert(0, {backend!r})
+import main
+imported = time.perf_counter()
+
+async def run():
+    await main.app.router.startup()
+    ready = time.perf_counter(), time.time()
+    await main.app.router.shutdown()
+    return ready
+
+ready, ready_wall = asyncio.run(run())
+print(json.dumps({{'import_ms': (imported - started) * 1000, 'startup_ms': (ready - imported) * 1000,
+                  'ready_at': ready_wall}}))
+"""
+
+ALL_OFF = {'ENABLE_MQTT': '0', 'ENABLE_SIMULATOR': '0', 'ENABLE_SECURITY': '0', 'ENABLE_MAINTENANCE': '0'}
+
+CONFIGS = {
+    'default': {},
+    # Non-routable address: a blocking connect would stall here until the TCP timeout
+    'unreachable-broker': {'MQTT_BROKER': '10.255.255.1'},
+    'minimal': ALL_OFF,
+}
+
+
+def run_once(env_overrides: dict) -> dict:
+    env = dict(os.environ, LOG_LEVEL='WARNING', **env_overrides)
+    with tempfile.TemporaryDirectory() as tmp:
+        launched = time.time()
+        result = subprocess.run(
+            [sys.executable, '-c', CHILD.format(backend=BACKEND_DIR)],
+            cwd=tmp, env=env, capture_output=True, text=True, timeout=120
+        )
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1] if result.stderr else "startup failed")
+    timings = json.loads(result.stdout.strip().splitlines()[-1])
+    # Process launch to ready to serve, including interpreter boot; shutdown is not counted
+    timings['total_ms'] = (timings.pop('ready_at') - launched) * 1000
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark backend cold-start time")
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--target-ms', type=float, default=500.0,
+                        help="budget for the median total cold start of the default configuration")
+    parser.add_argument('--configs', default=','.join(CONFIGS))
+    args = parser.parse_args()
+
+    print(f"{'config':<20}{'import ms':>11}{'startup ms':>12}{'total ms':>10}   (median of {args.runs})")
+    medians = {}
+    for name in args.configs.split(','):
+        runs = [run_once(CONFIGS[name]) for _ in range(args.runs)]
+        medians[name] = {key: statistics.median(run[key] for run in runs) for key in runs[0]}
+        m = medians[name]
+        print(f"{name:<20}{m['import_ms']:>11.0f}{m['startup_ms']:>12.1f}{m['total_ms']:>10.0f}")
+
+    if 'default' in medians:
+        total = medians['default']['total_ms']
+        verdict = "within" if total <= args.target_ms else "OVER"
+        print(f"\ndefault cold start {total:.0f}ms - {verdict} the {args.target_ms:.0f}ms target")
+        sys.exit(0 if total <= args.target_ms else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""
+Compare the version 1 (ISO text timestamps, text door states) and version 2
+(epoch-millisecond INTEGER timestamps, integer door codes) sensor_logs layouts:
+on-disk size, bulk insert time and indexed time-range scan speed.
+
+    cd backend
+    python benchmarks/bench_timestamps.py --rows 500000 --scans 200
+"""
+import argparse
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from database import DOOR_CODES  # noqa: E402
+
+LAYOUTS = {
+    'text': '''
+        CREATE TABLE sensor_logs (
+            id INTEGER PRIMARY KEY, timestamp DATETIME NOT NULL,
+            temperature REAL, humidity REAL, motion INTEGER, door TEXT
+        )
+    ''',
+    'int': '''
+        CREATE TABLE sensor_logs (
+            id INTEGER PRIMARY KEY, timestamp INTEGER NOT NULL,
+            temperature REAL, humidity REAL, motion INTEGER, door INTEGER
+        )
+    ''',
+}
+
+
+def build(path: str, layout: str, rows: int, seed: int) -> float:
+    rng = random.Random(seed)
+    start = datetime(2024, 1, 1)
+    conn = sqlite3.connect(path)
+    conn.execute(LAYOUTS[layout])
+    data = []
+    for i in range(rows):
+        ts = start + timedelta(seconds=5 * i)
+        door = 'OPENED' if rng.random() < 0.1 else 'CLOSED'
+        data.append((
+            ts.isoformat() if layout == 'text' else int(ts.timestamp() * 1000),
+            round(rng.uniform(20, 35), 1), round(rng.uniform(40, 80), 1), int(rng.random() < 0.05),
+            door if layout == 'text' else DOOR_CODES[door]
+        ))
+    started = time.perf_counter()
+    conn.executemany('INSERT INTO sensor_logs (timestamp, temperature, humidity, motion, door) VALUES (?, ?, ?, ?, ?)',
+                     data)
+    conn.execute('CREATE INDEX idx_sensor_logs_timestamp ON sensor_logs (timestamp)')
+    conn.commit()
+    conn.execute('VACUUM')
+    conn.close()
+    return time.perf_counter() - started
+
+
+def scan(path: str, layout: str, rows: int, scans: int, window: int, seed: int) -> float:
+    """Average seconds for a one-hour-style window scan at random offsets"""
+    rng = random.Random(seed)
+    start = datetime(2024, 1, 1)
+    conn = sqlite3.connect(path)
+    started = time.perf_counter()
+    for _ in range(scans):
+        lo = start + timedelta(seconds=5 * rng.randrange(max(1, rows - window)))
+        hi = lo + timedelta(seconds=5 * window)
+        params = (lo.isoformat(), hi.isoformat()) if layout == 'text' else \
+            (int(lo.timestamp() * 1000), int(hi.timestamp() * 1000))
+        conn.execute('SELECT id, timestamp, temperature, humidity, motion, door FROM sensor_logs '
+                     'WHERE timestamp >= ? AND timestamp < ? ORDER BY timestamp, id', params).fetchall()
+    conn.close()
+    return (time.perf_counter() - started) / scans
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark text vs integer timestamp storage")
+    parser.add_argument('--rows', type=int, default=200000)
+    parser.add_argument('--scans', type=int, default=100)
+    parser.add_argument('--window', type=int, default=720, help="rows per range scan (720 = 1 hour at 5s)")
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        results = {}
+        for layout in LAYOUTS:
+            path = os.path.join(tmp, f'{layout}.db')
+            insert_s = build(path, layout, args.rows, args.seed)
+            results[layout] = {
+                'size_mb': os.path.getsize(path) / 1e6,
+                'insert_s': insert_s,
+                'scan_ms': scan(path, layout, args.rows, args.scans, args.window, args.seed) * 1000,
+            }
+
+    print(f"{'layout':<8}{'size MB':>10}{'insert s':>10}{'scan ms':>10}")
+    for layout, r in results.items():
+        print(f"{layout:<8}{r['size_mb']:>10.2f}{r['insert_s']:>10.2f}{r['scan_ms']:>10.3f}")
+    text, integer = results['text'], results['int']
+    print(f"\nsize: {integer['size_mb'] / text['size_mb']:.0%} of text, "
+          f"scan: {text['scan_ms'] / integer['scan_ms']:.2f}x faster")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,277 @@
+"""
+Offline benchmark and load-test suite for the Smart Home backend.
+
+Drives the FastAPI app in-process through its ASGI interface (no server, no
+network), exercising every endpoint family at a configurable concurrency and
+reporting p50/p95/p99 latency and throughput. Results can be saved as a JSON
+baseline and compared against on later runs to catch regressions.
+
+    cd backend
+    python benchmarks/load_test.py --concurrency 16 --requests 2000
+    python benchmarks/load_test.py --save-baseline benchmarks/baseline.json
+    python benchmarks/load_test.py --baseline benchmarks/baseline.json --tolerance 0.2
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+
+class ASGIClient:
+    """Minimal in-process HTTP client that calls an ASGI app directly"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def request(self, method: str, path: str, body: Optional[Dict] = None) -> Tuple[int, bytes]:
+        path, _, query = path.partition('?')
+        payload = json.dumps(body).encode() if body is not None else b''
+        headers = [(b'host', b'benchmark')]
+        if body is not None:
+            headers += [(b'content-type', b'application/json'),
+                        (b'content-length', str(len(payload)).encode())]
+
+        scope = {
+            'type': 'http',
+            'asgi': {'version': '3.0'},
+            'http_version': '1.1',
+            'method': method,
+            'scheme': 'http',
+            'path': path,
+            'raw_path': path.encode(),
+            'root_path': '',
+            'query_string': query.encode(),
+            'headers': headers,
+            'client': ('127.0.0.1', 50000),
+            'server': ('benchmark', 80),
+        }
+        sent = False
+        status = 500
+        chunks = []
+
+        async def receive():
+            nonlocal sent
+            if not sent:
+                sent = True
+                return {'type': 'http.request', 'body': payload, 'more_body': False}
+            await asyncio.sleep(3600)
+            return {'type': 'http.disconnect'}
+
+        async def send(message):
+            nonlocal status
+            if message['type'] == 'http.response.start':
+                status = message['status']
+            elif message['type'] == 'http.response.body':
+                chunks.append(message.get('body', b''))
+
+        await self.app(scope, receive, send)
+        return status, b''.join(chunks)
+
+
+# Each family is a list of request factories; workers pick from them at random
+def _device_requests(devices: List[str]) -> List[Callable]:
+    return [
+        lambda: ('POST', '/device/control', {'device': random.choice(devices),
+                                            'action': random.choice(['ON', 'OFF'])}),
+        lambda: ('GET', '/device/status', None),
+    ]
+
+
+FAMILIES = {
+    'device': None,  # filled in once the simulator's device list is known
+    'energy': [
+        lambda: ('GET', '/energy', None),
+        lambda: ('GET', '/predict', None),
+        lambda: ('GET', '/ai/summary', None),
+    ],
+    'sensors': [
+        lambda: ('GET', '/sensors', None),
+        lambda: ('GET', '/sensors/history?limit=20', None),
+        lambda: ('GET', '/hardware/status', None),
+    ],
+    'schedule': [
+        lambda: ('POST', '/schedule', {'device': random.choice(['fan', 'light']),
+                                       'time': f"{random.randint(0, 23):02d}:{random.randint(0, 59):02d}",
+                                       'action': random.choice(['ON', 'OFF'])}),
+        lambda: ('GET', '/schedule', None),
+        lambda: ('GET', '/schedule/fan', None),
+    ],
+    'security': [
+        lambda: ('GET', '/security', None),
+        lambda: ('GET', '/security/alerts', None),
+        lambda: ('GET', '/security/stats', None),
+        lambda: ('POST', '/security/mode', {'mode': random.choice(['ARMED', 'STAY', 'AWAY'])}),
+    ],
+    'maintenance': [
+        lambda: ('GET', '/maintenance', None),
+        lambda: ('GET', '/maintenance/fan/health', None),
+        lambda: ('GET', '/maintenance/light/history', None),
+    ],
+}
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    rank = max(0, min(len(sorted_values) - 1, int(round(pct / 100.0 * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[rank]
+
+
+async def run_family(client: ASGIClient, factories: List[Callable], total: int, concurrency: int) -> Dict:
+    """Issue `total` requests from `concurrency` workers and summarize latency"""
+    latencies = []
+    errors = 0
+    remaining = total
+
+    async def worker():
+        nonlocal remaining, errors
+        while remaining > 0:
+            remaining -= 1
+            method, path, body = random.choice(factories)()
+            started = time.perf_counter()
+            status, _ = await client.request(method, path, body)
+            latencies.append((time.perf_counter() - started) * 1000)
+            if status >= 400:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        'requests': len(latencies),
+        'errors': errors,
+        'p50_ms': round(percentile(latencies, 50), 3),
+        'p95_ms': round(percentile(latencies, 95), 3),
+        'p99_ms': round(percentile(latencies, 99), 3),
+        'max_ms': round(latencies[-1], 3) if latencies else 0.0,
+        'throughput_rps': round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+    }
+
+
+async def seed_history(db, rows: int):
+    """Populate energy and sensor logs so history endpoints have data to read"""
+    import aiosqlite
+    from records import SensorReading
+
+    now = datetime.now()
+    now_ms = int(now.timestamp() * 1000)
+    async with aiosqlite.connect(db.db_path) as conn:
+        await conn.executemany(
+            'INSERT INTO energy_logs (timestamp, watts) VALUES (?, ?)',
+            [(now_ms - 5000 * i, random.uniform(20, 120)) for i in range(rows)]
+        )
+        await conn.commit()
+    await db.log_sensor_data_batch([
+        SensorReading(0, round(random.uniform(20, 35), 1), round(random.uniform(40, 80), 1),
+                      random.random() < 0.05, 'CLOSED', now_ms - 5000 * i)
+        for i in range(rows)
+    ])
+
+
+def compare(results: Dict, baseline: Dict, tolerance: float, min_delta_ms: float = 1.0) -> List[str]:
+    """
+    Return a description of every family whose latency regressed past tolerance.
+    Latency changes smaller than `min_delta_ms` are treated as noise.
+    """
+    regressions = []
+    for family, current in results.items():
+        previous = baseline.get('families', {}).get(family)
+        if not previous:
+            continue
+        for metric in ('p50_ms', 'p95_ms', 'p99_ms'):
+            if (current[metric] > previous[metric] * (1 + tolerance)
+                    and current[metric] - previous[metric] >= min_delta_ms):
+                regressions.append(f"{family}.{metric}: {previous[metric]} -> {current[metric]}")
+        if previous['throughput_rps'] and current['throughput_rps'] < previous['throughput_rps'] * (1 - tolerance):
+            regressions.append(f"{family}.throughput_rps: {previous['throughput_rps']} -> {current['throughput_rps']}")
+    return regressions
+
+
+async def main(args) -> int:
+    random.seed(args.seed)
+    workdir = tempfile.mkdtemp(prefix='smart_home_bench_')
+
+    server_output = io.StringIO() if not args.verbose else sys.stdout
+    # Measure raw command handling rather than the per-device rate limiter and coalescing window
+    os.environ.setdefault('COMMAND_RATE', '0')
+    os.environ.setdefault('COMMAND_COALESCE_MS', '0')
+    with contextlib.redirect_stdout(server_output):
+        import main as backend
+
+        backend.db.db_path = os.path.join(workdir, 'bench.db')
+        await backend.app.router.startup()
+        await seed_history(backend.db, args.history_rows)
+
+    FAMILIES['device'] = _device_requests(list(backend.hardware_sim.get_all_devices()))
+    families = args.families.split(',') if args.families else list(FAMILIES)
+    client = ASGIClient(backend.app)
+
+    results = {}
+    try:
+        for family in families:
+            with contextlib.redirect_stdout(server_output):
+                results[family] = await run_family(client, FAMILIES[family], args.requests, args.concurrency)
+            r = results[family]
+            print(f"{family:<12} {r['requests']:>6} req  {r['errors']:>4} err  "
+                  f"p50 {r['p50_ms']:>8.2f}ms  p95 {r['p95_ms']:>8.2f}ms  p99 {r['p99_ms']:>8.2f}ms  "
+                  f"{r['throughput_rps']:>9.1f} req/s")
+    finally:
+        with contextlib.redirect_stdout(server_output):
+            await backend.app.router.shutdown()
+
+    report = {
+        'timestamp': datetime.now().isoformat(),
+        'python': sys.version.split()[0],
+        'concurrency': args.concurrency,
+        'requests_per_family': args.requests,
+        'families': results,
+    }
+
+    if args.save_baseline:
+        with open(args.save_baseline, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"\nBaseline written to {args.save_baseline}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.tolerance, args.min_delta_ms)
+        if regressions:
+            print(f"\nRegressions beyond {args.tolerance:.0%}:")
+            for line in regressions:
+                print(f"  - {line}")
+            return 1
+        print(f"\nNo regressions beyond {args.tolerance:.0%} against {args.baseline}")
+    return 0
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="In-process load test for the Smart Home backend")
+    parser.add_argument('--concurrency', type=int, default=8, help="concurrent workers per family")
+    parser.add_argument('--requests', type=int, default=500, help="requests per endpoint family")
+    parser.add_argument('--families', help=f"comma-separated subset of: {','.join(FAMILIES)}")
+    parser.add_argument('--history-rows', type=int, default=1000, help="energy/sensor rows seeded before the run")
+    parser.add_argument('--seed', type=int, default=42, help="random seed for request mix")
+    parser.add_argument('--save-baseline', metavar='PATH', help="write results as a JSON baseline")
+    parser.add_argument('--baseline', metavar='PATH', help="compare against a JSON baseline")
+    parser.add_argument('--tolerance', type=float, default=0.25, help="allowed regression ratio (default 0.25)")
+    parser.add_argument('--min-delta-ms', type=float, default=1.0, help="ignore latency changes below this (default 1ms)")
+    parser.add_argument('--verbose', action='store_true', help="show server output")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main(parse_args())))
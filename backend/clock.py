@@ -0,0 +1,61 @@
+import asyncio
+import time
+from datetime import datetime
+from typing import Optional
+
+
+class Clock:
+    """
+    Time source for background loops, timestamps and rate limits. It follows
+    real time until accelerate() is called; simulated time then starts at
+    `start` and runs `speed` times faster, with every clock.sleep() shortened
+    to match, so a day of loop behaviour (5-second ticks, the once-a-minute
+    scheduler) takes 86400 / speed seconds.
+    """
+
+    def __init__(self):
+        self.speed = 1.0
+        self._start: Optional[float] = None
+        self._real_start = 0.0
+
+    def accelerate(self, speed: float, start: Optional[float] = None):
+        """Run simulated time from `start` (epoch seconds, default now) at `speed`x"""
+        if speed <= 0:
+            raise ValueError("speed must be positive")
+        self._start = self.time() if start is None else start
+        self._real_start = time.monotonic()
+        self.speed = speed
+
+    def reset(self):
+        """Back to real time"""
+        self.speed = 1.0
+        self._start = None
+
+    @property
+    def accelerated(self) -> bool:
+        return self._start is not None
+
+    def time(self) -> float:
+        """Epoch seconds"""
+        if self._start is None:
+            return time.time()
+        return self._start + (time.monotonic() - self._real_start) * self.speed
+
+    def monotonic(self) -> float:
+        """For measuring intervals (rate limits, heartbeats); never goes backwards"""
+        if self._start is None:
+            return time.monotonic()
+        return self.time()
+
+    def now(self) -> datetime:
+        return datetime.fromtimestamp(self.time())
+
+    def now_ms(self) -> int:
+        return int(self.time() * 1000)
+
+    async def sleep(self, seconds: float):
+        await asyncio.sleep(max(0.0, seconds) / self.speed)
+
+
+# Process-wide clock
+clock = Clock()
@@ -0,0 +1,154 @@
+import asyncio
+import os
+from typing import Awaitable, Callable, Dict, Optional
+
+from clock import clock
+from metrics import metrics
+
+
+class RateLimited(Exception):
+    """Raised when a device has no command tokens left"""
+
+    def __init__(self, device: str, retry_after: float):
+        super().__init__(f"Too many commands for {device}")
+        self.retry_after = retry_after
+
+
+class TokenBucket:
+    """Allows `capacity` commands at once, refilled at `rate` per second"""
+
+    __slots__ = ('rate', 'capacity', 'tokens', 'updated')
+
+    def __init__(self, rate: float, capacity: float, now: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = now
+
+    def take(self, now: float) -> float:
+        """Consume a token; returns 0 if allowed, else seconds until one is available"""
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+
+class _Pending:
+    __slots__ = ('state', 'future', 'merged')
+
+    def __init__(self, state: str, future: asyncio.Future):
+        self.state = state
+        self.future = future
+        self.merged = 0
+
+
+class CommandGuard:
+    """
+    Sits in front of device control:
+      - commands for the state a device is already in are dropped (no DB write,
+        no publish) before rate limiting, so they don't use up the device's tokens
+      - each device has a token bucket; commands beyond it raise RateLimited
+      - after a command is applied, further commands for that device within
+        `coalesce_window` seconds collapse into one trailing apply of the last
+        requested state, which every caller in the burst awaits
+    """
+
+    def __init__(self, apply: Callable[[str, str], Awaitable[Dict]], current_state: Callable[[str], Optional[str]],
+                 rate: float = 2.0, burst: int = 5, coalesce_window: float = 0.25):
+        self.apply = apply
+        self.current_state = current_state
+        self.rate = rate
+        self.burst = burst
+        self.coalesce_window = coalesce_window
+        self.buckets: Dict[str, TokenBucket] = {}
+        self.pending: Dict[str, _Pending] = {}
+        self.last_applied: Dict[str, float] = {}
+        self.counts = {'applied': 0, 'noop': 0, 'coalesced': 0, 'rate_limited': 0}
+
+    @classmethod
+    def from_env(cls, apply, current_state) -> 'CommandGuard':
+        """COMMAND_RATE (per device per second, 0 disables), COMMAND_BURST, COMMAND_COALESCE_MS (0 disables)"""
+        return cls(
+            apply, current_state,
+            rate=float(os.getenv("COMMAND_RATE", "2")),
+            burst=int(os.getenv("COMMAND_BURST", "5")),
+            coalesce_window=float(os.getenv("COMMAND_COALESCE_MS", "250")) / 1000
+        )
+
+    def _count(self, result: str, source: str = "http"):
+        self.counts[result] += 1
+        metrics.inc("device_commands_total", result=result, source=source)
+
+    async def submit(self, device: str, state: str) -> Dict:
+        """Apply, drop or defer a command; returns {'changed': bool, 'state': ..., 'hardware_response': ...}"""
+        now = clock.monotonic()
+        pending = self.pending.get(device)
+        if pending is None and self.current_state(device) == state:
+            self._count('noop')
+            return {'changed': False, 'state': state}
+
+        if self.rate > 0:
+            bucket = self.buckets.get(device)
+            if bucket is None:
+                bucket = self.buckets[device] = TokenBucket(self.rate, self.burst, now)
+            wait = bucket.take(now)
+            if wait:
+                self._count('rate_limited')
+                raise RateLimited(device, wait)
+
+        if pending is not None:
+            # A trailing apply is already scheduled; retarget it to the latest request
+            pending.state = state
+            pending.merged += 1
+            self._count('coalesced')
+            return await asyncio.shield(pending.future)
+
+        since_last = now - self.last_applied.get(device, float('-inf'))
+        if since_last < self.coalesce_window:
+            loop = asyncio.get_running_loop()
+            pending = self.pending[device] = _Pending(state, loop.create_future())
+            delay = (self.coalesce_window - since_last) / clock.speed
+            loop.call_later(delay, lambda: asyncio.ensure_future(self._flush(device)))
+            return await asyncio.shield(pending.future)
+
+        return await self._apply(device, state)
+
+    async def _apply(self, device: str, state: str) -> Dict:
+        if self.current_state(device) == state:
+            self._count('noop')
+            return {'changed': False, 'state': state}
+        self.last_applied[device] = clock.monotonic()
+        result = await self.apply(device, state)
+        self._count('applied')
+        return {'changed': True, 'state': state, 'hardware_response': result}
+
+    async def _flush(self, device: str):
+        pending = self.pending.pop(device)
+        try:
+            outcome = await self._apply(device, pending.state)
+            outcome['coalesced'] = pending.merged + 1
+            pending.future.set_result(outcome)
+        except Exception as e:
+            pending.future.set_exception(e)
+
+    def is_noop(self, device: str, state: str, source: str) -> bool:
+        """No-op check for trusted sources (scheduler, MQTT) that bypass rate limiting"""
+        if self.current_state(device) == state:
+            self._count('noop', source)
+            return True
+        return False
+
+    def record_applied(self, source: str):
+        """Count a trusted source's command once it has been applied"""
+        self._count('applied', source)
+
+    def get_stats(self) -> Dict:
+        return {
+            'rate_per_second': self.rate,
+            'burst': self.burst,
+            'coalesce_window_ms': round(self.coalesce_window * 1000),
+            'commands': dict(self.counts),
+            'suppressed': self.counts['noop'] + self.counts['coalesced'] + self.counts['rate_limited'],
+        }
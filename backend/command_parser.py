@@ -0,0 +1,230 @@
+import re
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# Phrases that set the action for the devices that follow them ("turn on the light")
+PREFIX_ACTIONS = {
+    'ON': ['turn on', 'switch on', 'power on', 'enable', 'start', 'activate'],
+    'OFF': ['turn off', 'switch off', 'power off', 'disable', 'stop', 'deactivate'],
+}
+
+# Bare words that can also trail the devices they apply to ("light on", "turn the fan off")
+BARE_ACTIONS = {'on': 'ON', 'off': 'OFF'}
+
+# Extra names for devices in the registry, beyond the name and its plural
+DEVICE_ALIASES = {
+    'light': ['lamp', 'lamps', 'bulb'],
+    'fan': ['ceiling fan'],
+}
+
+# Phrases that address every device. A bare "all" only counts on its own ("turn all off"),
+# so "all lights" means the lights
+ALL_DEVICES = ['all devices', 'all the devices', 'every device', 'everything']
+ALL_WORD = 'all'
+ALL_WORD_FOLLOWERS = {'on', 'off', 'and', 'but', 'except', 'please', 'now'}
+
+# Words that leave the devices after them out ("everything but the fan")
+EXCEPT_WORDS = ['but', 'except', 'except for', 'other than']
+
+# Independent clauses; "and" alone is not a break so "light and fan on" stays one clause
+CLAUSE_BREAK = re.compile(r'[,;.?!]|\band then\b|\bthen\b')
+
+# A clause opening with one of these asks about state ("is the light on?") rather than commanding it
+QUESTION = re.compile(r'\s*(is|are|was|were|does|do|did|has|have|had|what|which|who|when|where|why|how)\b')
+
+ACTION, DEVICE, EVERY, AND, EXCEPT = 'action', 'device', 'all', 'and', 'except'
+
+
+class AhoCorasick:
+    """
+    Multi-pattern matcher: finds every occurrence of every pattern in a single
+    pass over the text, whatever the number of patterns.
+    """
+
+    def __init__(self, patterns: Dict[str, tuple]):
+        self.goto: List[Dict[str, int]] = [{}]
+        self.fail: List[int] = [0]
+        self.output: List[List[Tuple[int, tuple]]] = [[]]
+        for pattern, value in patterns.items():
+            self._add(pattern, value)
+        self._link()
+
+    def _add(self, pattern: str, value: tuple):
+        node = 0
+        for char in pattern:
+            nxt = self.goto[node].get(char)
+            if nxt is None:
+                nxt = len(self.goto)
+                self.goto[node][char] = nxt
+                self.goto.append({})
+                self.fail.append(0)
+                self.output.append([])
+            node = nxt
+        self.output[node].append((len(pattern), value))
+
+    def _link(self):
+        queue = list(self.goto[0].values())
+        for node in queue:
+            for char, child in self.goto[node].items():
+                queue.append(child)
+                state = self.fail[node]
+                while state and char not in self.goto[state]:
+                    state = self.fail[state]
+                fallback = self.goto[state].get(char, 0)
+                self.fail[child] = fallback if fallback != child else 0
+                self.output[child] = self.output[child] + self.output[self.fail[child]]
+
+    def find(self, text: str) -> List[Tuple[int, int, tuple]]:
+        """All (start, end, value) occurrences, unordered"""
+        goto, fail, output = self.goto, self.fail, self.output
+        matches = []
+        node = 0
+        for end, char in enumerate(text, 1):
+            while node and char not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(char, 0)
+            for length, value in output[node]:
+                matches.append((end - length, end, value))
+        return matches
+
+
+class CommandParser:
+    """
+    Turns free text like "turn on the lights and switch the fan off" into
+    (device, state) actions. A leading action applies to the devices that
+    follow it; a trailing "on"/"off" applies to the devices named since the
+    previous action or "and" ("... and the fan off"), or repeats the previous
+    devices when none were named ("fan on then off"). "but"/"except" exclude
+    devices from the action before them, and questions change nothing. The
+    synonym matcher is compiled once from the device registry; parses of
+    repeated phrases come from an LRU cache.
+    """
+
+    def __init__(self, devices: Iterable[str], cache_size: int = 1024):
+        self.devices = list(devices)
+        patterns = self._patterns()
+        self.pattern_count = len(patterns)
+        self.matcher = AhoCorasick(patterns)
+        self._parse_cached = lru_cache(maxsize=cache_size)(self._parse)
+
+    def _patterns(self) -> Dict[str, tuple]:
+        patterns = {}
+        for state, phrases in PREFIX_ACTIONS.items():
+            for phrase in phrases:
+                patterns[phrase] = (ACTION, state, False)
+        for word, state in BARE_ACTIONS.items():
+            patterns[word] = (ACTION, state, True)
+        for phrase in ALL_DEVICES:
+            patterns[phrase] = (EVERY,)
+        patterns[ALL_WORD] = (EVERY, ALL_WORD)
+        patterns['and'] = (AND,)
+        for phrase in EXCEPT_WORDS:
+            patterns[phrase] = (EXCEPT,)
+        for device in self.devices:
+            spoken = device.lower().replace('_', ' ')
+            for name in [spoken, spoken + 's'] + DEVICE_ALIASES.get(device, []):
+                # Registry names win over aliases and action words of the same spelling
+                patterns[name] = (DEVICE, device)
+        return patterns
+
+    def _tokens(self, clause: str) -> List[tuple]:
+        """Leftmost-longest matches that start and end on word boundaries"""
+        matches = [
+            (start, end, value) for start, end, value in self.matcher.find(clause)
+            if (start == 0 or not clause[start - 1].isalnum()) and (end == len(clause) or not clause[end].isalnum())
+        ]
+        matches.sort(key=lambda m: (m[0], -m[1]))
+        tokens, covered = [], 0
+        for start, end, value in matches:
+            if start >= covered:
+                if value == (EVERY, ALL_WORD):
+                    following = clause[end:].split(None, 1)
+                    if following and following[0] not in ALL_WORD_FOLLOWERS:
+                        continue
+                tokens.append(value)
+                covered = end
+        return tokens
+
+    def _parse(self, text: str) -> Tuple[Tuple[str, str], ...]:
+        actions: Dict[str, str] = {}
+        last: List[str] = []  # devices the most recent action applied to
+
+        def apply(devices: List[str], new_state: str):
+            for device in devices:
+                # Re-insert so execution follows the spoken order
+                actions.pop(device, None)
+                actions[device] = new_state
+
+        for clause in CLAUSE_BREAK.split(text):
+            if QUESTION.match(clause):
+                continue
+            state: Optional[str] = None
+            pending: List[str] = []  # devices named before any action in the clause
+            group: List[str] = []  # devices named since the last action or "and"
+            before: Dict[str, Optional[str]] = {}  # prior state of devices set by the current action
+            excluding = False
+            for token in self._tokens(clause):
+                kind = token[0]
+                if kind == ACTION:
+                    _, new_state, bare = token
+                    excluding = False
+                    if pending:
+                        # "fan and light off": the action trails the devices it applies to
+                        targets, pending = pending, []
+                    elif bare and state is not None and group:
+                        # "turn on the lights and the fan off": rebind the devices since the last "and"
+                        targets = group
+                    elif bare and state is None and last:
+                        # "fan on then off"
+                        targets = list(last)
+                    else:
+                        state, group, before = new_state, [], {}
+                        last = []
+                        continue
+                    for device in targets:
+                        before.setdefault(device, actions.get(device))
+                    apply(targets, new_state)
+                    last, group = list(targets), []
+                    if not bare:
+                        state = new_state
+                elif kind == AND:
+                    if not excluding:
+                        group = []
+                elif kind == EXCEPT:
+                    excluding = True
+                else:
+                    targets = self.devices if kind == EVERY else [token[1]]
+                    if excluding:
+                        for device in targets:
+                            if device in pending:
+                                pending.remove(device)
+                            if device in before:
+                                previous = before.pop(device)
+                                actions.pop(device, None)
+                                if previous is not None:
+                                    actions[device] = previous
+                            if device in last:
+                                last.remove(device)
+                    elif state is None:
+                        pending.extend(targets)
+                    else:
+                        for device in targets:
+                            before.setdefault(device, actions.get(device))
+                        apply(targets, state)
+                        group.extend(targets)
+                        last.extend(targets)
+        return tuple(actions.items())
+
+    def parse(self, text: str) -> List[Tuple[str, str]]:
+        """(device, 'ON'|'OFF') pairs in the order they were mentioned; later mentions win"""
+        return list(self._parse_cached(' '.join(text.lower().split())))
+
+    def get_stats(self) -> Dict:
+        info = self._parse_cached.cache_info()
+        return {
+            'devices': len(self.devices),
+            'patterns': self.pattern_count,
+            'cache_size': info.currsize,
+            'cache_hits': info.hits,
+            'cache_misses': info.misses,
+        }
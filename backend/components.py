@@ -0,0 +1,66 @@
+import os
+import time
+from typing import Callable, Dict
+
+from logging_config import get_logger
+
+log = get_logger("system")
+
+# Optional subsystems and whether they are on by default
+FEATURES = {
+    'mqtt': True,
+    'simulator': True,
+    'security': True,
+    'maintenance': True,
+    'profiling': False,
+}
+
+
+def feature_enabled(name: str) -> bool:
+    """ENABLE_<NAME> environment flag; 0/false/no/off disables the feature"""
+    value = os.getenv(f"ENABLE_{name.upper()}")
+    if value is None:
+        return FEATURES[name]
+    return value.strip().lower() not in ('0', 'false', 'no', 'off')
+
+
+def enabled_features() -> Dict[str, bool]:
+    return {name: feature_enabled(name) for name in FEATURES}
+
+
+class FeatureDisabled(Exception):
+    """Raised when a disabled subsystem is used"""
+
+    def __init__(self, feature: str):
+        super().__init__(f"{feature.capitalize()} disabled")
+        self.feature = feature
+
+
+class LazyComponent:
+    """
+    Stands in for a subsystem object and builds it on first attribute access,
+    so startup doesn't pay for components no request has used yet. A disabled
+    component raises FeatureDisabled instead.
+    """
+
+    def __init__(self, name: str, factory: Callable, enabled: bool = True):
+        self._name = name
+        self._factory = factory
+        self._enabled = enabled
+        self._instance = None
+
+    @property
+    def loaded(self) -> bool:
+        return self._instance is not None
+
+    def get(self):
+        if self._instance is None:
+            if not self._enabled:
+                raise FeatureDisabled(self._name)
+            started = time.perf_counter()
+            self._instance = self._factory()
+            log.info("Loaded %s in %.1fms", self._name, (time.perf_counter() - started) * 1000)
+        return self._instance
+
+    def __getattr__(self, attr):
+        return getattr(self.get(), attr)
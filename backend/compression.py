@@ -0,0 +1,156 @@
+import zlib
+from typing import Optional
+
+from starlette.datastructures import Headers, MutableHeaders
+
+try:
+    import brotli
+except ImportError:  # optional - gzip only
+    brotli = None
+
+# Content types worth compressing; binary export formats are already compact
+COMPRESSIBLE_TYPES = ('application/json', 'text/', 'application/x-ndjson')
+
+
+class _GzipStream:
+    def __init__(self, level: int):
+        # wbits 16+MAX_WBITS writes a gzip header and trailer
+        self.compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def compress(self, data: bytes) -> bytes:
+        return self.compressor.compress(data)
+
+    def flush(self) -> bytes:
+        return self.compressor.compress(b'') + self.compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        return self.compressor.flush()
+
+
+class _BrotliStream:
+    def __init__(self, quality: int):
+        self.compressor = brotli.Compressor(quality=quality)
+
+    def compress(self, data: bytes) -> bytes:
+        return self.compressor.process(data)
+
+    def flush(self) -> bytes:
+        return self.compressor.flush()
+
+    def finish(self) -> bytes:
+        return self.compressor.finish()
+
+
+def choose_encoding(accept_encoding: str) -> Optional[str]:
+    """Pick br or gzip from an Accept-Encoding header, honouring q=0"""
+    accepted = {}
+    for part in accept_encoding.lower().split(','):
+        name, _, params = part.strip().partition(';')
+        q = 1.0
+        if params.strip().startswith('q='):
+            try:
+                q = float(params.strip()[2:])
+            except ValueError:
+                q = 0.0
+        accepted[name.strip()] = q
+    if brotli is not None and accepted.get('br', 0) > 0:
+        return 'br'
+    if accepted.get('gzip', 0) > 0:
+        return 'gzip'
+    return None
+
+
+class CompressionMiddleware:
+    """
+    ASGI middleware compressing responses with brotli (when installed and
+    accepted) or gzip. Single-message bodies smaller than `minimum_size` are
+    sent as-is; streamed bodies are compressed chunk by chunk.
+    """
+
+    def __init__(self, app, minimum_size: int = 1024, gzip_level: int = 6, brotli_quality: int = 4):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+        encoding = choose_encoding(Headers(scope=scope).get('accept-encoding', ''))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+        await _CompressedResponder(self, encoding, send).run(self.app, scope, receive)
+
+
+class _CompressedResponder:
+    def __init__(self, config: CompressionMiddleware, encoding: str, send):
+        self.config = config
+        self.encoding = encoding
+        self.send = send
+        self.start_message = None
+        self.stream = None
+        self.passthrough = False
+
+    async def run(self, app, scope, receive):
+        await app(scope, receive, self.send_wrapper)
+
+    def _new_stream(self):
+        if self.encoding == 'br':
+            return _BrotliStream(self.config.brotli_quality)
+        return _GzipStream(self.config.gzip_level)
+
+    def _compressible(self, headers: Headers) -> bool:
+        content_type = headers.get('content-type', '')
+        return ('content-encoding' not in headers
+                and self.start_message['status'] not in (204, 304)
+                and content_type.startswith(COMPRESSIBLE_TYPES))
+
+    async def send_wrapper(self, message):
+        if message['type'] == 'http.response.start':
+            # Hold the start message until the first body chunk decides the encoding
+            self.start_message = message
+            return
+        if message['type'] != 'http.response.body' or self.passthrough:
+            await self.send(message)
+            return
+
+        body = message.get('body', b'')
+        more_body = message.get('more_body', False)
+
+        if self.stream is None:
+            headers = Headers(raw=self.start_message['headers'])
+            if not self._compressible(headers) or (not more_body and len(body) < self.config.minimum_size):
+                self.passthrough = True
+                await self.send(self.start_message)
+                await self.send(message)
+                return
+            self.stream = self._new_stream()
+            mutable = MutableHeaders(raw=self.start_message['headers'])
+            mutable['Content-Encoding'] = self.encoding
+            mutable.add_vary_header('Accept-Encoding')
+            if 'etag' in mutable:
+                # A compressed representation needs its own validator
+                mutable['ETag'] = _weaken(mutable['etag'])
+            if more_body:
+                del mutable['Content-Length']
+            else:
+                compressed = self.stream.compress(body) + self.stream.finish()
+                mutable['Content-Length'] = str(len(compressed))
+                await self.send(self.start_message)
+                await self.send({'type': 'http.response.body', 'body': compressed})
+                return
+            await self.send(self.start_message)
+
+        if more_body:
+            # Flush per chunk so streamed exports reach the client incrementally
+            data = self.stream.compress(body) + self.stream.flush()
+        else:
+            data = self.stream.compress(body) + self.stream.finish()
+        await self.send({'type': 'http.response.body', 'body': data, 'more_body': more_body})
+
+
+def _weaken(etag: str) -> str:
+    return etag if etag.startswith('W/') else 'W/' + etag
+
@@ -0,0 +1,47 @@
+from email.utils import formatdate, parsedate_to_datetime
+from typing import Dict, Optional
+
+from starlette.requests import Request
+from starlette.responses import Response
+
+
+def make_etag(*parts) -> str:
+    """Weak validator built from the values a response depends on"""
+    return 'W/"' + '-'.join(str(part) for part in parts) + '"'
+
+
+def validator_headers(etag: str, last_modified_ms: Optional[int] = None) -> Dict[str, str]:
+    """ETag/Last-Modified headers; no-cache makes clients revalidate instead of reusing blindly"""
+    headers = {'ETag': etag, 'Cache-Control': 'no-cache'}
+    if last_modified_ms is not None:
+        headers['Last-Modified'] = formatdate(last_modified_ms / 1000, usegmt=True)
+    return headers
+
+
+def _opaque(tag: str) -> str:
+    tag = tag.strip()
+    return tag[2:] if tag.startswith('W/') else tag
+
+
+def is_not_modified(request: Request, etag: str, last_modified_ms: Optional[int] = None) -> bool:
+    """Evaluate If-None-Match (preferred) or If-Modified-Since against the current validators"""
+    if_none_match = request.headers.get('if-none-match')
+    if if_none_match is not None:
+        if if_none_match.strip() == '*':
+            return True
+        # Weak comparison, per RFC 7232 for If-None-Match
+        return _opaque(etag) in {_opaque(tag) for tag in if_none_match.split(',')}
+
+    if_modified_since = request.headers.get('if-modified-since')
+    if if_modified_since is None or last_modified_ms is None:
+        return False
+    try:
+        since = parsedate_to_datetime(if_modified_since).timestamp()
+    except (TypeError, ValueError):
+        return False
+    # HTTP dates have one-second resolution
+    return last_modified_ms // 1000 <= since
+
+
+def not_modified(headers: Dict[str, str]) -> Response:
+    return Response(status_code=304, headers=headers)
@@ -1,12 +1,187 @@
 import aiosqlite
 import asyncio
+import os
+import struct
+import time
 from datetime import datetime
+from typing import AsyncIterator, Dict, List, Optional, Tuple, Union
+
+from clock import clock
+from metrics import metrics
+from logging_config import get_logger
+
+log = get_logger("database")
+
+# Schema version 2 stores telemetry timestamps as epoch milliseconds and
+# door states as small integer codes; version 1 used ISO text for both.
+# Version 3 adds the sensor node to sensor_logs (0 for the single simulated room).
+SCHEMA_VERSION = 3
+DOOR_STATES = ('CLOSED', 'OPENED')
+DOOR_CODES = {name: code for code, name in enumerate(DOOR_STATES)}
+
+LOG_COLUMNS = {
+    'energy_logs': 'id, timestamp, watts',
+    'sensor_logs': 'id, timestamp, node, temperature, humidity, motion, door',
+}
+LOG_TABLES = tuple(LOG_COLUMNS)
+# Log tables holding readings from several sensor nodes
+NODE_TABLES = ('sensor_logs',)
+# Numeric columns that can be downsampled for charts
+SERIES_COLUMNS = {
+    'energy_logs': ('watts',),
+    'sensor_logs': ('temperature', 'humidity'),
+}
+
+HOUR_MS = 3600 * 1000
+# Gaps longer than this between power readings (e.g. the server was down) are not integrated
+MAX_SAMPLE_GAP_MS = 60 * 1000
+# The hourly rollup also takes imported meter history, read every 15 or 60 minutes, so it
+# bridges longer intervals; ENERGY_MAX_GAP overrides (seconds)
+DEFAULT_ROLLUP_GAP_MS = 3 * 3600 * 1000
+
+DEVICE_EVENTS_SQL = '''
+    CREATE TABLE IF NOT EXISTS device_events (
+        id INTEGER PRIMARY KEY,
+        device TEXT NOT NULL,
+        timestamp INTEGER NOT NULL,
+        state TEXT NOT NULL
+    )
+'''
+
+# One row per sampling tick; `watts` packs each device's draw as float32 in
+# channel order (see EnergyMeter), so adding a device never alters the schema
+POWER_SAMPLES_SQL = '''
+    CREATE TABLE IF NOT EXISTS power_samples (
+        timestamp INTEGER PRIMARY KEY,
+        watts BLOB NOT NULL
+    )
+'''
+
+DEVICE_METERS_SQL = '''
+    CREATE TABLE IF NOT EXISTS device_meters (
+        channel INTEGER PRIMARY KEY,
+        device TEXT NOT NULL UNIQUE,
+        energy_wh REAL NOT NULL,
+        cost REAL NOT NULL,
+        on_seconds REAL NOT NULL,
+        first_seen INTEGER,
+        updated INTEGER
+    )
+'''
+
+# Energy per hour integrated from energy_logs; `hour` is the epoch ms of the local-time hour start,
+# so tariff bands, billing months and hour-of-day averages all see whole local hours
+ENERGY_HOURLY_SQL = '''
+    CREATE TABLE IF NOT EXISTS energy_hourly (
+        hour INTEGER PRIMARY KEY,
+        wh REAL NOT NULL,
+        samples INTEGER NOT NULL
+    )
+'''
+
+# Last reading folded into each rollup; the next interval starts from it
+ROLLUP_STATE_SQL = '''
+    CREATE TABLE IF NOT EXISTS rollup_state (
+        name TEXT PRIMARY KEY,
+        timestamp INTEGER NOT NULL,
+        watts REAL NOT NULL
+    )
+'''
+
+ENERGY_LOGS_SQL = '''
+    CREATE TABLE IF NOT EXISTS energy_logs (
+        id INTEGER PRIMARY KEY,
+        timestamp INTEGER NOT NULL,
+        watts REAL NOT NULL
+    )
+'''
+
+SENSOR_LOGS_SQL = '''
+    CREATE TABLE IF NOT EXISTS sensor_logs (
+        id INTEGER PRIMARY KEY,
+        timestamp INTEGER NOT NULL,
+        temperature REAL,
+        humidity REAL,
+        motion INTEGER,
+        door INTEGER,
+        node INTEGER NOT NULL DEFAULT 0
+    )
+'''
+
+# Compressed warm-restart state of in-memory components, one row each (see snapshot.py)
+SNAPSHOTS_SQL = '''
+    CREATE TABLE IF NOT EXISTS snapshots (
+        name TEXT PRIMARY KEY,
+        saved_at INTEGER NOT NULL,
+        data BLOB NOT NULL
+    )
+'''
+
+
+def to_epoch_ms(value: Union[str, datetime, int, float]) -> int:
+    """Convert an ISO string or datetime (naive means local time) to epoch milliseconds"""
+    if isinstance(value, (int, float)):
+        return int(value)
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    return int(value.timestamp() * 1000)
+
+
+def from_epoch_ms(ms: Optional[int]) -> Optional[str]:
+    """Render epoch milliseconds as a local ISO timestamp for API responses"""
+    if ms is None:
+        return None
+    return datetime.fromtimestamp(ms / 1000).isoformat(timespec='milliseconds')
+
+
+def door_code(state: Optional[str]) -> Optional[int]:
+    return None if state is None else DOOR_CODES[state.upper()]
+
+
+def door_name(code: Optional[int]) -> Optional[str]:
+    return None if code is None else DOOR_STATES[code]
+
+
+def now_ms() -> int:
+    return clock.now_ms()
+
 
 # Database initialization and operations
 class Database:
-    def __init__(self, db_path="smart_home.db"):
+    def __init__(self, db_path="smart_home.db", migration_batch_size: int = 20000,
+                 rollup_gap_ms: int = DEFAULT_ROLLUP_GAP_MS):
         self.db_path = db_path
+        self.migration_batch_size = migration_batch_size
+        self.rollup_gap_ms = rollup_gap_ms
+        # Intervals between energy readings too long to integrate, seen by this process
+        self.rollup_gaps = {'intervals': 0, 'hours': 0.0}
+        self._rollup_lock: Optional[asyncio.Lock] = None
+
+    @classmethod
+    def from_env(cls) -> 'Database':
+        """ENERGY_MAX_GAP: longest interval between energy readings the hourly rollup integrates (seconds)"""
+        gap = os.getenv("ENERGY_MAX_GAP")
+        return cls(rollup_gap_ms=int(float(gap) * 1000) if gap else DEFAULT_ROLLUP_GAP_MS)
 
+    def _note_gaps(self, gaps: List[Tuple[int, int]]):
+        """Count and report intervals the rollup left out, so missing energy doesn't go unnoticed"""
+        if not gaps:
+            return
+        hours = sum(end - start for start, end in gaps) / HOUR_MS
+        self.rollup_gaps['intervals'] += len(gaps)
+        self.rollup_gaps['hours'] = round(self.rollup_gaps['hours'] + hours, 3)
+        metrics.inc('energy_rollup_gaps_total', len(gaps))
+        log.warning("%d energy reading intervals longer than %.1fh (%.1fh in total, first %s to %s) were "
+                    "not costed - set ENERGY_MAX_GAP to bridge them", len(gaps), self.rollup_gap_ms / HOUR_MS,
+                    hours, from_epoch_ms(gaps[0][0]), from_epoch_ms(gaps[0][1]))
+
+    def _rollup_guard(self) -> asyncio.Lock:
+        # Created on first use so it belongs to the running event loop
+        if self._rollup_lock is None:
+            self._rollup_lock = asyncio.Lock()
+        return self._rollup_lock
+
+    @metrics.timed('db_query_duration_seconds')
     async def init_db(self):
         async with aiosqlite.connect(self.db_path) as db:
             # Create devices table
@@ -18,26 +193,32 @@ class Database:
                 )
             ''')
 
-            # Create energy logs table
-            await db.execute('''
-                CREATE TABLE IF NOT EXISTS energy_logs (
-                    id INTEGER PRIMARY KEY,
-                    timestamp DATETIME NOT NULL,
-                    watts REAL NOT NULL
-                )
-            ''')
-            
-            # Create sensor logs table
-            await db.execute('''
-                CREATE TABLE IF NOT EXISTS sensor_logs (
-                    id INTEGER PRIMARY KEY,
-                    timestamp DATETIME NOT NULL,
-                    temperature REAL,
-                    humidity REAL,
-                    motion INTEGER,
-                    door TEXT
-                )
-            ''')
+            # Create telemetry tables, upgrading version 1 text-timestamp tables in place
+            await self._migrate_to_v2(db)
+            await db.execute(ENERGY_LOGS_SQL)
+            await db.execute(SENSOR_LOGS_SQL)
+            await self._migrate_to_v3(db)
+            await db.execute(f'PRAGMA user_version = {SCHEMA_VERSION}')
+
+            # Range scans and history exports read these tables by time; sensor history by node and time
+            await db.execute('CREATE INDEX IF NOT EXISTS idx_energy_logs_timestamp ON energy_logs (timestamp)')
+            await db.execute('CREATE INDEX IF NOT EXISTS idx_sensor_logs_timestamp ON sensor_logs (timestamp)')
+            await db.execute('CREATE INDEX IF NOT EXISTS idx_sensor_logs_node_ts ON sensor_logs (node, timestamp)')
+
+            # Append-only history of device state changes, read per device by time
+            await db.execute(DEVICE_EVENTS_SQL)
+            await db.execute('CREATE INDEX IF NOT EXISTS idx_device_events_device_ts ON device_events (device, timestamp)')
+
+            # Hourly energy rollup used for tariff costing
+            await db.execute(ENERGY_HOURLY_SQL)
+            await db.execute(ROLLUP_STATE_SQL)
+            await self._realign_energy_hourly(db)
+
+            # Per-device power samples and the running meter totals derived from them
+            await db.execute(POWER_SAMPLES_SQL)
+            await db.execute(DEVICE_METERS_SQL)
+
+            await db.execute(SNAPSHOTS_SQL)
 
             # Initialize default devices if not exists
             async with db.execute('SELECT COUNT(*) FROM devices') as cursor:
@@ -47,31 +228,152 @@ class Database:
                         'INSERT INTO devices (name, state) VALUES (?, ?)',
                         [('fan', 'OFF'), ('light', 'OFF')]
                     )
+
+            # Give devices without history a starting event so point-in-time queries have a baseline
+            await db.execute(
+                'INSERT INTO device_events (device, timestamp, state) '
+                'SELECT name, ?, state FROM devices WHERE name NOT IN (SELECT device FROM device_events)',
+                (now_ms(),)
+            )
             
             await db.commit()
 
+    @metrics.timed('db_query_duration_seconds')
     async def update_device_state(self, device_name: str, new_state: str):
         async with aiosqlite.connect(self.db_path) as db:
             await db.execute(
                 'UPDATE devices SET state = ? WHERE name = ?',
                 (new_state, device_name)
             )
+            # Recorded in the same transaction, so history never disagrees with current state
+            await db.execute(
+                'INSERT INTO device_events (device, timestamp, state) VALUES (?, ?, ?)',
+                (device_name, now_ms(), new_state)
+            )
+            await db.commit()
+
+    @metrics.timed('db_query_duration_seconds')
+    async def update_device_states(self, changes: List[Tuple[str, str]]):
+        """Apply several (device, state) changes, in order, in one transaction"""
+        timestamp = now_ms()
+        async with aiosqlite.connect(self.db_path) as db:
+            await db.executemany('UPDATE devices SET state = ? WHERE name = ?',
+                                 [(state, device) for device, state in changes])
+            await db.executemany('INSERT INTO device_events (device, timestamp, state) VALUES (?, ?, ?)',
+                                 [(device, timestamp, state) for device, state in changes])
+            await db.commit()
+
+    @metrics.timed('db_query_duration_seconds')
+    async def get_snapshots(self) -> Dict[str, bytes]:
+        async with aiosqlite.connect(self.db_path) as db:
+            async with db.execute('SELECT name, data FROM snapshots') as cursor:
+                return {name: data for name, data in await cursor.fetchall()}
+
+    @metrics.timed('db_query_duration_seconds')
+    async def save_snapshots(self, snapshots: List[Tuple[str, bytes]]):
+        """Replace the stored snapshot of each named component, in one transaction"""
+        timestamp = now_ms()
+        async with aiosqlite.connect(self.db_path) as db:
+            await db.executemany('INSERT OR REPLACE INTO snapshots (name, saved_at, data) VALUES (?, ?, ?)',
+                                 [(name, timestamp, data) for name, data in snapshots])
             await db.commit()
 
+    @metrics.timed('db_query_duration_seconds')
+    async def get_device_states_at(self, at: int) -> List[dict]:
+        """
+        State of every device with recorded events as of `at` (epoch ms). Device
+        names are walked with a skip-scan over the (device, timestamp) index and
+        each device costs one index seek, so this never scans the event log.
+        """
+        async with aiosqlite.connect(self.db_path) as db:
+            db.row_factory = aiosqlite.Row
+            async with db.execute('''
+                WITH RECURSIVE names(device) AS (
+                    SELECT MIN(device) FROM device_events
+                    UNION ALL
+                    SELECT (SELECT MIN(device) FROM device_events WHERE device > names.device)
+                    FROM names WHERE names.device IS NOT NULL
+                )
+                SELECT names.device AS device, e.state AS state, e.timestamp AS since
+                FROM names
+                JOIN device_events e ON e.id = (
+                    SELECT id FROM device_events
+                    WHERE device = names.device AND timestamp <= ?
+                    ORDER BY timestamp DESC, id DESC LIMIT 1
+                )
+            ''', (at,)) as cursor:
+                return [
+                    {'device': row['device'], 'state': row['state'], 'since': from_epoch_ms(row['since'])}
+                    for row in await cursor.fetchall()
+                ]
+
+    @metrics.timed('db_query_duration_seconds')
+    async def get_device_events(self, device: str, start: int, end: int) -> List[tuple]:
+        """(timestamp_ms, state) events for a device in [start, end), preceded by the state in force at `start`"""
+        async with aiosqlite.connect(self.db_path) as db:
+            async with db.execute(
+                'SELECT timestamp, state FROM device_events WHERE device = ? AND timestamp <= ? '
+                'ORDER BY timestamp DESC, id DESC LIMIT 1',
+                (device, start)
+            ) as cursor:
+                initial = await cursor.fetchone()
+            async with db.execute(
+                'SELECT timestamp, state FROM device_events WHERE device = ? AND timestamp > ? AND timestamp < ? '
+                'ORDER BY timestamp, id',
+                (device, start, end)
+            ) as cursor:
+                events = await cursor.fetchall()
+        return ([(start, initial[1])] if initial else []) + list(events)
+
+    @metrics.timed('db_query_duration_seconds')
     async def get_device_states(self):
         async with aiosqlite.connect(self.db_path) as db:
             db.row_factory = aiosqlite.Row
             async with db.execute('SELECT * FROM devices') as cursor:
                 return [dict(row) for row in await cursor.fetchall()]
 
+    @metrics.timed('db_query_duration_seconds')
     async def log_energy_usage(self, watts: float):
         async with aiosqlite.connect(self.db_path) as db:
             await db.execute(
                 'INSERT INTO energy_logs (timestamp, watts) VALUES (?, ?)',
-                (datetime.now().isoformat(), watts)
+                (now_ms(), watts)
             )
             await db.commit()
 
+    @metrics.timed('db_query_duration_seconds')
+    async def log_power_sample(self, timestamp: int, watts: bytes, meters: List[tuple]):
+        """Store a packed per-device power sample and the meter totals that changed with it in one transaction"""
+        async with aiosqlite.connect(self.db_path) as db:
+            await db.execute('INSERT OR REPLACE INTO power_samples (timestamp, watts) VALUES (?, ?)', (timestamp, watts))
+            await db.executemany(
+                'INSERT OR REPLACE INTO device_meters (channel, device, energy_wh, cost, on_seconds, first_seen, updated) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?)',
+                meters
+            )
+            await db.commit()
+
+    @metrics.timed('db_query_duration_seconds')
+    async def get_device_meters(self) -> List[tuple]:
+        async with aiosqlite.connect(self.db_path) as db:
+            async with db.execute(
+                'SELECT channel, device, energy_wh, cost, on_seconds, first_seen, updated FROM device_meters'
+            ) as cursor:
+                return await cursor.fetchall()
+
+    @metrics.timed('db_query_duration_seconds')
+    async def get_power_series(self, channel: int, start: int, end: int) -> List[tuple]:
+        """(timestamp_ms, watts) for one channel, sliced out of the packed samples in SQL"""
+        async with aiosqlite.connect(self.db_path) as db:
+            async with db.execute(
+                'SELECT timestamp, substr(watts, ?, 4) FROM power_samples '
+                'WHERE timestamp >= ? AND timestamp < ? AND length(watts) >= ? ORDER BY timestamp',
+                (channel * 4 + 1, start, end, channel * 4 + 4)
+            ) as cursor:
+                rows = await cursor.fetchall()
+        return [(ts, struct.unpack('f', value)[0]) for ts, value in rows]
+
+    @metrics.timed('db_query_duration_seconds')
     async def get_latest_energy_logs(self, limit: int = 10):
         async with aiosqlite.connect(self.db_path) as db:
             db.row_factory = aiosqlite.Row
@@ -79,23 +381,155 @@ class Database:
                 'SELECT * FROM energy_logs ORDER BY timestamp DESC LIMIT ?',
                 (limit,)
             ) as cursor:
-                return [dict(row) for row in await cursor.fetchall()]
+                return [
+                    {'id': row['id'], 'timestamp': from_epoch_ms(row['timestamp']), 'watts': row['watts']}
+                    for row in await cursor.fetchall()
+                ]
     
-    async def log_sensor_data(self, sensor_data: dict):
-        """Log sensor readings to database"""
+    @metrics.timed('db_query_duration_seconds')
+    async def refresh_energy_hourly(self, batch_size: int = 50000) -> Optional[Tuple[int, int]]:
+        """
+        Fold energy logs newer than the last rolled-up reading into energy_hourly.
+        Returns the (first, last) hour touched, or None if nothing was new.
+        """
+        touched = None
+        async with self._rollup_guard(), aiosqlite.connect(self.db_path) as db:
+            async with db.execute("SELECT timestamp, watts FROM rollup_state WHERE name = 'energy'") as cursor:
+                prev = await cursor.fetchone()
+            while True:
+                async with db.execute(
+                    'SELECT timestamp, watts FROM energy_logs WHERE timestamp > ? ORDER BY timestamp LIMIT ?',
+                    (prev[0] if prev else -1, batch_size)
+                ) as cursor:
+                    rows = await cursor.fetchall()
+                if not rows:
+                    break
+                hours, prev, gaps = integrate_hourly(rows, prev, self.rollup_gap_ms)
+                self._note_gaps(gaps)
+                await db.executemany(
+                    'INSERT INTO energy_hourly (hour, wh, samples) VALUES (?, ?, ?) '
+                    'ON CONFLICT(hour) DO UPDATE SET wh = wh + excluded.wh, samples = samples + excluded.samples',
+                    [(hour, wh, samples) for hour, (wh, samples) in hours.items()]
+                )
+                await db.execute(
+                    "INSERT OR REPLACE INTO rollup_state (name, timestamp, watts) VALUES ('energy', ?, ?)", prev
+                )
+                await db.commit()
+                if hours:
+                    low, high = min(hours), max(hours)
+                    touched = (low, high) if touched is None else (min(touched[0], low), max(touched[1], high))
+        return touched
+
+    @metrics.timed('db_query_duration_seconds')
+    async def rebuild_energy_hourly(self, start: int, end: int) -> Optional[Tuple[int, int]]:
+        """
+        Recompute the rollup hours covering [start, end] from energy_logs, for
+        history loaded behind the incremental cursor. Readings past the cursor
+        are left for refresh_energy_hourly. Returns the hours rebuilt.
+        """
+        async with self._rollup_guard(), aiosqlite.connect(self.db_path) as db:
+            async with db.execute("SELECT timestamp FROM rollup_state WHERE name = 'energy'") as cursor:
+                state = await cursor.fetchone()
+            if state is None or start > state[0]:
+                return None
+            first_hour = local_hour_start(start)
+            last_hour = local_hour_start(min(end, state[0]))
+
+            async with db.execute(
+                'SELECT timestamp, watts FROM energy_logs WHERE timestamp >= ? AND timestamp <= ? ORDER BY timestamp',
+                (first_hour - self.rollup_gap_ms, state[0])
+            ) as cursor:
+                rows = await cursor.fetchall()
+            hours, _, gaps = integrate_hourly(rows, None, self.rollup_gap_ms, first_hour, last_hour)
+            self._note_gaps(gaps)
+            await db.execute('DELETE FROM energy_hourly WHERE hour >= ? AND hour <= ?', (first_hour, last_hour))
+            await db.executemany(
+                'INSERT INTO energy_hourly (hour, wh, samples) VALUES (?, ?, ?)',
+                [(hour, wh, samples) for hour, (wh, samples) in hours.items()]
+            )
+            await db.commit()
+        return first_hour, last_hour
+
+    @metrics.timed('db_query_duration_seconds')
+    async def get_energy_hourly(self, start: int, end: int) -> List[tuple]:
+        """(hour_ms, wh) rollup rows with start <= hour < end"""
+        async with aiosqlite.connect(self.db_path) as db:
+            async with db.execute(
+                'SELECT hour, wh FROM energy_hourly WHERE hour >= ? AND hour < ? ORDER BY hour', (start, end)
+            ) as cursor:
+                return await cursor.fetchall()
+
+    @metrics.timed('db_query_duration_seconds')
+    async def get_latest_energy_rows(self, limit: int = 10) -> List[tuple]:
+        """Latest energy logs as raw (id, timestamp_ms, watts) tuples"""
+        async with aiosqlite.connect(self.db_path) as db:
+            async with db.execute(
+                'SELECT id, timestamp, watts FROM energy_logs ORDER BY timestamp DESC LIMIT ?',
+                (limit,)
+            ) as cursor:
+                return await cursor.fetchall()
+
+    @metrics.timed('db_query_duration_seconds')
+    async def get_log_version(self, table: str) -> tuple:
+        """(MAX(id), MAX(timestamp)) of a log table - two index lookups, used as cache validators"""
+        if table not in LOG_TABLES:
+            raise ValueError(f"Unknown log table '{table}'")
+        async with aiosqlite.connect(self.db_path) as db:
+            async with db.execute(
+                f'SELECT (SELECT MAX(id) FROM {table}), (SELECT MAX(timestamp) FROM {table})'
+            ) as cursor:
+                return tuple(await cursor.fetchone())
+
+    @metrics.timed('db_query_duration_seconds')
+    async def get_rows_since(self, table: str, cursor: int, limit: int) -> List[tuple]:
+        """Rows with id greater than `cursor`, oldest first - a primary key range scan"""
+        if table not in LOG_COLUMNS:
+            raise ValueError(f"Unknown log table '{table}'")
+        async with aiosqlite.connect(self.db_path) as db:
+            async with db.execute(
+                f'SELECT {LOG_COLUMNS[table]} FROM {table} WHERE id > ? ORDER BY id LIMIT ?',
+                (cursor, limit)
+            ) as rows:
+                return await rows.fetchall()
+
+    @metrics.timed('db_query_duration_seconds')
+    async def log_sensor_data(self, reading):
+        """Log a sensor reading (records.SensorReading) to database"""
         async with aiosqlite.connect(self.db_path) as db:
             await db.execute(
-                'INSERT INTO sensor_logs (timestamp, temperature, humidity, motion, door) VALUES (?, ?, ?, ?, ?)',
+                'INSERT INTO sensor_logs (timestamp, node, temperature, humidity, motion, door) VALUES (?, ?, ?, ?, ?, ?)',
                 (
-                    sensor_data['timestamp'],
-                    sensor_data['temperature'],
-                    sensor_data['humidity'],
-                    1 if sensor_data['motion'] else 0,
-                    sensor_data['door']
+                    reading.timestamp,
+                    reading.node,
+                    reading.temperature,
+                    reading.humidity,
+                    1 if reading.motion else 0,
+                    door_code(reading.door)
                 )
             )
             await db.commit()
     
+    @metrics.timed('db_query_duration_seconds')
+    async def log_sensor_data_batch(self, readings: list):
+        """Log many sensor readings (records.SensorReading) in a single transaction"""
+        async with aiosqlite.connect(self.db_path) as db:
+            await db.executemany(
+                'INSERT INTO sensor_logs (timestamp, node, temperature, humidity, motion, door) VALUES (?, ?, ?, ?, ?, ?)',
+                [
+                    (
+                        r.timestamp,
+                        r.node,
+                        r.temperature,
+                        r.humidity,
+                        1 if r.motion else 0,
+                        door_code(r.door)
+                    )
+                    for r in readings
+                ]
+            )
+            await db.commit()
+    
+    @metrics.timed('db_query_duration_seconds')
     async def get_latest_sensor_logs(self, limit: int = 10):
         """Get latest sensor readings"""
         async with aiosqlite.connect(self.db_path) as db:
@@ -104,4 +538,316 @@ class Database:
                 'SELECT * FROM sensor_logs ORDER BY timestamp DESC LIMIT ?',
                 (limit,)
             ) as cursor:
-                return [dict(row) for row in await cursor.fetchall()]
\ No newline at end of file
+                return [sensor_row_to_dict(row) for row in await cursor.fetchall()]
+
+    @metrics.timed('db_query_duration_seconds')
+    async def get_latest_sensor_rows(self, limit: int = 10, node: Optional[int] = None) -> List[tuple]:
+        """Latest sensor logs (of one node if given) as raw LOG_COLUMNS tuples, door as its code"""
+        where, params = ('WHERE node = ? ', (node, limit)) if node is not None else ('', (limit,))
+        async with aiosqlite.connect(self.db_path) as db:
+            async with db.execute(
+                f'SELECT {LOG_COLUMNS["sensor_logs"]} FROM sensor_logs {where}ORDER BY timestamp DESC LIMIT ?',
+                params
+            ) as cursor:
+                return await cursor.fetchall()
+
+    @metrics.timed('db_query_duration_seconds')
+    async def get_sensor_series(self, start: int, end: int, step: int, node: int = 0) -> List[dict]:
+        """
+        Reconstruct one node's sensor readings at every `step` ms in [start, end).
+        Rows are only persisted on change or heartbeat, so each sample carries
+        the last row at or before its time (None before the first row).
+        """
+        columns = LOG_COLUMNS['sensor_logs']
+        async with aiosqlite.connect(self.db_path) as db:
+            db.row_factory = aiosqlite.Row
+            async with db.execute(
+                f'SELECT {columns} FROM sensor_logs WHERE node = ? AND timestamp <= ? '
+                'ORDER BY timestamp DESC, id DESC LIMIT 1',
+                (node, start)
+            ) as cursor:
+                current = await cursor.fetchone()
+            async with db.execute(
+                f'SELECT {columns} FROM sensor_logs WHERE node = ? AND timestamp > ? AND timestamp < ? '
+                'ORDER BY timestamp, id',
+                (node, start, end)
+            ) as cursor:
+                rows = await cursor.fetchall()
+
+        series = []
+        i = 0
+        for t in range(start, end, step):
+            while i < len(rows) and rows[i]['timestamp'] <= t:
+                current = rows[i]
+                i += 1
+            sample = sensor_row_to_dict(current) if current is not None else {
+                'id': None, 'node': node, 'temperature': None, 'humidity': None, 'motion': None, 'door': None}
+            sample['recorded_at'] = sample.pop('timestamp', None)
+            sample['timestamp'] = from_epoch_ms(t)
+            series.append(sample)
+        return series
+
+    @metrics.timed('db_query_duration_seconds')
+    async def get_downsampled(self, table: str, start: int, end: int, points: int, method: str = 'lttb',
+                              chunk_size: int = 20000, node: Optional[int] = None) -> Dict[str, Tuple[List[int], List[float]]]:
+        """
+        At most `points` (timestamp_ms, value) points per numeric column of a log
+        table over [start, end), chosen by `method` ('lttb' or 'minmax'; see
+        downsample.py), for one `node` of sensor_logs. A GROUP BY over the
+        timestamp index gives per-bucket counts and means, then one chunked scan
+        selects the points.
+        """
+        import numpy as np
+        from downsample import LTTBBuckets, MinMaxBuckets, RawPoints, bucket_count
+
+        columns = SERIES_COLUMNS.get(table)
+        if columns is None:
+            raise ValueError(f"Unknown log table '{table}'")
+        if (node is not None) != (table in NODE_TABLES):
+            raise ValueError(f"{table} needs a node" if node is None else f"{table} has no node column")
+        node_filter, node_params = ('node = ? AND ', (node,)) if node is not None else ('', ())
+        buckets = bucket_count(method, points)
+        means = ', '.join(f'COUNT({c}), AVG(CASE WHEN {c} IS NOT NULL THEN timestamp END), AVG({c})'
+                          for c in columns)
+        async with aiosqlite.connect(self.db_path) as db:
+            async with db.execute(
+                f'SELECT (timestamp - ?) * ? / ? AS bucket, {means} FROM {table} '
+                f'WHERE {node_filter}timestamp >= ? AND timestamp < ? GROUP BY bucket',
+                (start, buckets, max(end - start, 1), *node_params, start, end)
+            ) as cursor:
+                stats = await cursor.fetchall()
+
+        samplers = {}
+        for i, column in enumerate(columns):
+            count = sum(row[1 + 3 * i] for row in stats)
+            if count <= points:
+                samplers[column] = RawPoints()
+            elif method == 'minmax':
+                samplers[column] = MinMaxBuckets(start, end, buckets)
+            else:
+                mean_t, mean_v = np.full(buckets, np.nan), np.full(buckets, np.nan)
+                for row in stats:
+                    if row[1 + 3 * i]:
+                        mean_t[row[0]], mean_v[row[0]] = row[2 + 3 * i], row[3 + 3 * i]
+                samplers[column] = LTTBBuckets(start, end, buckets, mean_t, mean_v)
+
+        if stats:
+            async for chunk in self._iter_rows(table, 'id, timestamp, ' + ', '.join(columns), start, end,
+                                               chunk_size, node):
+                data = np.array(chunk, dtype=np.float64)
+                ts = data[:, 1].astype(np.int64)
+                for i, column in enumerate(columns):
+                    samplers[column].add(ts, data[:, 2 + i])
+        return {column: sampler.points() for column, sampler in samplers.items()}
+
+    async def iter_energy_logs(self, start: Optional[int] = None, end: Optional[int] = None,
+                               chunk_size: int = 5000) -> AsyncIterator[List[tuple]]:
+        """Stream energy log rows as tuples (id, timestamp_ms, watts) in chunks"""
+        async for chunk in self._iter_rows('energy_logs', 'id, timestamp, watts', start, end, chunk_size):
+            yield chunk
+
+    async def iter_sensor_logs(self, start: Optional[int] = None, end: Optional[int] = None,
+                               chunk_size: int = 5000) -> AsyncIterator[List[tuple]]:
+        """Stream sensor log rows as tuples (id, timestamp_ms, node, temperature, humidity, motion, door_code) in chunks"""
+        async for chunk in self._iter_rows('sensor_logs', LOG_COLUMNS['sensor_logs'], start, end, chunk_size):
+            yield chunk
+
+    async def _iter_rows(self, table: str, columns: str, start: Optional[int], end: Optional[int],
+                         chunk_size: int, node: Optional[int] = None) -> AsyncIterator[List[tuple]]:
+        """
+        Walk a log table in timestamp order, holding one chunk in memory.
+        `columns` must start with `id, timestamp`. Each chunk is its own short
+        keyset query, resuming after the last (timestamp, id) read, so no read
+        stays open between chunks to block writers while a slow client
+        consumes the stream.
+        """
+        where, params = [], []
+        if node is not None:
+            where.append('node = ?')
+            params.append(node)
+        if start is not None:
+            where.append('timestamp >= ?')
+            params.append(start)
+        if end is not None:
+            where.append('timestamp < ?')
+            params.append(end)
+        first_sql = f"SELECT {columns} FROM {table}"
+        if where:
+            first_sql += ' WHERE ' + ' AND '.join(where)
+        next_sql = f"SELECT {columns} FROM {table} WHERE " + ' AND '.join(where + ['(timestamp, id) > (?, ?)'])
+        order = ' ORDER BY timestamp, id LIMIT ?'
+
+        async with aiosqlite.connect(self.db_path) as db:
+            sql, key = first_sql, ()
+            while True:
+                async with db.execute(sql + order, (*params, *key, chunk_size)) as cursor:
+                    rows = await cursor.fetchall()
+                if not rows:
+                    break
+                yield rows
+                if len(rows) < chunk_size:
+                    break
+                sql, key = next_sql, (rows[-1][1], rows[-1][0])
+
+    async def _migrate_to_v2(self, db):
+        """
+        Rewrite version 1 telemetry tables (ISO text timestamps, text door states)
+        into the compact version 2 layout, one batch per transaction. An
+        interrupted migration resumes from the last copied id on next start.
+        """
+        async with db.execute('PRAGMA user_version') as cursor:
+            version = (await cursor.fetchone())[0]
+        if version >= 2:
+            return
+
+        tables = [
+            ('energy_logs', ENERGY_LOGS_SQL, 'id, timestamp, watts', _convert_energy_v1),
+            ('sensor_logs', SENSOR_LOGS_SQL, 'id, timestamp, temperature, humidity, motion, door', _convert_sensor_v1),
+        ]
+        migrated = False
+        for table, create_sql, columns, convert in tables:
+            async with db.execute(
+                "SELECT name FROM sqlite_master WHERE type = 'table' AND name IN (?, ?)", (table, f'{table}_v1')
+            ) as cursor:
+                existing = {row[0] for row in await cursor.fetchall()}
+
+            if f'{table}_v1' not in existing:
+                if table not in existing:
+                    continue
+                async with db.execute(f'PRAGMA table_info({table})') as cursor:
+                    column_types = {row[1]: row[2].upper() for row in await cursor.fetchall()}
+                if column_types.get('timestamp') == 'INTEGER':
+                    continue
+                # Old index would follow the renamed table and block the new one's name
+                await db.execute(f'DROP INDEX IF EXISTS idx_{table}_timestamp')
+                await db.execute(f'ALTER TABLE {table} RENAME TO {table}_v1')
+                await db.execute(create_sql)
+                await db.commit()
+
+            started = time.perf_counter()
+            copied = skipped = 0
+            async with db.execute(f'SELECT COALESCE(MAX(id), 0) FROM {table}') as cursor:
+                last_id = (await cursor.fetchone())[0]
+            placeholders = ', '.join('?' * len(columns.split(',')))
+            while True:
+                async with db.execute(
+                    f'SELECT {columns} FROM {table}_v1 WHERE id > ? ORDER BY id LIMIT ?',
+                    (last_id, self.migration_batch_size)
+                ) as cursor:
+                    rows = await cursor.fetchall()
+                if not rows:
+                    break
+                converted = []
+                for row in rows:
+                    try:
+                        converted.append(convert(row))
+                    except (TypeError, ValueError, KeyError):
+                        skipped += 1
+                await db.executemany(f'INSERT INTO {table} ({columns}) VALUES ({placeholders})', converted)
+                await db.commit()
+                copied += len(converted)
+                last_id = rows[-1][0]
+
+            await db.execute(f'DROP TABLE {table}_v1')
+            await db.commit()
+            migrated = True
+            log.info("Migrated %s to schema v2: %d rows in %.1fs (%d unreadable rows skipped)",
+                     table, copied, time.perf_counter() - started, skipped)
+
+        if migrated:
+            # Return the space freed by the text columns to the filesystem
+            await db.commit()
+            await db.execute('VACUUM')
+
+
+    async def _realign_energy_hourly(self, db):
+        """
+        Drop a rollup bucketed on other hour boundaries (UTC hours from earlier
+        versions, or a different time zone) so it is rebuilt from energy_logs
+        on the next refresh.
+        """
+        async with db.execute('SELECT hour FROM energy_hourly ORDER BY hour DESC LIMIT 1') as cursor:
+            row = await cursor.fetchone()
+        if row is not None and local_hour_start(row[0]) != row[0]:
+            await db.execute('DELETE FROM energy_hourly')
+            await db.execute("DELETE FROM rollup_state WHERE name = 'energy'")
+            log.info("Energy rollup is not on local hour boundaries; rebuilding it from energy logs")
+
+    async def _migrate_to_v3(self, db):
+        """Add the node column to a version 2 sensor_logs table; existing rows belong to node 0"""
+        async with db.execute('PRAGMA table_info(sensor_logs)') as cursor:
+            columns = {row[1] for row in await cursor.fetchall()}
+        if 'node' not in columns:
+            await db.execute('ALTER TABLE sensor_logs ADD COLUMN node INTEGER NOT NULL DEFAULT 0')
+            log.info("Migrated sensor_logs to schema v3 (node column)")
+
+
+def _convert_energy_v1(row) -> tuple:
+    return (row[0], to_epoch_ms(row[1]), row[2])
+
+
+def _convert_sensor_v1(row) -> tuple:
+    return (row[0], to_epoch_ms(row[1]), row[2], row[3], row[4], door_code(row[5]))
+
+
+def local_hour_start(ms: int) -> int:
+    """Epoch ms of the start of the local-time hour containing `ms` (zones may be offset by half hours)"""
+    offset = time.localtime(ms // 1000).tm_gmtoff * 1000
+    return ms - (ms + offset) % HOUR_MS
+
+
+def integrate_hourly(rows: List[tuple], prev: Optional[tuple], max_gap_ms: int = DEFAULT_ROLLUP_GAP_MS,
+                     first_hour: Optional[int] = None,
+                     last_hour: Optional[int] = None) -> Tuple[Dict[int, list], Optional[tuple], List[Tuple[int, int]]]:
+    """
+    Integrate time-ordered (timestamp_ms, watts) readings into {hour_ms: [wh, samples]}.
+    Each interval is charged at the earlier reading's power, split across the hours
+    it spans, and counted as a sample in the hour the earlier reading falls in.
+    Intervals longer than `max_gap_ms` count as no data and are returned as gaps.
+    Hours outside [first_hour, last_hour] are dropped. Returns the sums, the last
+    reading and the (start, end) gaps.
+    """
+    hours: Dict[int, list] = {}
+    gaps: List[Tuple[int, int]] = []
+    for ts, watts in rows:
+        if prev is not None:
+            start = prev[0]
+            if ts - start > max_gap_ms:
+                gaps.append((start, ts))
+            elif ts > start:
+                counted = False
+                while start < ts:
+                    hour = local_hour_start(start)
+                    stop = min(ts, hour + HOUR_MS)
+                    if first_hour is None or first_hour <= hour <= last_hour:
+                        bucket = hours.get(hour)
+                        if bucket is None:
+                            bucket = hours[hour] = [0.0, 0]
+                        bucket[0] += prev[1] * (stop - start) / HOUR_MS
+                        if not counted:
+                            bucket[1] += 1
+                    counted = True
+                    start = stop
+        prev = (ts, watts)
+    return hours, prev, gaps
+
+
+def state_durations(events: List[tuple], end: int) -> dict:
+    """Milliseconds spent in each state, given time-ordered (timestamp_ms, state) events up to `end`"""
+    totals = {}
+    for (ts, state), (next_ts, _) in zip(events, events[1:] + [(end, None)]):
+        totals[state] = totals.get(state, 0) + max(0, next_ts - ts)
+    return totals
+
+
+def sensor_row_to_dict(row) -> dict:
+    """API representation of a sensor_logs row"""
+    return {
+        'id': row['id'],
+        'timestamp': from_epoch_ms(row['timestamp']),
+        'node': row['node'],
+        'temperature': row['temperature'],
+        'humidity': row['humidity'],
+        'motion': row['motion'],
+        'door': door_name(row['door'])
+    }
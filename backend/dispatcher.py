@@ -0,0 +1,137 @@
+import asyncio
+import itertools
+import os
+from typing import Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+from clock import clock
+from metrics import metrics
+from logging_config import get_logger
+
+log = get_logger("dispatcher")
+
+# Lower runs first
+PRIORITIES = {'security': 0, 'user': 1, 'schedule': 2}
+PRIORITY_NAMES = {value: name for name, value in PRIORITIES.items()}
+
+
+class _Action:
+    __slots__ = ('priority', 'seq', 'device', 'state', 'publish', 'future', 'queued')
+
+    def __init__(self, priority: int, seq: int, device: str, state: str, publish: bool, future: asyncio.Future):
+        self.priority = priority
+        self.seq = seq
+        self.device = device
+        self.state = state
+        self.publish = publish
+        self.future = future
+        self.queued = clock.monotonic()
+
+    def __lt__(self, other: '_Action') -> bool:
+        return (self.priority, self.seq) < (other.priority, other.seq)
+
+
+class ActionDispatcher:
+    """
+    Applies device actions through a bounded pool of workers. Queued actions
+    are served by priority class (security, then user, then schedule), in
+    arrival order within a class. A worker takes up to `batch_size` queued
+    actions at a time and hands them to `apply_batch` together, which persists
+    them in one transaction, so an evening scene of hundreds of scheduled
+    actions costs a few writes instead of one each. Actions for a device never
+    run concurrently: one whose device is in another worker's batch waits for
+    that batch to finish.
+    """
+
+    def __init__(self, apply_batch: Callable[[List[Tuple[str, str, bool]]], Awaitable[List[Dict]]],
+                 workers: int = 4, batch_size: int = 100):
+        self.apply_batch = apply_batch
+        self.workers = workers
+        self.batch_size = batch_size
+        self.queue: Optional[asyncio.PriorityQueue] = None
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self.tasks: List[asyncio.Task] = []
+        self.busy: Set[str] = set()
+        self.deferred: Dict[str, List[_Action]] = {}
+        self.seq = itertools.count()
+        self.counts = {'actions': 0, 'batches': 0, 'failed': 0}
+
+    @classmethod
+    def from_env(cls, apply_batch) -> 'ActionDispatcher':
+        """DISPATCH_WORKERS (default 4), DISPATCH_BATCH (max actions per write, default 100)"""
+        return cls(apply_batch, workers=int(os.getenv("DISPATCH_WORKERS", "4")),
+                   batch_size=int(os.getenv("DISPATCH_BATCH", "100")))
+
+    def _start(self):
+        # The queue and workers belong to the running loop, so they are created on first use
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.PriorityQueue()
+        self.busy.clear()
+        self.deferred.clear()
+        self.tasks = [self.loop.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def submit(self, device: str, state: str, priority: str = 'user', publish: bool = True) -> Dict:
+        """Queue an action and wait for its hardware response"""
+        if self.loop is not asyncio.get_running_loop():
+            self._start()
+        action = _Action(PRIORITIES[priority], next(self.seq), device, state, publish, self.loop.create_future())
+        self.queue.put_nowait(action)
+        return await action.future
+
+    def _take(self, action: _Action, batch: List[_Action], devices: Set[str]):
+        if action.device in self.busy and action.device not in devices:
+            self.deferred.setdefault(action.device, []).append(action)
+        else:
+            self.busy.add(action.device)
+            devices.add(action.device)
+            batch.append(action)
+
+    async def _worker(self):
+        while True:
+            batch: List[_Action] = []
+            devices: Set[str] = set()
+            self._take(await self.queue.get(), batch, devices)
+            while len(batch) < self.batch_size and not self.queue.empty():
+                self._take(self.queue.get_nowait(), batch, devices)
+            if not batch:
+                continue
+
+            now = clock.monotonic()
+            for action in batch:
+                metrics.observe("device_action_queue_seconds", now - action.queued,
+                                priority=PRIORITY_NAMES[action.priority])
+            try:
+                results = await self.apply_batch([(a.device, a.state, a.publish) for a in batch])
+                for action, result in zip(batch, results):
+                    if not action.future.done():
+                        action.future.set_result(result)
+            except Exception as e:
+                log.exception("Applying %d device actions failed: %s", len(batch), e)
+                self.counts['failed'] += len(batch)
+                for action in batch:
+                    if not action.future.done():
+                        action.future.set_exception(e)
+            self.counts['actions'] += len(batch)
+            self.counts['batches'] += 1
+            metrics.inc("device_action_batches_total")
+
+            # Release the devices and requeue actions that were waiting on them
+            for device in devices:
+                self.busy.discard(device)
+                for waiting in self.deferred.pop(device, ()):
+                    self.queue.put_nowait(waiting)
+
+    def queue_depth(self) -> int:
+        return self.queue.qsize() if self.queue is not None else 0
+
+    def get_stats(self) -> Dict:
+        batches = self.counts['batches']
+        return {
+            'workers': self.workers,
+            'batch_size': self.batch_size,
+            'queued': self.queue_depth(),
+            'actions': self.counts['actions'],
+            'batches': batches,
+            'mean_batch': round(self.counts['actions'] / batches, 1) if batches else None,
+            'failed': self.counts['failed'],
+        }
+
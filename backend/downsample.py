@@ -0,0 +1,175 @@
+"""
+Chart downsampling of a time range of log rows to a bounded number of points,
+fed one chunk of rows at a time so memory depends on the number of points,
+not the length of the range. The range [start, end) is cut into equal time
+buckets:
+
+- MinMaxBuckets keeps each bucket's lowest and highest sample (two points per
+  bucket), so spikes always survive.
+- LTTBBuckets (Largest-Triangle-Three-Buckets) keeps one sample per bucket,
+  the one forming the largest triangle with the point kept for the previous
+  bucket and the mean of the next bucket; the first and last buckets keep the
+  first and last samples. The bucket means come from a first pass (a GROUP BY
+  in SQLite) so the selection itself is a single streaming pass.
+- RawPoints keeps every sample, for ranges that already fit.
+
+Each class takes chunks as (timestamps, values) NumPy arrays in time order;
+NaN values (NULL readings) are skipped. points() returns (timestamps, values).
+"""
+from typing import List, Optional, Tuple
+
+METHODS = ('lttb', 'minmax')
+
+
+def bucket_count(method: str, points: int) -> int:
+    """Time buckets needed for at most `points` output points"""
+    return max(1, points // 2) if method == 'minmax' else max(1, points)
+
+
+def bucket_index(ts, start: int, end: int, buckets: int):
+    import numpy as np
+
+    index = (ts - start) * buckets // max(end - start, 1)
+    return np.clip(index, 0, buckets - 1)
+
+
+def _segments(index):
+    """Start offsets of the runs of equal bucket index in a sorted chunk"""
+    import numpy as np
+
+    return np.concatenate(([0], np.flatnonzero(np.diff(index)) + 1))
+
+
+class RawPoints:
+    def __init__(self):
+        self.ts: List[int] = []
+        self.values: List[float] = []
+
+    def add(self, ts, values):
+        import numpy as np
+
+        keep = ~np.isnan(values)
+        self.ts.extend(ts[keep].tolist())
+        self.values.extend(values[keep].tolist())
+
+    def points(self) -> Tuple[List[int], List[float]]:
+        return self.ts, self.values
+
+
+class MinMaxBuckets:
+    def __init__(self, start: int, end: int, buckets: int):
+        import numpy as np
+
+        self.start, self.end, self.buckets = start, end, buckets
+        self.min_v = np.full(buckets, np.nan)
+        self.max_v = np.full(buckets, np.nan)
+        self.min_t = np.zeros(buckets, dtype=np.int64)
+        self.max_t = np.zeros(buckets, dtype=np.int64)
+
+    def add(self, ts, values):
+        import numpy as np
+
+        keep = ~np.isnan(values)
+        ts, values = ts[keep], values[keep]
+        if not len(ts):
+            return
+        index = bucket_index(ts, self.start, self.end, self.buckets)
+        starts = _segments(index)
+        buckets = index[starts]
+        # Per bucket in this chunk: extreme value, then the first row holding it
+        positions = np.arange(len(ts))
+        for extreme, best_v, best_t, better in (
+                (np.minimum, self.min_v, self.min_t, np.less),
+                (np.maximum, self.max_v, self.max_t, np.greater)):
+            chunk_v = extreme.reduceat(values, starts)
+            lengths = np.diff(np.append(starts, len(ts)))
+            at = np.minimum.reduceat(np.where(values == np.repeat(chunk_v, lengths), positions, len(ts)), starts)
+            current = best_v[buckets]
+            replace = np.isnan(current) | better(chunk_v, current)
+            best_v[buckets[replace]] = chunk_v[replace]
+            best_t[buckets[replace]] = ts[at[replace]]
+
+    def points(self) -> Tuple[List[int], List[float]]:
+        import numpy as np
+
+        filled = ~np.isnan(self.min_v)
+        min_t, min_v = self.min_t[filled], self.min_v[filled]
+        max_t, max_v = self.max_t[filled], self.max_v[filled]
+        # Both extremes of each bucket in time order; one point when they are the same row
+        first_min = min_t <= max_t
+        t = np.column_stack((np.where(first_min, min_t, max_t), np.where(first_min, max_t, min_t))).ravel()
+        v = np.column_stack((np.where(first_min, min_v, max_v), np.where(first_min, max_v, min_v))).ravel()
+        distinct = np.ones(len(t), dtype=bool)
+        distinct[1::2] = min_t != max_t
+        return t[distinct].tolist(), v[distinct].tolist()
+
+
+class LTTBBuckets:
+    def __init__(self, start: int, end: int, buckets: int, mean_t, mean_v):
+        """mean_t/mean_v: per-bucket means from the first pass, NaN for empty buckets"""
+        import numpy as np
+
+        self.start, self.end, self.buckets = start, end, buckets
+        filled = np.flatnonzero(~np.isnan(np.asarray(mean_v, dtype=np.float64)))
+        self.last_bucket = int(filled[-1]) if len(filled) else -1
+        # Mean of the next non-empty bucket after each bucket (times relative to start)
+        following = np.searchsorted(filled, np.arange(buckets), side='right')
+        has_next = following < len(filled)
+        nxt = filled[np.minimum(following, max(len(filled) - 1, 0))] if len(filled) else np.zeros(buckets, np.int64)
+        self.next_t = np.where(has_next, np.asarray(mean_t, dtype=np.float64)[nxt] - start, np.nan)
+        self.next_v = np.where(has_next, np.asarray(mean_v, dtype=np.float64)[nxt], np.nan)
+
+        self.ts: List[int] = []
+        self.values: List[float] = []
+        self.bucket: Optional[int] = None  # bucket being scanned
+        self.first: Optional[Tuple[int, float]] = None  # first row of the range
+        self.best: Optional[Tuple[float, int, float]] = None  # (area, ts, value) of its best row so far
+        self.last: Optional[Tuple[int, float]] = None  # its latest row
+
+    def _close(self):
+        if self.bucket is None:
+            return
+        if self.bucket == self.last_bucket:
+            ts, value = self.last
+        elif not self.ts:
+            ts, value = self.first
+        else:
+            _, ts, value = self.best
+        if not self.ts or ts != self.ts[-1]:
+            self.ts.append(ts)
+            self.values.append(value)
+
+    def add(self, ts, values):
+        import numpy as np
+
+        keep = ~np.isnan(values)
+        ts, values = ts[keep], values[keep]
+        if not len(ts):
+            return
+        index = bucket_index(ts, self.start, self.end, self.buckets)
+        starts = _segments(index)
+        for segment, begin in enumerate(starts):
+            finish = starts[segment + 1] if segment + 1 < len(starts) else len(ts)
+            bucket = int(index[begin])
+            seg_t, seg_v = ts[begin:finish], values[begin:finish]
+            if bucket != self.bucket:
+                self._close()
+                if self.bucket is None:
+                    self.first = (int(seg_t[0]), float(seg_v[0]))
+                self.bucket, self.best = bucket, None
+            self.last = (int(seg_t[-1]), float(seg_v[-1]))
+            if not self.ts or bucket == self.last_bucket:
+                continue  # the first bucket keeps its first row, the last bucket its last
+
+            prev_t, prev_v = self.ts[-1] - self.start, self.values[-1]
+            next_t, next_v = self.next_t[bucket], self.next_v[bucket]
+            rel_t = (seg_t - self.start).astype(np.float64)
+            area = np.abs((prev_t - next_t) * (seg_v - prev_v) - (prev_t - rel_t) * (next_v - prev_v))
+            i = int(np.argmax(area))
+            if self.best is None or area[i] > self.best[0]:
+                self.best = (float(area[i]), int(seg_t[i]), float(seg_v[i]))
+
+    def points(self) -> Tuple[List[int], List[float]]:
+        self._close()
+        self.bucket = None
+        return self.ts, self.values
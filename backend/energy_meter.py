@@ -0,0 +1,112 @@
+from array import array
+from typing import Dict, List, Optional, Tuple
+
+from database import MAX_SAMPLE_GAP_MS
+
+
+class DeviceMeter:
+    """Running energy totals for one device"""
+
+    __slots__ = ('channel', 'device', 'energy_wh', 'cost', 'on_seconds', 'first_seen', 'updated', 'watts')
+
+    def __init__(self, channel: int, device: str, energy_wh: float = 0.0, cost: float = 0.0,
+                 on_seconds: float = 0.0, first_seen: Optional[int] = None, updated: Optional[int] = None):
+        self.channel = channel
+        self.device = device
+        self.energy_wh = energy_wh
+        self.cost = cost
+        self.on_seconds = on_seconds
+        self.first_seen = first_seen
+        self.updated = updated
+        self.watts = 0.0
+
+    def row(self) -> tuple:
+        return (self.channel, self.device, self.energy_wh, self.cost, self.on_seconds, self.first_seen, self.updated)
+
+
+class EnergyMeter:
+    """
+    Integrates per-device power samples into kWh, cost and ON-time counters as
+    they arrive, so usage for any device is a dictionary lookup. Energy is
+    priced at the tariff rate passed with each sample. Each device
+    has a fixed channel number, which is its position in the packed per-tick
+    power sample rows.
+    """
+
+    def __init__(self, currency: str = "₹"):
+        self.currency = currency
+        self.meters: Dict[str, DeviceMeter] = {}
+        self.by_channel: List[DeviceMeter] = []
+        self.last_sample: Optional[int] = None
+
+    def load(self, rows: List[tuple]):
+        """Restore counters persisted by a previous run: (channel, device, energy_wh, cost, on_seconds, first_seen, updated)"""
+        for row in sorted(rows):
+            meter = DeviceMeter(*row)
+            self.meters[meter.device] = meter
+            self.by_channel.append(meter)
+
+    def _meter(self, device: str, now: int, changed: List[DeviceMeter]) -> DeviceMeter:
+        meter = self.meters.get(device)
+        if meter is None:
+            meter = DeviceMeter(len(self.by_channel), device, first_seen=now, updated=now)
+            self.meters[device] = meter
+            self.by_channel.append(meter)
+            changed.append(meter)
+        return meter
+
+    def record(self, names: List[str], watts: List[float], now: int, rate: float) -> Tuple[bytes, List[tuple]]:
+        """
+        Add a power sample taken at `now` (epoch ms). The interval since the
+        previous sample is charged at each device's previous draw, priced at
+        `rate` per kWh. Returns the
+        packed sample (float32 watts by channel) and the counter rows of new
+        meters and of meters whose counters advanced, the only ones to persist.
+        """
+        elapsed = 0 if self.last_sample is None else now - self.last_sample
+        if elapsed > MAX_SAMPLE_GAP_MS or elapsed < 0:
+            elapsed = 0
+        hours = elapsed / 3600000
+        rate = rate / 1000
+
+        changed: List[DeviceMeter] = []
+        for name, power in zip(names, watts):
+            meter = self._meter(name, now, changed)
+            if meter.watts > 0 and elapsed:
+                wh = meter.watts * hours
+                meter.energy_wh += wh
+                meter.cost += wh * rate
+                meter.on_seconds += elapsed / 1000
+                meter.updated = now
+                changed.append(meter)
+            meter.watts = power
+        self.last_sample = now
+
+        packed = array('f', (meter.watts for meter in self.by_channel))
+        return packed.tobytes(), [meter.row() for meter in changed]
+
+    def channel(self, device: str) -> Optional[int]:
+        meter = self.meters.get(device)
+        return meter.channel if meter else None
+
+    def usage(self, device: str, now: int) -> Optional[Dict]:
+        """Totals and daily averages for a device since it was first metered"""
+        meter = self.meters.get(device)
+        if meter is None:
+            return None
+        days = max((now - meter.first_seen) / 86400000, 1 / 24) if meter.first_seen else 1 / 24
+        return {
+            'device': device,
+            'current_watts': round(meter.watts, 2),
+            'energy_kwh': round(meter.energy_wh / 1000, 4),
+            'cost': round(meter.cost, 2),
+            'on_hours': round(meter.on_seconds / 3600, 2),
+            'days_metered': round(days, 2),
+            'kwh_per_day': round(meter.energy_wh / 1000 / days, 3),
+            'on_hours_per_day': round(meter.on_seconds / 3600 / days, 2),
+            'cost_per_day': round(meter.cost / days, 2),
+            'currency': self.currency,
+        }
+
+    def snapshot(self, now: int) -> List[Dict]:
+        return [self.usage(meter.device, now) for meter in self.by_channel]
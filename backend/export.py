@@ -0,0 +1,198 @@
+import csv
+import importlib.util
+import io
+import math
+import struct
+from array import array
+from typing import List, Tuple
+
+from database import DOOR_STATES, from_epoch_ms
+
+# pyarrow is optional (columnar formats fall back to the built-in binary
+# encoding) and slow to import, so it is only loaded by the first Arrow export
+HAVE_PYARROW = importlib.util.find_spec('pyarrow') is not None
+pa = pq = None
+
+
+def _load_pyarrow():
+    global pa, pq
+    if pa is None:
+        import pyarrow
+        import pyarrow.ipc
+        import pyarrow.parquet
+        pa, pq = pyarrow, pyarrow.parquet
+
+# Column name and logical type for each exportable table. 'timestamp' columns
+# hold epoch milliseconds and 'door' columns hold DOOR_STATES codes; CSV renders
+# them as ISO text and state names, the binary formats keep the integers.
+ENERGY_COLUMNS = [('id', 'int'), ('timestamp', 'timestamp'), ('watts', 'float')]
+SENSOR_COLUMNS = [
+    ('id', 'int'), ('timestamp', 'timestamp'), ('node', 'int'), ('temperature', 'float'),
+    ('humidity', 'float'), ('motion', 'int'), ('door', 'door')
+]
+
+# Binary format magic and per-type column codes
+BINARY_MAGIC = b'SHX2'
+_TYPE_CODES = {'int': b'q', 'float': b'd', 'str': b's', 'timestamp': b't', 'door': b'e'}
+_INT_KINDS = ('int', 'timestamp')
+
+_CSV_RENDERERS = {
+    'timestamp': from_epoch_ms,
+    'door': lambda code: None if code is None else DOOR_STATES[code],
+}
+
+
+class CsvEncoder:
+    """CSV with a header row"""
+
+    media_type = 'text/csv'
+    extension = 'csv'
+
+    def __init__(self, columns: List[Tuple[str, str]]):
+        self.columns = columns
+        self.renderers = [(i, _CSV_RENDERERS[kind]) for i, (_, kind) in enumerate(columns) if kind in _CSV_RENDERERS]
+
+    def header(self) -> bytes:
+        return (','.join(name for name, _ in self.columns) + '\r\n').encode()
+
+    def encode(self, rows: List[tuple]) -> bytes:
+        if self.renderers:
+            rows = [self._render(row) for row in rows]
+        buffer = io.StringIO()
+        csv.writer(buffer).writerows(rows)
+        return buffer.getvalue().encode()
+
+    def _render(self, row: tuple) -> list:
+        row = list(row)
+        for i, render in self.renderers:
+            row[i] = render(row[i])
+        return row
+
+    def footer(self) -> bytes:
+        return b''
+
+
+class BinaryEncoder:
+    """
+    Compact column-oriented binary format, used when pyarrow is unavailable.
+    Version 2 ('SHX2') added the t and e column types: timestamps travel as
+    epoch milliseconds and door states as DOOR_STATES codes, where version 1
+    ('SHX1') sent both as s (text) columns.
+
+    Layout (little-endian):
+        header  'SHX2', uint16 column count, then per column:
+                uint8 name length, name bytes, 1-byte type code
+                (q=int64, t=int64 epoch ms, d=float64, e=int8 enum code, s=utf-8)
+        chunk   uint32 row count, then each column in turn:
+                q/t/d/e: packed values (NULL ints and codes are -1, NULL floats are NaN)
+                s:   uint32 byte length of the joined values, then values separated by 0x00
+        end     uint32 0
+    """
+
+    media_type = 'application/octet-stream'
+    extension = 'shx'
+
+    def __init__(self, columns: List[Tuple[str, str]]):
+        self.columns = columns
+
+    def header(self) -> bytes:
+        parts = [BINARY_MAGIC, struct.pack('<H', len(self.columns))]
+        for name, kind in self.columns:
+            encoded = name.encode()
+            parts += [struct.pack('<B', len(encoded)), encoded, _TYPE_CODES[kind]]
+        return b''.join(parts)
+
+    def encode(self, rows: List[tuple]) -> bytes:
+        parts = [struct.pack('<I', len(rows))]
+        for i, (_, kind) in enumerate(self.columns):
+            values = [row[i] for row in rows]
+            if kind in _INT_KINDS:
+                parts.append(array('q', [-1 if v is None else v for v in values]).tobytes())
+            elif kind == 'door':
+                parts.append(array('b', [-1 if v is None else v for v in values]).tobytes())
+            elif kind == 'float':
+                parts.append(array('d', [math.nan if v is None else v for v in values]).tobytes())
+            else:
+                joined = '\0'.join('' if v is None else str(v) for v in values).encode()
+                parts += [struct.pack('<I', len(joined)), joined]
+        return b''.join(parts)
+
+    def footer(self) -> bytes:
+        return struct.pack('<I', 0)
+
+
+class ArrowEncoder:
+    """Arrow IPC stream, one record batch per chunk"""
+
+    media_type = 'application/vnd.apache.arrow.stream'
+    extension = 'arrows'
+
+    def __init__(self, columns: List[Tuple[str, str]]):
+        _load_pyarrow()
+        self.columns = columns
+        self.schema = _arrow_schema(columns)
+        self.sink = io.BytesIO()
+        self.writer = None
+
+    def _drain(self) -> bytes:
+        data = self.sink.getvalue()
+        self.sink.seek(0)
+        self.sink.truncate()
+        return data
+
+    def header(self) -> bytes:
+        self.writer = pa.ipc.new_stream(self.sink, self.schema)
+        return self._drain()
+
+    def encode(self, rows: List[tuple]) -> bytes:
+        self.writer.write_batch(_arrow_batch(self.schema, rows))
+        return self._drain()
+
+    def footer(self) -> bytes:
+        self.writer.close()
+        return self._drain()
+
+
+class ParquetEncoder(ArrowEncoder):
+    """Parquet file, one row group per chunk"""
+
+    media_type = 'application/vnd.apache.parquet'
+    extension = 'parquet'
+
+    def header(self) -> bytes:
+        self.writer = pq.ParquetWriter(self.sink, self.schema, compression='snappy')
+        return self._drain()
+
+    def encode(self, rows: List[tuple]) -> bytes:
+        self.writer.write_table(pa.Table.from_batches([_arrow_batch(self.schema, rows)]))
+        return self._drain()
+
+
+def _arrow_schema(columns: List[Tuple[str, str]]):
+    types = {'int': pa.int64(), 'float': pa.float64(), 'str': pa.string(),
+             'timestamp': pa.timestamp('ms', tz='UTC'), 'door': pa.int8()}
+    return pa.schema([(name, types[kind]) for name, kind in columns])
+
+
+def _arrow_batch(schema, rows: List[tuple]):
+    return pa.RecordBatch.from_arrays(
+        [pa.array([row[i] for row in rows], type=field.type) for i, field in enumerate(schema)],
+        schema=schema
+    )
+
+
+ENCODERS = {'csv': CsvEncoder, 'binary': BinaryEncoder, 'arrow': ArrowEncoder, 'parquet': ParquetEncoder}
+
+
+def available_formats() -> List[str]:
+    """Export formats usable with the installed libraries"""
+    return list(ENCODERS) if HAVE_PYARROW else ['csv', 'binary']
+
+
+def get_encoder(fmt: str, columns: List[Tuple[str, str]]):
+    """Create an encoder for `fmt`; 'columnar' picks Parquet when available, else the binary format"""
+    if fmt == 'columnar':
+        fmt = 'parquet' if HAVE_PYARROW else 'binary'
+    if fmt not in available_formats():
+        raise ValueError(f"Unsupported export format '{fmt}'. Available: {', '.join(available_formats() + ['columnar'])}")
+    return ENCODERS[fmt](columns)
@@ -0,0 +1,219 @@
+from typing import Dict, Callable, List, Optional, Tuple
+
+import numpy as np
+
+from clock import clock
+from metrics import metrics
+from records import SensorReading
+from logging_config import get_logger
+
+log = get_logger("fleet_sim")
+
+# Nominal power draw when ON (min, max watts) and share of the generated fleet
+POWER_PROFILES = {
+    'light': {'watts': (10, 15), 'share': 0.40},          # LED bulb
+    'fan': {'watts': (50, 75), 'share': 0.25},            # Ceiling fan
+    'tv': {'watts': (80, 150), 'share': 0.10},
+    'fridge': {'watts': (100, 200), 'share': 0.10},
+    'ac': {'watts': (1000, 2000), 'share': 0.10},
+    'water_heater': {'watts': (2000, 3000), 'share': 0.05},
+}
+
+DOOR_STATES = ('CLOSED', 'OPENED')
+
+
+class FleetSimulator:
+    """
+    Simulates a large fleet of IoT devices and sensor nodes for load testing.
+    All state lives in NumPy arrays and every sensor node advances in a single
+    vectorized step, so thousands of devices cost about as much as two.
+    Exposes the same interface as HardwareSimulator.
+    """
+
+    def __init__(self, num_devices: int = 1000, num_sensors: int = 100,
+                 tick_seconds: float = 5.0, seed: Optional[int] = None):
+        self.rng = np.random.default_rng(seed)
+        self.tick_seconds = tick_seconds
+
+        # Device registry: name -> index into the state arrays
+        types = list(POWER_PROFILES)
+        shares = np.array([POWER_PROFILES[t]['share'] for t in types])
+        type_idx = self.rng.choice(len(types), size=num_devices, p=shares / shares.sum())
+        self.device_types = [types[i] for i in type_idx]
+        self.device_names = [f"{t}_{i:05d}" for i, t in enumerate(self.device_types)]
+        self.index = {name: i for i, name in enumerate(self.device_names)}
+
+        watts = np.array([POWER_PROFILES[t]['watts'] for t in types], dtype=np.float64)
+        self.watts_min = watts[type_idx, 0]
+        self.watts_max = watts[type_idx, 1]
+        self.gpio_pins = np.arange(num_devices, dtype=np.int32) % 40
+
+        # Start with devices OFF - they'll be controlled by UI
+        self.on = np.zeros(num_devices, dtype=bool)
+        self.power_watts = np.zeros(num_devices, dtype=np.float64)
+
+        # Sensor node state, one slot per node
+        self.temperature = self.rng.uniform(22, 28, num_sensors)
+        self.humidity = self.rng.uniform(50, 70, num_sensors)
+        self.motion = np.zeros(num_sensors, dtype=bool)
+        self.door_open = np.zeros(num_sensors, dtype=bool)
+
+        self.running = False
+        log.info("Initialized - %d devices, %d sensor nodes, tick %ss, seed %s",
+                 num_devices, num_sensors, tick_seconds, seed)
+
+    def has_device(self, device: str) -> bool:
+        """Check whether a device exists in the fleet"""
+        return device in self.index
+
+    def control_device(self, device: str, action: str) -> Dict:
+        """Simulate GPIO control of device"""
+        if device not in self.index:
+            return {'error': f'Device {device} not found'}
+
+        i = self.index[device]
+        action = action.upper()
+        self.on[i] = action == 'ON'
+        self.power_watts[i] = self.rng.uniform(self.watts_min[i], self.watts_max[i]) if self.on[i] else 0.0
+
+        return {
+            'device': device,
+            'state': action,
+            'power_watts': float(self.power_watts[i]),
+            'gpio_pin': int(self.gpio_pins[i]),
+            'timestamp': clock.now().isoformat()
+        }
+
+    def set_fraction_on(self, fraction: float):
+        """Switch a random fraction of the fleet ON and the rest OFF in one step"""
+        self.on = self.rng.random(len(self.on)) < fraction
+        drawn = self.rng.uniform(self.watts_min, self.watts_max)
+        self.power_watts = np.where(self.on, drawn, 0.0)
+
+    def get_device_state(self, device: str) -> Dict:
+        """Get current device state"""
+        if device not in self.index:
+            return {'error': f'Device {device} not found'}
+
+        i = self.index[device]
+        return {
+            'device': device,
+            'state': 'ON' if self.on[i] else 'OFF',
+            'power_watts': float(self.power_watts[i]),
+            'gpio_pin': int(self.gpio_pins[i])
+        }
+
+    def get_all_devices(self) -> Dict:
+        """Get all device states"""
+        states = np.where(self.on, 'ON', 'OFF').tolist()
+        powers = self.power_watts.tolist()
+        pins = self.gpio_pins.tolist()
+        return {
+            name: {'state': states[i], 'power_watts': powers[i], 'gpio_pin': pins[i]}
+            for i, name in enumerate(self.device_names)
+        }
+
+    def step_sensors(self):
+        """Advance every sensor node by one tick"""
+        n = len(self.temperature)
+        self.temperature += self.rng.uniform(-0.5, 0.5, n)
+        np.clip(self.temperature, 20, 35, out=self.temperature)
+
+        self.humidity += self.rng.uniform(-2, 2, n)
+        np.clip(self.humidity, 40, 80, out=self.humidity)
+
+        # Random motion detection (5% chance) and door state change (2% chance)
+        self.motion = self.rng.random(n) < 0.05
+        self.door_open ^= self.rng.random(n) < 0.02
+
+        # Devices that are ON drift +/-2% around their drawn power
+        self.power_watts *= np.where(self.on, self.rng.uniform(0.98, 1.02, len(self.on)), 0.0)
+        np.clip(self.power_watts, self.watts_min * self.on, self.watts_max * self.on, out=self.power_watts)
+
+    def sensor_readings(self) -> List[SensorReading]:
+        """Current reading of every sensor node, as HardwareSimulator produces them"""
+        timestamp = clock.now_ms()
+        temperature = np.round(self.temperature, 1).tolist()
+        humidity = np.round(self.humidity, 1).tolist()
+        motion = self.motion.tolist()
+        door = self.door_open.tolist()
+        return [
+            SensorReading(i, temperature[i], humidity[i], motion[i], DOOR_STATES[door[i]], timestamp)
+            for i in range(len(temperature))
+        ]
+
+    async def simulate_sensors(self, callback: Callable = None, batch_callback: Callable = None):
+        """
+        Advance all sensor nodes every tick. `callback` receives one reading at a
+        time (same contract as HardwareSimulator); `batch_callback` receives the
+        whole tick as a list, which is far cheaper for large fleets.
+        """
+        self.running = True
+        log.info("Sensor simulation started")
+
+        while self.running:
+            metrics.task_heartbeat('sensor_simulation')
+            started = clock.monotonic()
+            self.step_sensors()
+
+            if callback or batch_callback:
+                readings = self.sensor_readings()
+                if batch_callback:
+                    await batch_callback(readings)
+                if callback:
+                    for reading in readings:
+                        await callback(reading)
+
+            await clock.sleep(self.tick_seconds - (clock.monotonic() - started))
+
+    def get_sensor_data(self) -> Dict:
+        """Get current sensor readings of the first node plus fleet-wide averages"""
+        return {
+            'temperature': round(float(self.temperature[0]), 1),
+            'humidity': round(float(self.humidity[0]), 1),
+            'motion': bool(self.motion[0]),
+            'door': DOOR_STATES[int(self.door_open[0])],
+            'timestamp': clock.now().isoformat(),
+            'nodes': len(self.temperature),
+            'avg_temperature': round(float(self.temperature.mean()), 1),
+            'avg_humidity': round(float(self.humidity.mean()), 1),
+            'motion_count': int(self.motion.sum()),
+            'doors_open': int(self.door_open.sum())
+        }
+
+    def device_powers(self) -> Tuple[List[str], List[float]]:
+        """Device names and their current power draw in watts, in matching order"""
+        return self.device_names, self.power_watts.tolist()
+
+    def device_on(self) -> List[bool]:
+        """Whether each device is switched ON, in device_powers() order"""
+        return self.on.tolist()
+
+    def calculate_total_power(self) -> float:
+        """Calculate total power consumption of all devices"""
+        return float(self.power_watts.sum())
+
+    def export_state(self) -> Dict:
+        """Sensor node arrays, for warm-restart snapshots; device state is restored from the database"""
+        return {
+            'temperature': self.temperature.round(2).tolist(),
+            'humidity': self.humidity.round(2).tolist(),
+            'motion': self.motion.tolist(),
+            'door_open': self.door_open.tolist(),
+        }
+
+    def restore_state(self, state: Dict):
+        # A snapshot from a differently sized fleet doesn't apply
+        if len(state['temperature']) != len(self.temperature):
+            log.info("Sensor snapshot has %d nodes, fleet has %d - starting fresh",
+                     len(state['temperature']), len(self.temperature))
+            return
+        self.temperature = np.array(state['temperature'], dtype=np.float64)
+        self.humidity = np.array(state['humidity'], dtype=np.float64)
+        self.motion = np.array(state['motion'], dtype=bool)
+        self.door_open = np.array(state['door_open'], dtype=bool)
+
+    def stop(self):
+        """Stop sensor simulation"""
+        self.running = False
+        log.info("Stopped")
@@ -1,7 +1,11 @@
-import asyncio
 import random
-from typing import Dict, Callable
-from datetime import datetime
+from typing import Dict, Callable, List, Tuple
+from clock import clock
+from metrics import metrics
+from records import SensorReading
+from logging_config import get_logger, sample_every
+
+log = get_logger("hardware_sim")
 
 class HardwareSimulator:
     """
@@ -24,8 +28,12 @@ class HardwareSimulator:
         }
         
         self.running = False
-        print("[HARDWARE SIM] Initialized - all devices OFF, waiting for UI commands")
+        log.info("Initialized - all devices OFF, waiting for UI commands")
         
+    def has_device(self, device: str) -> bool:
+        """Check whether a device is simulated"""
+        return device in self.devices
+
     def control_device(self, device: str, action: str) -> Dict:
         """Simulate GPIO control of device"""
         if device not in self.devices:
@@ -43,15 +51,15 @@ class HardwareSimulator:
         else:
             self.devices[device]['power_watts'] = 0
         
-        print(f"[HARDWARE SIM] {device.upper()} GPIO Pin {self.devices[device]['gpio_pin']}: {action}")
-        print(f"[HARDWARE SIM] Power consumption: {self.devices[device]['power_watts']:.2f}W")
+        log.debug("%s GPIO Pin %s: %s (%.2fW)", device.upper(), self.devices[device]['gpio_pin'], action,
+                  self.devices[device]['power_watts'])
         
         return {
             'device': device,
             'state': action,
             'power_watts': self.devices[device]['power_watts'],
             'gpio_pin': self.devices[device]['gpio_pin'],
-            'timestamp': datetime.now().isoformat()
+            'timestamp': clock.now().isoformat()
         }
     
     def get_device_state(self, device: str) -> Dict:
@@ -80,9 +88,11 @@ class HardwareSimulator:
     async def simulate_sensors(self, callback: Callable = None):
         """Simulate sensor readings (temperature, humidity, motion)"""
         self.running = True
-        print("[HARDWARE SIM] Sensor simulation started")
+        log.info("Sensor simulation started")
         
         while self.running:
+            metrics.task_heartbeat('sensor_simulation')
+
             # Simulate temperature fluctuation
             self.sensors['temperature'] += random.uniform(-0.5, 0.5)
             self.sensors['temperature'] = max(20, min(35, self.sensors['temperature']))
@@ -95,27 +105,29 @@ class HardwareSimulator:
             self.sensors['motion'] = random.random() < 0.05
             
             # Random door state change (2% chance)
-            if random.random() < 0.02:
+            door_changed = random.random() < 0.02
+            if door_changed:
                 self.sensors['door'] = 'OPENED' if self.sensors['door'] == 'CLOSED' else 'CLOSED'
             
-            sensor_data = {
-                'temperature': round(self.sensors['temperature'], 1),
-                'humidity': round(self.sensors['humidity'], 1),
-                'motion': self.sensors['motion'],
-                'door': self.sensors['door'],
-                'timestamp': datetime.now().isoformat()
-            }
+            sensor_data = SensorReading(
+                0,
+                round(self.sensors['temperature'], 1),
+                round(self.sensors['humidity'], 1),
+                self.sensors['motion'],
+                self.sensors['door'],
+                clock.now_ms()
+            )
             
             if self.sensors['motion']:
-                print(f"[SENSOR SIM] 🚨 Motion detected!")
+                log.info("Motion detected", extra=sample_every(10))
             
-            if self.sensors['door'] == 'OPENED':
-                print(f"[SENSOR SIM] 🚪 Door opened!")
+            if door_changed:
+                log.info("Door %s", self.sensors['door'].lower(), extra={'door': self.sensors['door']})
             
             if callback:
                 await callback(sensor_data)
             
-            await asyncio.sleep(5)  # Update every 5 seconds
+            await clock.sleep(5)  # Update every 5 seconds
     
     def get_sensor_data(self) -> Dict:
         """Get current sensor readings"""
@@ -124,14 +136,30 @@ class HardwareSimulator:
             'humidity': round(self.sensors['humidity'], 1),
             'motion': self.sensors['motion'],
             'door': self.sensors['door'],
-            'timestamp': datetime.now().isoformat()
+            'timestamp': clock.now().isoformat()
         }
     
+    def device_powers(self) -> Tuple[List[str], List[float]]:
+        """Device names and their current power draw in watts, in matching order"""
+        names = list(self.devices)
+        return names, [self.devices[name]['power_watts'] for name in names]
+
+    def device_on(self) -> List[bool]:
+        """Whether each device is switched ON, in device_powers() order"""
+        return [info['state'] == 'ON' for info in self.devices.values()]
+
     def calculate_total_power(self) -> float:
         """Calculate total power consumption of all devices"""
         return sum(device['power_watts'] for device in self.devices.values())
     
+    def export_state(self) -> Dict:
+        """Sensor readings, for warm-restart snapshots; device state is restored from the database"""
+        return {'sensors': self.sensors}
+    
+    def restore_state(self, state: Dict):
+        self.sensors.update(state['sensors'])
+    
     def stop(self):
         """Stop sensor simulation"""
         self.running = False
-        print("[HARDWARE SIM] Stopped")
\ No newline at end of file
+        log.info("Stopped")
\ No newline at end of file
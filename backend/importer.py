@@ -0,0 +1,287 @@
+"""
+Bulk historical import for energy and sensor logs.
+
+Streams CSV (with header) or NDJSON input, validates each row, and inserts in
+large transactions. Run offline from the command line, it also drops the
+table's indexes for the duration of the load and rebuilds them once at the end;
+the HTTP endpoint keeps the indexes, since live queries depend on them.
+
+    python importer.py energy meter_2024.csv
+    python importer.py sensors sensors.ndjson --db smart_home.db --batch-size 100000
+"""
+import argparse
+import asyncio
+import csv
+import json
+import math
+import sys
+import time
+from typing import AsyncIterator, Dict, Iterable, List, Optional
+
+import aiosqlite
+
+from database import DOOR_CODES, Database, from_epoch_ms, to_epoch_ms
+
+TABLES = {
+    'energy': {
+        'table': 'energy_logs',
+        'insert': 'INSERT INTO energy_logs (timestamp, watts) VALUES (?, ?)',
+        'indexes': {
+            'idx_energy_logs_timestamp': 'CREATE INDEX IF NOT EXISTS idx_energy_logs_timestamp ON energy_logs (timestamp)',
+        },
+    },
+    'sensors': {
+        'table': 'sensor_logs',
+        'insert': 'INSERT INTO sensor_logs (timestamp, temperature, humidity, motion, door, node) '
+                  'VALUES (?, ?, ?, ?, ?, ?)',
+        'indexes': {
+            'idx_sensor_logs_timestamp': 'CREATE INDEX IF NOT EXISTS idx_sensor_logs_timestamp ON sensor_logs (timestamp)',
+            'idx_sensor_logs_node_ts':
+                'CREATE INDEX IF NOT EXISTS idx_sensor_logs_node_ts ON sensor_logs (node, timestamp)',
+        },
+    },
+}
+
+
+def _timestamp(value) -> int:
+    """Accept ISO 8601 text or epoch milliseconds and store epoch milliseconds"""
+    if value in (None, ''):
+        raise ValueError("missing timestamp")
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return int(value)
+    text = str(value)
+    return int(text) if text.isdigit() else to_epoch_ms(text)
+
+
+def _finite(value, field: str) -> float:
+    number = float(value)
+    # float() accepts "nan" and "inf", which are not valid JSON and break NOT NULL columns
+    if not math.isfinite(number):
+        raise ValueError(f"{field} must be a finite number")
+    return number
+
+
+def _optional_float(value, field: str) -> Optional[float]:
+    return None if value in (None, '') else _finite(value, field)
+
+
+def _node(value) -> int:
+    if value in (None, ''):
+        return 0
+    node = int(value)
+    if node < 0:
+        raise ValueError("node must be non-negative")
+    return node
+
+
+def _motion(value) -> Optional[int]:
+    if value in (None, ''):
+        return None
+    if isinstance(value, str):
+        lowered = value.strip().lower()
+        if lowered in ('1', 'true', 'yes'):
+            return 1
+        if lowered in ('0', 'false', 'no'):
+            return 0
+        raise ValueError(f"invalid motion value {value!r}")
+    return 1 if value else 0
+
+
+def validate_energy(record: Dict) -> tuple:
+    watts = _finite(record['watts'], 'watts')
+    if watts < 0:
+        raise ValueError("watts must be non-negative")
+    return (_timestamp(record.get('timestamp')), watts)
+
+
+def validate_sensor(record: Dict) -> tuple:
+    door = record.get('door')
+    if door in ('', None):
+        door = None
+    elif str(door).upper() not in DOOR_CODES:
+        raise ValueError(f"invalid door state {door!r}")
+    else:
+        door = DOOR_CODES[str(door).upper()]
+    return (
+        _timestamp(record.get('timestamp')),
+        _optional_float(record.get('temperature'), 'temperature'),
+        _optional_float(record.get('humidity'), 'humidity'),
+        _motion(record.get('motion')),
+        door,
+        _node(record.get('node'))
+    )
+
+
+VALIDATORS = {'energy': validate_energy, 'sensors': validate_sensor}
+
+
+async def iter_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[str]:
+    """Split a byte stream (e.g. a request body) into text lines"""
+    remainder = b''
+    async for chunk in chunks:
+        remainder += chunk
+        *lines, remainder = remainder.split(b'\n')
+        for line in lines:
+            yield line.decode('utf-8-sig').rstrip('\r')
+    if remainder:
+        yield remainder.decode('utf-8-sig').rstrip('\r')
+
+
+async def iter_file_lines(path: str) -> AsyncIterator[str]:
+    with open(path, encoding='utf-8-sig', newline='') as f:
+        for line in f:
+            yield line.rstrip('\r\n')
+
+
+def _parse_block(lines: List[str], fmt: str, header: Optional[List[str]]) -> Iterable:
+    """Yield a parsed record, or the exception raised while parsing it, for each non-blank line"""
+    if fmt == 'csv':
+        for row in csv.reader(lines):
+            yield dict(zip(header, row)) if row else None
+        return
+    for line in lines:
+        if not line.strip():
+            yield None
+            continue
+        try:
+            yield json.loads(line)
+        except ValueError as e:
+            yield e
+
+
+class BulkImporter:
+    """
+    Validates and loads streamed rows into a log table in large transactions.
+    `defer_indexes` drops the table's indexes during the load - only safe when
+    nothing else is reading the table.
+    """
+
+    def __init__(self, db_path: str = "smart_home.db", batch_size: int = 50000,
+                 defer_indexes: bool = False, max_errors: int = 20, database: Optional[Database] = None):
+        self.db_path = db_path
+        self.batch_size = batch_size
+        self.defer_indexes = defer_indexes
+        self.max_errors = max_errors
+        # Owner of the derived rollups that imported history must be folded into
+        self.database = database or Database(db_path)
+
+    async def run(self, kind: str, lines: AsyncIterator[str], fmt: str = 'csv') -> Dict:
+        """Import `lines` of CSV or NDJSON into the `kind` ('energy' or 'sensors') table"""
+        if kind not in TABLES:
+            raise ValueError(f"Unknown log type '{kind}'")
+        if fmt not in ('csv', 'ndjson'):
+            raise ValueError(f"Unsupported import format '{fmt}'")
+
+        spec = TABLES[kind]
+        validate = VALIDATORS[kind]
+        started = time.perf_counter()
+        imported = rejected = 0
+        errors = []
+        header = None
+        line_no = 0
+        first_ts = last_ts = None
+        loop = asyncio.get_running_loop()
+
+        async with aiosqlite.connect(self.db_path) as db:
+            if self.defer_indexes:
+                for name in spec['indexes']:
+                    await db.execute(f"DROP INDEX IF EXISTS {name}")
+            try:
+                block = []
+                async for line in lines:
+                    if fmt == 'csv' and header is None:
+                        header = next(csv.reader([line]))
+                        line_no += 1
+                        continue
+                    block.append(line)
+                    if len(block) >= self.batch_size:
+                        line_no, rows, bad = await loop.run_in_executor(
+                            None, self._validate_block, block, fmt, header, validate, line_no, errors)
+                        imported, rejected = imported + len(rows), rejected + bad
+                        first_ts, last_ts = self._track_range(rows, first_ts, last_ts)
+                        await db.executemany(spec['insert'], rows)
+                        await db.commit()
+                        block = []
+                if block:
+                    line_no, rows, bad = await loop.run_in_executor(
+                        None, self._validate_block, block, fmt, header, validate, line_no, errors)
+                    imported, rejected = imported + len(rows), rejected + bad
+                    first_ts, last_ts = self._track_range(rows, first_ts, last_ts)
+                    await db.executemany(spec['insert'], rows)
+                    await db.commit()
+            finally:
+                if self.defer_indexes:
+                    # Rebuild once over the whole table instead of updating it per row
+                    for create_sql in spec['indexes'].values():
+                        await db.execute(create_sql)
+                    await db.commit()
+
+        # Imported energy history behind the hourly rollup's cursor is rolled up here;
+        # anything newer is picked up by the next incremental refresh
+        rollup_hours = None
+        if kind == 'energy' and first_ts is not None:
+            rollup_hours = await self.database.rebuild_energy_hourly(first_ts, last_ts)
+
+        elapsed = time.perf_counter() - started
+        return {
+            'table': spec['table'],
+            'imported': imported,
+            'rejected': rejected,
+            'errors': errors,
+            'first_timestamp': from_epoch_ms(first_ts),
+            'last_timestamp': from_epoch_ms(last_ts),
+            'rollup_rebuilt': rollup_hours is not None,
+            'seconds': round(elapsed, 3),
+            'rows_per_second': round(imported / elapsed) if elapsed else imported,
+        }
+
+    def _validate_block(self, block: List[str], fmt: str, header, validate, line_no: int, errors: List):
+        rows = []
+        bad = 0
+        for record in _parse_block(block, fmt, header):
+            line_no += 1
+            if record is None:
+                continue
+            try:
+                if isinstance(record, Exception):
+                    raise record
+                rows.append(validate(record))
+            except KeyError as e:
+                bad += 1
+                if len(errors) < self.max_errors:
+                    errors.append(f"line {line_no}: missing field {e}")
+            except (ValueError, TypeError, OverflowError) as e:
+                bad += 1
+                if len(errors) < self.max_errors:
+                    errors.append(f"line {line_no}: {e}")
+        return line_no, rows, bad
+
+    @staticmethod
+    def _track_range(rows: List[tuple], first_ts, last_ts):
+        if rows:
+            low = min(row[0] for row in rows)
+            high = max(row[0] for row in rows)
+            first_ts = low if first_ts is None else min(first_ts, low)
+            last_ts = high if last_ts is None else max(last_ts, high)
+        return first_ts, last_ts
+
+
+async def main(args) -> int:
+    fmt = args.format or ('ndjson' if args.path.endswith(('.ndjson', '.jsonl')) else 'csv')
+    await Database(args.db).init_db()
+    importer = BulkImporter(args.db, batch_size=args.batch_size, defer_indexes=not args.keep_indexes)
+    report = await importer.run(args.kind, iter_file_lines(args.path), fmt)
+    print(json.dumps(report, indent=2))
+    return 0 if report['imported'] or not report['rejected'] else 1
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Bulk import energy or sensor history")
+    parser.add_argument('kind', choices=list(TABLES))
+    parser.add_argument('path', help="CSV (with header) or NDJSON file")
+    parser.add_argument('--format', choices=['csv', 'ndjson'], help="defaults from the file extension")
+    parser.add_argument('--db', default="smart_home.db")
+    parser.add_argument('--batch-size', type=int, default=50000, help="rows per transaction")
+    parser.add_argument('--keep-indexes', action='store_true',
+                        help="keep the table indexes during the load (use while the server is running)")
+    sys.exit(asyncio.run(main(parser.parse_args())))
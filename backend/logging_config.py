@@ -0,0 +1,122 @@
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+import threading
+from datetime import datetime
+from typing import Dict, Optional
+
+# Attributes every LogRecord has; anything else was passed through `extra`
+_RECORD_ATTRS = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime'}
+
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line, including any structured fields passed via `extra`"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            'ts': datetime.fromtimestamp(record.created).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'msg': record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRS and key != 'sample_every':
+                entry[key] = value
+        if record.exc_info:
+            entry['exc'] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class TextFormatter(logging.Formatter):
+    """Human-readable `[logger] message key=value` lines, close to the old print output"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        line = f"{self.formatTime(record, '%H:%M:%S')} {record.levelname:<7} [{record.name}] {record.getMessage()}"
+        fields = [f"{key}={value}" for key, value in record.__dict__.items()
+                  if key not in _RECORD_ATTRS and key != 'sample_every']
+        if fields:
+            line += " " + " ".join(fields)
+        if record.exc_info:
+            line += "\n" + self.formatException(record.exc_info)
+        return line
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Let through only one in every N records for high-frequency events.
+    A record opts in with `extra=sample_every(N)`; records are counted per
+    logger and message template, and the emitted one carries `sampled=N`.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.counts: Dict[tuple, int] = {}
+        self.lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        every = getattr(record, 'sample_every', 1)
+        if every <= 1:
+            return True
+        key = (record.name, record.msg)
+        with self.lock:
+            count = self.counts.get(key, 0)
+            self.counts[key] = count + 1
+        if count % every:
+            return False
+        record.sampled = every
+        return True
+
+
+def sample_every(n: int) -> Dict:
+    """`extra` for a log call that should only be emitted once every `n` calls"""
+    return {'sample_every': n}
+
+
+def setup_logging(level: Optional[str] = None, fmt: Optional[str] = None):
+    """
+    Route all application logging through a queue so callers never block on
+    stdout; a background listener thread does the actual writes.
+    LOG_LEVEL (default INFO) and LOG_FORMAT (text|json, default text) configure it.
+    """
+    global _listener
+    if _listener is not None:
+        return
+
+    level = (level or os.getenv('LOG_LEVEL', 'INFO')).upper()
+    fmt = (fmt or os.getenv('LOG_FORMAT', 'text')).lower()
+
+    stream = logging.StreamHandler(sys.stdout)
+    stream.setFormatter(JsonFormatter() if fmt == 'json' else TextFormatter())
+
+    log_queue = queue.SimpleQueue()
+    queue_handler = logging.handlers.QueueHandler(log_queue)
+    queue_handler.addFilter(SamplingFilter())
+
+    root = logging.getLogger()
+    root.handlers = [queue_handler]
+    root.setLevel(level)
+    # aiosqlite logs every operation at DEBUG; keep it out of application debug output
+    logging.getLogger('aiosqlite').setLevel(max(root.level, logging.INFO))
+
+    _listener = logging.handlers.QueueListener(log_queue, stream, respect_handler_level=True)
+    _listener.start()
+    atexit.register(shutdown_logging)
+
+
+def shutdown_logging():
+    """Flush queued records and stop the listener thread"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+def get_logger(name: str) -> logging.Logger:
+    """Get a component logger"""
+    return logging.getLogger(name)
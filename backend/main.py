@@ -1,19 +1,51 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request, Query
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
-from typing import List, Dict, Optional
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from pydantic import BaseModel, confloat, conint, conlist
+from typing import List, Dict, Optional, Set, Tuple, Union
 import asyncio
-
-from database import Database
+import math
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+from database import HOUR_MS, Database, from_epoch_ms, now_ms, state_durations, to_epoch_ms
 from mqtt_client import MQTTClient
 from scheduler import DeviceScheduler
 from ai_predictor import AIPredictor
 from security import SecurityMonitor
 from maintenance import MaintenanceMonitor
 from hardware_simulator import HardwareSimulator
+from metrics import metrics
+from export import ENERGY_COLUMNS, SENSOR_COLUMNS, get_encoder
+from importer import BulkImporter, iter_lines
+from sensor_filter import SensorChangeFilter
+from serialization import FastJSONResponse, RawJSONResponse, RowEncoder, dumps
+from compression import CompressionMiddleware
+from conditional import is_not_modified, make_etag, not_modified, validator_headers
+from command_guard import CommandGuard, RateLimited
+from command_parser import CommandParser
+from energy_meter import EnergyMeter
+from tariff import CostCalculator, Tariff, month_start
+from downsample import METHODS as DOWNSAMPLE_METHODS
+from optimizer import hourly_base_load, problem_for, slot_prices, solve
+from anomaly import AnomalyMonitor
+from clock import clock
+from dispatcher import ActionDispatcher
+from recorder import Recorder, pack_readings
+from records import MaintenanceAlert, SecurityAlert, SensorReading
+from snapshot import SnapshotStore
+from profiler import MAX_PROFILE_SECONDS, SamplingProfiler, TaskMonitor
+from components import FeatureDisabled, LazyComponent, enabled_features
+from logging_config import setup_logging, get_logger
+
+setup_logging()
+log = get_logger("system")
 
 # Initialize FastAPI app
-app = FastAPI(title="Smart Home AI Platform")
+app = FastAPI(title="Smart Home AI Platform", default_response_class=FastJSONResponse)
 
 # Add CORS middleware for Flutter app
 app.add_middleware(
@@ -24,25 +56,124 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Initialize all components
-db = Database()
+# Compress JSON/CSV responses above COMPRESSION_MIN_SIZE bytes (brotli when installed, else gzip)
+app.add_middleware(CompressionMiddleware, minimum_size=int(os.getenv("COMPRESSION_MIN_SIZE", "1024")))
+
+# Record per-route latency (skipped entirely when METRICS_ENABLED=0)
+if metrics.enabled:
+    route_paths = {}
+
+    @app.middleware("http")
+    async def record_request_metrics(request: Request, call_next):
+        started = time.perf_counter()
+        response = await call_next(request)
+        endpoint = request.scope.get("endpoint")
+        if endpoint is not None and not route_paths:
+            route_paths.update({route.endpoint: route.path for route in app.routes if hasattr(route, "endpoint")})
+        route = route_paths.get(endpoint, "unmatched")
+        metrics.observe("http_request_duration_seconds", time.perf_counter() - started,
+                        method=request.method, route=route)
+        metrics.inc("http_requests_total", method=request.method, route=route, status=response.status_code)
+        return response
+
+# Optional subsystems - ENABLE_MQTT, ENABLE_SIMULATOR, ENABLE_SECURITY, ENABLE_MAINTENANCE
+features = enabled_features()
+
+# Initialize all components; rarely used ones are built on first request
+db = Database.from_env()
+# Warm-restart state of in-memory components (SNAPSHOT_INTERVAL)
+snapshots = SnapshotStore.from_env(db)
 mqtt_client = None
 scheduler = DeviceScheduler()
-ai_predictor = AIPredictor()
-security_monitor = SecurityMonitor()
-maintenance_monitor = MaintenanceMonitor()
-hardware_sim = HardwareSimulator()  # Hardware simulator
+ai_predictor = LazyComponent("ai_predictor", AIPredictor)
+security_monitor = LazyComponent("security",
+                                 lambda: snapshots.restored("security", SecurityMonitor(respond_to_security_alert)),
+                                 features["security"])
+maintenance_monitor = LazyComponent("maintenance", lambda: snapshots.restored("maintenance", MaintenanceMonitor()),
+                                    features["maintenance"])
+sensor_filter = SensorChangeFilter.from_env()
+tariff = Tariff.from_env()
+energy_meter = EnergyMeter(tariff.currency)
+cost_calculator = CostCalculator(tariff, db.get_energy_hourly)
+
+def raise_anomaly_alert(target: str, alert: Union[SecurityAlert, MaintenanceAlert]):
+    """Route detector alerts to the security or maintenance alert lists, if that subsystem is on"""
+    if features[target]:
+        monitor = security_monitor if target == "security" else maintenance_monitor
+        monitor.add_alert(alert)
+
+anomaly_monitor = AnomalyMonitor.from_env(
+    raise_anomaly_alert, lambda device, state: dispatch_alert_action(device, state, "standby power while OFF"))
+
+# On-demand profiling (ENABLE_PROFILING); background loops are tracked for task dumps either way
+profiler = LazyComponent("profiler", SamplingProfiler, features["profiling"])
+background_tasks = TaskMonitor()
+
+# Input recording for replay.py (RECORD_FILE)
+recorder = Recorder.from_env()
+
+# Hardware simulator - set SIM_DEVICES to run a generated fleet for load testing
+FLEET_MODE = bool(os.getenv("SIM_DEVICES"))
+if FLEET_MODE:
+    from fleet_simulator import FleetSimulator  # NumPy-backed; only imported in fleet mode
+
+    hardware_sim = FleetSimulator(
+        num_devices=int(os.getenv("SIM_DEVICES")),
+        num_sensors=int(os.getenv("SIM_SENSORS", "100")),
+        tick_seconds=float(os.getenv("SIM_TICK", "5")),
+        seed=int(os.getenv("SIM_SEED")) if os.getenv("SIM_SEED") else None
+    )
+else:
+    hardware_sim = HardwareSimulator()
+
+snapshots.register("scheduler", scheduler)
+snapshots.register("security", security_monitor)
+snapshots.register("maintenance", maintenance_monitor)
+snapshots.register("sensors", hardware_sim)
+
+# Upper bound on samples returned by reconstructed history queries
+MAX_SERIES_POINTS = 10000
+
+# Page size limits for cursor-based delta sync
+DEFAULT_SYNC_ROWS = 1000
+MAX_SYNC_ROWS = 10000
+
+# History endpoints encode row tuples directly instead of building dicts
+energy_row_encoder = RowEncoder(ENERGY_COLUMNS)
+sensor_row_encoder = RowEncoder(SENSOR_COLUMNS)
+point_encoders = {
+    column: RowEncoder([('timestamp', 'timestamp'), (column, 'float')])
+    for column in ('watts', 'temperature', 'humidity')
+}
 
 class DeviceControl(BaseModel):
     device: str
     action: str
 
+class TextCommand(BaseModel):
+    text: str
+
 class Schedule(BaseModel):
     device: str
     time: str
     action: str
     enabled: Optional[bool] = True
     days: Optional[List[str]] = None
+    until: Optional[str] = None
+
+class OptimizeJob(BaseModel):
+    device: str
+    duration_minutes: Optional[conint(gt=0)] = None
+    power_watts: Optional[confloat(ge=0)] = None
+    profile: Optional[conlist(confloat(ge=0), min_items=1)] = None
+    window_start: str = "00:00"
+    window_end: str = "00:00"
+
+class OptimizeRequest(BaseModel):
+    jobs: List[OptimizeJob]
+    peak_cap_watts: Optional[confloat(gt=0)] = None
+    apply: bool = False
+    replace_schedules: bool = False
 
 class SecurityMode(BaseModel):
     mode: str
@@ -52,105 +183,300 @@ class MaintenanceSchedule(BaseModel):
     date: str
     notes: Optional[str] = ""
 
-@app.on_event("startup")
-async def startup_event():
-    # Initialize database
+@app.exception_handler(FeatureDisabled)
+async def feature_disabled_handler(request: Request, exc: FeatureDisabled):
+    return JSONResponse(status_code=404, content={"detail": str(exc)})
+
+async def init_database():
+    """Create/migrate tables, restore snapshots, then sync the hardware simulator with stored device state"""
     await db.init_db()
-    
-    # Sync hardware simulator with database state
+    await snapshots.load()
+    energy_meter.load(await db.get_device_meters())
     device_states = await db.get_device_states()
     for device in device_states:
         hardware_sim.control_device(device['name'], device['state'])
-    print("[HARDWARE SIM] Synced with database - devices initialized")
-    
-    # Initialize MQTT client
+    log.info("Hardware simulator synced with database - devices initialized")
+
+async def start_mqtt():
+    """Start the MQTT client; it connects in the background so a missing broker never delays startup"""
     global mqtt_client
-    mqtt_client = MQTTClient(callback=handle_mqtt_message)
+    if not features["mqtt"]:
+        return
+    mqtt_client = MQTTClient(
+        broker=os.getenv("MQTT_BROKER", "localhost"),
+        port=int(os.getenv("MQTT_PORT", "1883")),
+        callback=handle_mqtt_message
+    )
     mqtt_client.start()
+    if metrics.enabled:
+        metrics.register_gauge("mqtt_connected", mqtt_client.is_connected)
+        metrics.register_gauge("mqtt_outgoing_queue_depth", mqtt_client.queue_depth)
+        metrics.register_gauge("mqtt_inflight_messages", mqtt_client.inflight_messages)
+
+@app.on_event("startup")
+async def startup_event():
+    started = time.perf_counter()
+
+    # Independent subsystems initialize concurrently
+    await asyncio.gather(init_database(), start_mqtt())
     
-    # Start energy data simulation
-    asyncio.create_task(simulate_energy_data())
+    if metrics.enabled:
+        background_tasks.spawn("loop_lag", metrics.monitor_loop_lag())
     
     # Start scheduler
-    asyncio.create_task(scheduler.check_schedules(execute_scheduled_action))
+    background_tasks.spawn("scheduler", scheduler.check_schedules(execute_scheduled_action))
+    background_tasks.spawn("snapshot", snapshots.run())
     
-    # Start hardware sensor simulation
-    asyncio.create_task(hardware_sim.simulate_sensors(log_sensor_data))
+    if features["simulator"]:
+        # Start energy data simulation
+        background_tasks.spawn("energy_simulation", simulate_energy_data())
+
+        # Start hardware sensor simulation
+        if FLEET_MODE:
+            background_tasks.spawn("sensor_simulation", hardware_sim.simulate_sensors(batch_callback=log_sensor_batch))
+        else:
+            background_tasks.spawn("sensor_simulation", hardware_sim.simulate_sensors(log_sensor_data))
     
-    print("[SYSTEM] Smart Home AI Platform started successfully")
-    print("[SYSTEM] All services initialized: MQTT, Database, Scheduler, AI, Security, Maintenance, Hardware Simulator")
+    elapsed = time.perf_counter() - started
+    metrics.set_gauge("startup_duration_seconds", elapsed)
+    log.info("Smart Home AI Platform started in %.0fms", elapsed * 1000)
+    log.info("Services: %s", ", ".join(f"{name}={'on' if on else 'off'}" for name, on in features.items()))
 
 @app.on_event("shutdown")
-def shutdown_event():
+async def shutdown_event():
+    try:
+        await snapshots.save()
+    except Exception as e:
+        log.exception("Final snapshot failed: %s", e)
     if mqtt_client:
         mqtt_client.stop()
+    if optimizer_pool is not None:
+        optimizer_pool.shutdown(wait=False)
     hardware_sim.stop()
-    print("[SYSTEM] Smart Home AI Platform shutdown complete")
+    if recorder:
+        recorder.close()
+    log.info("Smart Home AI Platform shutdown complete")
+
+# How often the energy loop folds new energy logs into the hourly rollup, so cached costs stay current
+ROLLUP_REFRESH_MS = 60 * 1000
 
 async def simulate_energy_data():
     """Simulate energy consumption based on device states"""
+    next_rollup = 0
     while True:
-        # Get total power from hardware simulator
-        total_watts = hardware_sim.calculate_total_power()
-        
-        # Add base consumption (always-on devices like router, modem)
-        base_consumption = 20  # 20W
-        total_watts += base_consumption
-        
-        # Log to database
-        await db.log_energy_usage(total_watts)
+        metrics.task_heartbeat("energy_simulation")
+        try:
+            # Get total power from hardware simulator
+            total_watts = hardware_sim.calculate_total_power()
+
+            # Add base consumption (always-on devices like router, modem)
+            base_consumption = 20  # 20W
+            total_watts += base_consumption
+
+            # Log to database
+            await db.log_energy_usage(total_watts)
+
+            # Meter each device and keep its packed power sample
+            now = now_ms()
+            names, watts = hardware_sim.device_powers()
+            rate = await cost_calculator.marginal_rate(now)
+            sample, meter_rows = energy_meter.record(names, watts, now, rate)
+            await db.log_power_sample(now, sample, meter_rows)
+
+            anomaly_monitor.observe_energy(total_watts, names, watts, hardware_sim.device_on(), now)
+
+            if now >= next_rollup:
+                cost_calculator.invalidate(await db.refresh_energy_hourly())
+                next_rollup = now + ROLLUP_REFRESH_MS
+        except Exception as e:
+            # A failed write (e.g. the database is busy) loses one tick, not the loop
+            log.exception("Energy logging failed: %s", e)
+
+        await clock.sleep(5)
+
+async def log_sensor_data(sensor_data: SensorReading):
+    """Log sensor data to database when it changed beyond the deadband"""
+    if recorder:
+        recorder.record('sensors', pack_readings([sensor_data]))
+    anomaly_monitor.observe_sensors([sensor_data], now_ms())
+    if sensor_filter.should_persist(sensor_data):
+        await db.log_sensor_data(sensor_data)
+
+async def log_sensor_batch(readings: List[SensorReading]):
+    """Log the changed readings of a whole tick of fleet sensors to database"""
+    if recorder:
+        recorder.record('sensors', pack_readings(readings))
+    anomaly_monitor.observe_sensors(readings, now_ms())
+    changed = sensor_filter.filter(readings)
+    if changed:
+        await db.log_sensor_data_batch(changed)
+
+async def apply_device_states(actions: List[Tuple[str, str, bool]]) -> List[Dict]:
+    """Persist (device, state, publish) changes in one transaction, drive the simulated hardware and announce them over MQTT"""
+    await db.update_device_states([(device, state) for device, state, _ in actions])
+    
+    results = []
+    for device, state, publish in actions:
+        # Control simulated hardware
+        results.append(hardware_sim.control_device(device, state))
         
-        await asyncio.sleep(5)
-
-async def log_sensor_data(sensor_data: dict):
-    """Log sensor data to database"""
-    await db.log_sensor_data(sensor_data)
+        # Publish to MQTT
+        if publish and mqtt_client:
+            mqtt_client.publish_device_state(device, state)
+    return results
+
+# Every device action goes through a prioritized, batching worker pool
+dispatcher = ActionDispatcher.from_env(apply_device_states)
+if metrics.enabled:
+    metrics.register_gauge("device_action_queue_depth", dispatcher.queue_depth)
+
+async def apply_device_state(device: str, state: str, publish: bool = True, priority: str = "user") -> Dict:
+    """Persist a device state change, drive the simulated hardware and announce it over MQTT"""
+    return await dispatcher.submit(device, state, priority, publish)
+
+def current_device_state(device: str) -> Optional[str]:
+    return hardware_sim.get_device_state(device).get('state')
+
+# Devices switched ON when a CRITICAL security alert is raised while the system is armed
+SECURITY_LIGHTS = [device.strip() for device in os.getenv("SECURITY_LIGHTS", "light").split(",") if device.strip()]
+alert_actions: Set[asyncio.Task] = set()
+
+def _alert_action_done(task: asyncio.Task):
+    alert_actions.discard(task)
+    if not task.cancelled() and task.exception() is not None:
+        log.error("Alert-triggered device action failed: %s", task.exception())
+
+def dispatch_alert_action(device: str, state: str, reason: str):
+    """Apply an action triggered by a security or anomaly alert ahead of user and scheduled actions"""
+    if not hardware_sim.has_device(device):
+        return
+    log.warning("Alert action: %s -> %s (%s)", device, state, reason, extra={'device': device, 'action': state})
+    # Alerts are raised from synchronous code on the event loop, so the action runs as its own task
+    task = asyncio.get_running_loop().create_task(apply_device_state(device, state, priority="security"))
+    alert_actions.add(task)
+    task.add_done_callback(_alert_action_done)
+
+def respond_to_security_alert(alert: SecurityAlert):
+    if alert.severity == "CRITICAL" and security_monitor.security_status in ("ARMED", "AWAY"):
+        for device in SECURITY_LIGHTS:
+            if current_device_state(device) != "ON":
+                dispatch_alert_action(device, "ON", f"{alert.type} at {alert.location}")
+
+command_guard = CommandGuard.from_env(apply_device_state, current_device_state)
+
+# Free-text command matcher, compiled from the device registry on first use
+command_parser = LazyComponent("command_parser", lambda: CommandParser(list(hardware_sim.get_all_devices())))
+
+async def submit_command(device: str, state: str) -> Dict:
+    """A user command (HTTP or text), through the command guard"""
+    if recorder:
+        recorder.record('command', [device, state])
+    return await command_guard.submit(device, state)
 
 async def handle_mqtt_message(topic: str, payload: Dict):
+    if recorder:
+        recorder.record('mqtt', [topic, payload])
     device = topic.split('/')[-1]  # Extract device name from topic
     if 'state' in payload:
-        await db.update_device_state(device, payload['state'])
-        # Update hardware simulator
-        hardware_sim.control_device(device, payload['state'])
-        print(f"[MQTT] {device.capitalize()} turned {payload['state']}")
+        state = str(payload['state']).upper()
+        # Our own publishes echo back on subscribed topics; those are no-ops
+        if command_guard.is_noop(device, state, "mqtt"):
+            return
+        await apply_device_state(device, state, publish=False)
+        command_guard.record_applied("mqtt")
+        log.info("MQTT command: %s turned %s", device, state, extra={'device': device, 'state': state})
 
 async def execute_scheduled_action(device: str, action: str):
     """Execute scheduled device action"""
-    await db.update_device_state(device, action)
-    
-    # Control simulated hardware
-    hardware_sim.control_device(device, action)
-    
-    # Publish to MQTT
-    mqtt_client.publish_device_state(device, action)
-    print(f"[SCHEDULER] Executed: {device} -> {action}")
+    if command_guard.is_noop(device, action, "schedule"):
+        log.debug("Scheduled action skipped, %s already %s", device, action)
+        return
+    await apply_device_state(device, action, priority="schedule")
+    command_guard.record_applied("schedule")
+    log.info("Scheduled action executed: %s -> %s", device, action, extra={'device': device, 'action': action})
 
 @app.post("/device/control")
 async def control_device(control: DeviceControl):
-    valid_devices = ['fan', 'light']
     valid_actions = ['ON', 'OFF']
     
-    if control.device not in valid_devices:
+    if not hardware_sim.has_device(control.device):
         raise HTTPException(status_code=400, detail="Invalid device")
     if control.action.upper() not in valid_actions:
         raise HTTPException(status_code=400, detail="Invalid action")
     
-    # Update device state in database
     state = control.action.upper()
-    await db.update_device_state(control.device, state)
-    
-    # Control simulated hardware
-    result = hardware_sim.control_device(control.device, state)
-    
-    # Publish to MQTT
-    mqtt_client.publish_device_state(control.device, state)
+    try:
+        outcome = await submit_command(control.device, state)
+    except RateLimited as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": str(math.ceil(e.retry_after))})
     
     return {
         "status": "success",
-        "message": f"{control.device} set to {state}",
-        "hardware_response": result
+        "message": f"{control.device} set to {state}" if outcome['changed'] else f"{control.device} already {state}",
+        "changed": outcome['changed'],
+        "hardware_response": outcome.get('hardware_response') or hardware_sim.get_device_state(control.device)
     }
 
+async def run_command(device: str, state: str) -> Dict:
+    try:
+        outcome = await submit_command(device, state)
+    except RateLimited as e:
+        return {"device": device, "action": state, "status": "rate_limited", "retry_after": math.ceil(e.retry_after)}
+    return {"device": device, "action": state, "status": "success", "changed": outcome['changed']}
+
+@app.post("/command")
+async def text_command(command: TextCommand):
+    """Parse free text ("turn on the lights and the fan off") and apply every action it names"""
+    actions = command_parser.parse(command.text)
+    results = await asyncio.gather(*(run_command(device, state) for device, state in actions))
+    return {"text": command.text, "understood": bool(actions), "actions": results}
+
+@app.get("/command/stats")
+async def get_command_parser_stats():
+    """Matcher size and parse cache hit rate"""
+    return command_parser.get_stats()
+
+@app.get("/device/states")
+async def get_device_states_at(at: Optional[str] = None):
+    """State of every device at time `at` (ISO timestamp, default now), from the device event log"""
+    at_ms, _ = parse_time_range(at, None)
+    at_ms = at_ms if at_ms is not None else now_ms()
+    return {"at": from_epoch_ms(at_ms), "devices": await db.get_device_states_at(at_ms)}
+
+@app.get("/device/{device}/uptime")
+async def get_device_uptime(device: str, start: Optional[str] = None, end: Optional[str] = None):
+    """Total ON time of a device between `start` and `end` (ISO timestamps, default the last 24 hours)"""
+    start_ms, end_ms = parse_time_range(start, end)
+    end_ms = min(end_ms if end_ms is not None else now_ms(), now_ms())
+    start_ms = start_ms if start_ms is not None else end_ms - 24 * 3600 * 1000
+    if start_ms >= end_ms:
+        raise HTTPException(status_code=400, detail="start must be before end")
+
+    events = await db.get_device_events(device, start_ms, end_ms)
+    if not events:
+        raise HTTPException(status_code=404, detail=f"No recorded history for {device} before {from_epoch_ms(end_ms)}")
+    durations = state_durations(events, end_ms)
+    on_ms = durations.get("ON", 0)
+    return {
+        "device": device,
+        "start": from_epoch_ms(start_ms),
+        "end": from_epoch_ms(end_ms),
+        "on_seconds": round(on_ms / 1000, 3),
+        "on_ratio": round(on_ms / (end_ms - start_ms), 4),
+        "switch_count": sum(1 for prev, cur in zip(events, events[1:]) if prev[1] != cur[1]),
+        "known_from": from_epoch_ms(events[0][0]),
+    }
+
+@app.get("/device/control/stats")
+async def get_command_stats():
+    """Counts of applied and suppressed (no-op, coalesced, rate-limited) device commands"""
+    return command_guard.get_stats()
+
+@app.get("/device/dispatch/stats")
+async def get_dispatch_stats():
+    """Worker pool queue depth and how many device actions each database write carried"""
+    return dispatcher.get_stats()
+
 @app.get("/device/status")
 async def get_device_status():
     db_states = await db.get_device_states()
@@ -162,23 +488,85 @@ async def get_device_status():
         device['hardware'] = hardware_states.get(device['name'], {})
         combined.append(device)
     
-    return combined
+    return FastJSONResponse(combined)
+
+def resolve_chart_range(start: Optional[str], end: Optional[str], points: int, method: str):
+    """Validate a `points=` request; returns (start_ms, end_ms, fixed_range), by default the last hour"""
+    if not 2 <= points <= MAX_SERIES_POINTS or method not in DOWNSAMPLE_METHODS:
+        raise HTTPException(status_code=400, detail=f"points must be between 2 and {MAX_SERIES_POINTS} "
+                                                    f"and method one of {', '.join(DOWNSAMPLE_METHODS)}")
+    start_ms, end_ms = parse_time_range(start, end)
+    # A range ending "now" changes on every call; only a fixed range can be revalidated
+    fixed_range = end_ms is not None
+    end_ms = end_ms if end_ms is not None else now_ms()
+    start_ms = start_ms if start_ms is not None else end_ms - 3600 * 1000
+    if start_ms >= end_ms:
+        raise HTTPException(status_code=400, detail="start must be before end")
+    return start_ms, end_ms, fixed_range
+
+def encode_points(series: Dict[str, tuple]) -> Dict[str, bytes]:
+    return {column: point_encoders[column].encode(list(zip(*points))) for column, points in series.items()}
 
 @app.get("/energy")
-async def get_energy_data():
-    logs = await db.get_latest_energy_logs(10)
-    total_power = hardware_sim.calculate_total_power()
-    
-    return {
-        "current_consumption": round(total_power, 2),
-        "history": logs
-    }
+async def get_energy_data(request: Request, points: Optional[int] = None, method: str = "lttb",
+                          start: Optional[str] = None, end: Optional[str] = None):
+    """
+    Current consumption and the latest energy logs; with `points`, the range
+    `start`-`end` (ISO timestamps, default the last hour) downsampled to at most
+    that many points for charting (method: lttb or minmax).
+    """
+    total_power = round(hardware_sim.calculate_total_power(), 2)
+
+    # Current consumption can change without a new log row, so it is part of the
+    # ETag and no Last-Modified is sent
+    max_id, _ = await db.get_log_version("energy_logs")
+    if points is not None:
+        start_ms, end_ms, fixed_range = resolve_chart_range(start, end, points, method)
+        headers = {}
+        if fixed_range:
+            headers = validator_headers(make_etag("energy-chart", max_id, total_power, start_ms, end_ms, points, method))
+            if is_not_modified(request, headers["ETag"]):
+                return not_modified(headers)
+        series = encode_points(await db.get_downsampled("energy_logs", start_ms, end_ms, points, method))
+        return RawJSONResponse(
+            b'{"current_consumption":' + dumps(total_power)
+            + b',"history":' + series['watts'] + b',"method":' + dumps(method) + b'}',
+            headers=headers
+        )
+
+    headers = validator_headers(make_etag("energy", max_id, total_power))
+    if is_not_modified(request, headers["ETag"]):
+        return not_modified(headers)
+
+    rows = await db.get_latest_energy_rows(10)
+    return RawJSONResponse(
+        b'{"current_consumption":' + dumps(total_power)
+        + b',"history":' + energy_row_encoder.encode(rows) + b'}',
+        headers=headers
+    )
+
+async def rows_since(table: str, encoder: RowEncoder, cursor: int, limit: int) -> RawJSONResponse:
+    """One page of rows newer than the client's cursor, plus the cursor to send next time"""
+    if cursor < 0 or not 0 < limit <= MAX_SYNC_ROWS:
+        raise HTTPException(status_code=400, detail=f"cursor must be >= 0 and limit between 1 and {MAX_SYNC_ROWS}")
+    rows = await db.get_rows_since(table, cursor, limit)
+    next_cursor = rows[-1][0] if rows else cursor
+    return RawJSONResponse(
+        b'{"rows":' + encoder.encode(rows)
+        + b',"cursor":' + dumps(next_cursor)
+        + b',"more":' + dumps(len(rows) == limit) + b'}'
+    )
+
+@app.get("/energy/since")
+async def get_energy_since(cursor: int = 0, limit: int = DEFAULT_SYNC_ROWS):
+    """Energy log rows with id greater than `cursor`; pass the returned cursor on the next call"""
+    return await rows_since("energy_logs", energy_row_encoder, cursor, limit)
 
 @app.get("/predict")
 async def get_prediction():
     """AI-powered predictions and recommendations"""
     device_logs = await db.get_latest_energy_logs(50)
-    predictions = ai_predictor.analyze_pattern(device_logs)
+    predictions = ai_predictor.analyze_pattern(device_logs, last_optimization)
     return predictions
 
 # ============ NEW ENDPOINTS ============
@@ -188,15 +576,63 @@ async def get_energy_tips():
     """Get AI-powered energy saving tips"""
     return {"tips": ai_predictor.get_energy_saving_tips()}
 
+async def energy_cost(start: int, end: int) -> Dict:
+    """Tariff cost of [start, end), after folding new energy logs into the hourly rollup"""
+    cost_calculator.invalidate(await db.refresh_energy_hourly())
+    return await cost_calculator.cost(start, end)
+
+@app.get("/energy/cost")
+async def get_energy_cost(start: Optional[str] = Query(None, alias="from"), end: Optional[str] = Query(None, alias="to")):
+    """Energy cost under the configured tariff (from/to: ISO timestamps, default the current billing month)"""
+    start_ms, end_ms = parse_time_range(start, end)
+    end_ms = end_ms if end_ms is not None else now_ms()
+    start_ms = start_ms if start_ms is not None else month_start(end_ms)
+    if start_ms >= end_ms:
+        raise HTTPException(status_code=400, detail="from must be before to")
+    result = await energy_cost(start_ms, end_ms)
+    # Reading intervals too long to integrate are not in the totals
+    result['uncosted_gaps'] = dict(db.rollup_gaps)
+    return result
+
+@app.get("/energy/tariff")
+async def get_tariff():
+    """The tariff used for cost calculations"""
+    return tariff.describe()
+
 @app.get("/ai/insights/{device}")
 async def get_device_insights(device: str):
-    """Get detailed AI insights for specific device"""
-    return ai_predictor.get_device_insights(device)
+    """Get detailed AI insights for specific device, with figures from its energy meter"""
+    end = now_ms()
+    # The billing month's rate is cached and kept current by the energy loop, so no rollup work per request
+    rate = await cost_calculator.period_rate(end)
+    return ai_predictor.get_device_insights(device, energy_meter.usage(device, end), rate)
+
+@app.get("/energy/devices")
+async def get_device_energy():
+    """Accumulated energy, cost and ON time for every metered device"""
+    now = now_ms()
+    return {"devices": energy_meter.snapshot(now), "rate_per_kwh": await cost_calculator.marginal_rate(now)}
+
+@app.get("/energy/devices/{device}/power")
+async def get_device_power(device: str, start: Optional[str] = None, end: Optional[str] = None):
+    """Power samples for one device (default: last hour)"""
+    channel = energy_meter.channel(device)
+    if channel is None:
+        raise HTTPException(status_code=404, detail=f"Device '{device}' has no power samples")
+    start_ms, end_ms = parse_time_range(start, end)
+    end_ms = end_ms if end_ms is not None else now_ms() + 1
+    start_ms = start_ms if start_ms is not None else end_ms - 3600 * 1000
+    series = await db.get_power_series(channel, start_ms, end_ms)
+    return {
+        "device": device,
+        "samples": [{"timestamp": from_epoch_ms(ts), "watts": round(watts, 2)} for ts, watts in series]
+    }
 
 @app.get("/ai/summary")
 async def get_weekly_summary():
     """Get weekly energy and usage summary"""
-    return ai_predictor.get_weekly_summary()
+    end = now_ms()
+    return ai_predictor.get_weekly_summary(await energy_cost(end - 7 * 24 * HOUR_MS, end))
 
 # Scheduling Endpoints
 @app.post("/schedule")
@@ -207,10 +643,101 @@ async def add_schedule(schedule: Schedule):
         schedule.time,
         schedule.action,
         schedule.enabled if schedule.enabled is not None else True,
-        schedule.days
+        schedule.days,
+        schedule.until
     )
+    if recorder:
+        recorder.record('schedule', dict(result, device=schedule.device))
     return {"status": "success", "schedule": result}
 
+# Load-shifting optimizer; solves run in a worker process started on first use
+optimizer_pool: Optional[ProcessPoolExecutor] = None
+last_optimization: Optional[Dict] = None
+
+def typical_power(device: str) -> Optional[float]:
+    """Average draw while ON from the energy meter, else the current draw"""
+    meter = energy_meter.meters.get(device)
+    if meter is None:
+        return None
+    if meter.on_seconds:
+        return meter.energy_wh / (meter.on_seconds / 3600)
+    return meter.watts or None
+
+@app.post("/schedule/optimize")
+async def optimize_schedule(request: OptimizeRequest):
+    """Place flexible device runs in the cheapest 15-minute slots under an optional peak cap; apply=true writes the schedules"""
+    global optimizer_pool, last_optimization
+    if request.apply:
+        # Schedules are one per device: applying must neither merge two runs nor silently replace a user's schedule
+        devices = [job.device for job in request.jobs]
+        repeated = sorted({device for device in devices if devices.count(device) > 1})
+        if repeated:
+            raise HTTPException(status_code=400, detail=f"Only one job per device can be applied: {', '.join(repeated)}")
+        existing = scheduler.get_schedules()
+        conflicts = sorted(device for device in devices
+                           if device in existing and existing[device].get('source') != 'optimizer')
+        if conflicts and not request.replace_schedules:
+            raise HTTPException(status_code=409, detail=f"Devices already have schedules: {', '.join(conflicts)} "
+                                                        "(set replace_schedules to overwrite them)")
+    jobs = []
+    for job in request.jobs:
+        if not hardware_sim.has_device(job.device):
+            raise HTTPException(status_code=400, detail=f"Invalid device '{job.device}'")
+        spec = job.dict(exclude_none=True)
+        if job.profile is None:
+            if job.duration_minutes is None:
+                raise HTTPException(status_code=400, detail=f"{job.device}: duration_minutes or profile required")
+            spec.setdefault('power_watts', typical_power(job.device))
+            if spec['power_watts'] is None:
+                raise HTTPException(status_code=400, detail=f"{job.device}: power_watts required (no metered usage yet)")
+        jobs.append(spec)
+
+    # Next-kWh slab rate for this month, shaped by the time-of-use bands; base load is the last week's hourly average
+    end = now_ms()
+    month = await energy_cost(month_start(end), end)
+    prices = slot_prices(tariff.marginal_rate(month['energy_kwh']), tariff.hour_multiplier)
+    base_load = hourly_base_load(await db.get_energy_hourly(end - 7 * 24 * HOUR_MS, end),
+                                 lambda hour: datetime.fromtimestamp(hour / 1000).hour)
+    try:
+        problem = problem_for(jobs, prices, base_load, request.peak_cap_watts)
+    except (KeyError, ValueError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    if optimizer_pool is None:
+        optimizer_pool = ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context('spawn'))
+    result = await asyncio.get_running_loop().run_in_executor(optimizer_pool, solve, problem)
+    metrics.observe("optimizer_solve_seconds", result['solve_ms'] / 1000)
+
+    if request.apply:
+        # Checked again: a user schedule may have been added while the solve ran
+        existing = scheduler.get_schedules()
+        result['replaced'], result['conflicts'] = [], []
+        for entry in result['schedule']:
+            if entry['scheduled']:
+                previous = existing.get(entry['device'])
+                if previous is not None and previous.get('source') != 'optimizer':
+                    if not request.replace_schedules:
+                        result['conflicts'].append(entry['device'])
+                        continue
+                    result['replaced'].append({'device': entry['device'], **previous})
+                scheduler.add_schedule(entry['device'], entry['start'], 'ON', until=entry['end'], source='optimizer')
+    result['applied'] = request.apply
+    result['currency'] = tariff.currency
+    last_optimization = result
+    return result
+
+@app.get("/schedule/optimize")
+async def get_last_optimization():
+    """Result of the most recent optimizer run"""
+    if last_optimization is None:
+        raise HTTPException(status_code=404, detail="No optimization has run yet")
+    return last_optimization
+
+@app.get("/schedule/stats")
+async def get_schedule_stats():
+    """Scheduled actions fired and how late after their minute they were applied"""
+    return scheduler.get_stats()
+
 @app.get("/schedule")
 async def get_schedules():
     """Get all device schedules"""
@@ -247,7 +774,7 @@ async def get_security_status():
 @app.get("/security/alerts")
 async def get_security_alerts():
     """Get all security alerts"""
-    return {"alerts": security_monitor.get_alerts()}
+    return {"alerts": [alert.to_dict() for alert in security_monitor.get_alerts()]}
 
 @app.get("/security/stats")
 async def get_security_stats():
@@ -289,7 +816,7 @@ async def clear_acknowledged_alerts():
 async def get_maintenance_alerts():
     """Get all proactive maintenance alerts"""
     alerts = maintenance_monitor.get_maintenance_alerts()
-    return {"alerts": alerts}
+    return {"alerts": [alert.to_dict() for alert in alerts]}
 
 @app.get("/maintenance/{device}/health")
 async def get_device_health(device: str):
@@ -318,10 +845,76 @@ async def get_sensor_data():
     return hardware_sim.get_sensor_data()
 
 @app.get("/sensors/history")
-async def get_sensor_history(limit: int = 20):
-    """Get sensor data history"""
-    logs = await db.get_latest_sensor_logs(limit)
-    return {"history": logs}
+async def get_sensor_history(request: Request, limit: int = 20, step: Optional[float] = None,
+                             start: Optional[str] = None, end: Optional[str] = None,
+                             points: Optional[int] = None, method: str = "lttb", node: int = 0):
+    """
+    Get sensor data history of one sensor node (0 for the single simulated room).
+    Without `step`, the latest `limit` persisted rows; with `step` (seconds), the
+    reconstructed reading at every step between `start` and `end` (ISO
+    timestamps, default the last hour); with `points`, temperature and humidity
+    over that range downsampled to at most that many points each for charting
+    (method: lttb or minmax).
+    """
+    max_id, max_timestamp = await db.get_log_version("sensor_logs")
+    if points is not None:
+        start_ms, end_ms, fixed_range = resolve_chart_range(start, end, points, method)
+        headers = {}
+        if fixed_range:
+            headers = validator_headers(make_etag("sensor-chart", max_id, node, start_ms, end_ms, points, method))
+            if is_not_modified(request, headers["ETag"]):
+                return not_modified(headers)
+        series = encode_points(await db.get_downsampled("sensor_logs", start_ms, end_ms, points, method, node=node))
+        return RawJSONResponse(
+            b'{"history":{"temperature":' + series['temperature'] + b',"humidity":' + series['humidity']
+            + b'},"method":' + dumps(method) + b',"node":' + dumps(node) + b'}',
+            headers=headers
+        )
+    if step is None:
+        headers = validator_headers(make_etag("sensors", max_id, node, limit), max_timestamp)
+        if is_not_modified(request, headers["ETag"], max_timestamp):
+            return not_modified(headers)
+        rows = await db.get_latest_sensor_rows(limit, node)
+        return RawJSONResponse(b'{"history":' + sensor_row_encoder.encode(rows) + b'}', headers=headers)
+
+    start_ms, end_ms = parse_time_range(start, end)
+    # A range ending "now" changes on every call; only a fixed range can be revalidated
+    fixed_range = end_ms is not None
+    end_ms = end_ms if end_ms is not None else now_ms()
+    start_ms = start_ms if start_ms is not None else end_ms - 3600 * 1000
+    step_ms = int(step * 1000)
+    if step_ms <= 0 or start_ms >= end_ms:
+        raise HTTPException(status_code=400, detail="step must be positive and start before end")
+    if (end_ms - start_ms) // step_ms > MAX_SERIES_POINTS:
+        raise HTTPException(status_code=400, detail=f"Range would produce more than {MAX_SERIES_POINTS} points")
+    headers = {}
+    if fixed_range:
+        headers = validator_headers(make_etag("sensor-series", max_id, node, start_ms, end_ms, step_ms))
+        if is_not_modified(request, headers["ETag"]):
+            return not_modified(headers)
+    return FastJSONResponse({"history": await db.get_sensor_series(start_ms, end_ms, step_ms, node),
+                             "step": step, "node": node},
+                            headers=headers)
+
+@app.get("/sensors/since")
+async def get_sensors_since(cursor: int = 0, limit: int = DEFAULT_SYNC_ROWS):
+    """Sensor log rows with id greater than `cursor`; pass the returned cursor on the next call"""
+    return await rows_since("sensor_logs", sensor_row_encoder, cursor, limit)
+
+@app.get("/sensors/logging")
+async def get_sensor_logging_stats():
+    """Get change-detection statistics for sensor logging"""
+    return sensor_filter.get_stats()
+
+@app.get("/anomalies/stats")
+async def get_anomaly_stats():
+    """Streams watched by the anomaly detectors, their state size and alerts raised"""
+    return anomaly_monitor.get_stats()
+
+@app.get("/snapshots/stats")
+async def get_snapshot_stats():
+    """Warm-restart snapshot sizes, save timings and components still waiting to restore"""
+    return snapshots.get_stats()
 
 @app.get("/hardware/status")
 async def get_hardware_status():
@@ -330,4 +923,100 @@ async def get_hardware_status():
         "devices": hardware_sim.get_all_devices(),
         "sensors": hardware_sim.get_sensor_data(),
         "total_power": round(hardware_sim.calculate_total_power(), 2)
-    }
\ No newline at end of file
+    }
+
+# Telemetry Export Endpoints
+def stream_export(name: str, columns, chunks, fmt: str) -> StreamingResponse:
+    """Stream encoded row chunks straight from a database cursor"""
+    try:
+        encoder = get_encoder(fmt, columns)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    async def body():
+        loop = asyncio.get_running_loop()
+        yield encoder.header()
+        async for rows in chunks:
+            # Encode off the event loop so large exports don't stall other requests
+            yield await loop.run_in_executor(None, encoder.encode, rows)
+        yield encoder.footer()
+
+    return StreamingResponse(
+        body(),
+        media_type=encoder.media_type,
+        headers={"Content-Disposition": f'attachment; filename="{name}.{encoder.extension}"'}
+    )
+
+def parse_time_range(start: Optional[str], end: Optional[str]):
+    """Convert optional ISO start/end query values to epoch milliseconds"""
+    try:
+        return (None if start is None else to_epoch_ms(start),
+                None if end is None else to_epoch_ms(end))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="start and end must be ISO 8601 timestamps")
+
+@app.get("/export/energy")
+async def export_energy(fmt: str = Query("csv", alias="format"), start: Optional[str] = None, end: Optional[str] = None):
+    """Export energy logs (format: csv, binary, arrow, parquet or columnar; start/end: ISO timestamps)"""
+    start_ms, end_ms = parse_time_range(start, end)
+    return stream_export("energy_logs", ENERGY_COLUMNS, db.iter_energy_logs(start_ms, end_ms), fmt)
+
+@app.get("/export/sensors")
+async def export_sensors(fmt: str = Query("csv", alias="format"), start: Optional[str] = None, end: Optional[str] = None):
+    """Export sensor logs (format: csv, binary, arrow, parquet or columnar; start/end: ISO timestamps)"""
+    start_ms, end_ms = parse_time_range(start, end)
+    return stream_export("sensor_logs", SENSOR_COLUMNS, db.iter_sensor_logs(start_ms, end_ms), fmt)
+
+# Bulk Import Endpoint
+@app.post("/import/{kind}")
+async def bulk_import(kind: str, request: Request, fmt: str = Query("csv", alias="format"),
+                      batch_size: int = 50000):
+    """Bulk load historical energy or sensor logs from a streamed CSV or NDJSON body"""
+    importer = BulkImporter(db.db_path, batch_size=batch_size, database=db)
+    try:
+        report = await importer.run(kind, iter_lines(request.stream()), fmt)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if report['rollup_rebuilt']:
+        cost_calculator.clear()
+    log.info("Bulk import into %s: %d rows (%d rejected) at %d rows/s",
+             report['table'], report['imported'], report['rejected'], report['rows_per_second'])
+    return report
+
+# Instrumentation
+@app.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics():
+    """Prometheus text-format metrics"""
+    if not metrics.enabled:
+        raise HTTPException(status_code=404, detail="Metrics disabled")
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+# Profiling (ENABLE_PROFILING=1)
+@app.post("/admin/profile/start")
+async def start_profile(interval_ms: float = Query(5.0, ge=1, le=1000),
+                        seconds: float = Query(30.0, gt=0, le=MAX_PROFILE_SECONDS),
+                        all_threads: bool = False):
+    """Start sampling the event loop thread (or every thread); stops by itself after `seconds`"""
+    try:
+        return profiler.start(interval_ms / 1000, seconds, all_threads)
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+@app.post("/admin/profile/stop", response_class=PlainTextResponse)
+async def stop_profile():
+    """End the profile and return collapsed stacks, ready for flamegraph.pl or speedscope"""
+    try:
+        return PlainTextResponse(profiler.stop())
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+@app.get("/admin/profile")
+async def get_profile_status():
+    return profiler.get_status()
+
+@app.get("/admin/tasks")
+async def get_task_dump(all_tasks: bool = False):
+    """Background loops: state, where each is suspended and seconds since its last iteration"""
+    if not features["profiling"]:
+        raise FeatureDisabled("profiling")
+    return background_tasks.dump(all_tasks)
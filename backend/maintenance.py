@@ -2,10 +2,15 @@ from datetime import datetime, timedelta
 from typing import List, Dict
 import random
 
+from clock import clock
+from records import MaintenanceAlert
+
 class MaintenanceMonitor:
     """Proactive maintenance monitoring and alert system"""
     
     def __init__(self):
+        self.detected_alerts: List[MaintenanceAlert] = []
+        
         # Simulated device usage data
         self.device_usage = {
             "fan": {
@@ -44,88 +49,106 @@ class MaintenanceMonitor:
             }
         }
     
-    def get_maintenance_alerts(self) -> List[Dict]:
+    def add_alert(self, alert: MaintenanceAlert):
+        """Record a detected fault (e.g. from anomaly detection) alongside the scheduled-maintenance alerts"""
+        alert.timestamp = clock.now_ms()
+        self.detected_alerts.insert(0, alert)
+        
+        # Keep only last 50 detected alerts
+        if len(self.detected_alerts) > 50:
+            self.detected_alerts = self.detected_alerts[:50]
+    
+    def export_state(self) -> Dict:
+        """Usage counters and detected faults, for warm-restart snapshots"""
+        return {'device_usage': self.device_usage,
+                'detected_alerts': [alert.to_dict() for alert in self.detected_alerts]}
+    
+    def restore_state(self, state: Dict):
+        self.device_usage.update(state['device_usage'])
+        self.detected_alerts = [MaintenanceAlert.from_dict(alert) for alert in state['detected_alerts'][:50]]
+    
+    def get_maintenance_alerts(self) -> List[MaintenanceAlert]:
         """Generate proactive maintenance alerts"""
-        alerts = []
+        alerts = list(self.detected_alerts)
         
         for device, data in self.device_usage.items():
             # Check if maintenance is due
             hours_until_maintenance = data['maintenance_interval'] - data['total_hours']
             
             if hours_until_maintenance <= 0:
-                alerts.append({
-                    "device": device.replace("_", " ").title(),
-                    "message": f"Maintenance overdue by {abs(hours_until_maintenance)} hours",
-                    "priority": "CRITICAL",
-                    "type": "OVERDUE",
-                    "action_required": "Schedule maintenance immediately",
-                    "estimated_cost": f"₹{random.randint(300, 800)}"
-                })
+                alerts.append(MaintenanceAlert(
+                    device.replace("_", " ").title(),
+                    f"Maintenance overdue by {abs(hours_until_maintenance)} hours",
+                    "CRITICAL",
+                    "OVERDUE",
+                    "Schedule maintenance immediately",
+                    f"₹{random.randint(300, 800)}"
+                ))
             elif hours_until_maintenance <= 50:
-                alerts.append({
-                    "device": device.replace("_", " ").title(),
-                    "message": f"Maintenance due in {hours_until_maintenance} hours of operation",
-                    "priority": "HIGH",
-                    "type": "DUE_SOON",
-                    "action_required": "Schedule maintenance within 7 days",
-                    "estimated_cost": f"₹{random.randint(200, 600)}"
-                })
+                alerts.append(MaintenanceAlert(
+                    device.replace("_", " ").title(),
+                    f"Maintenance due in {hours_until_maintenance} hours of operation",
+                    "HIGH",
+                    "DUE_SOON",
+                    "Schedule maintenance within 7 days",
+                    f"₹{random.randint(200, 600)}"
+                ))
             elif hours_until_maintenance <= 100:
-                alerts.append({
-                    "device": device.replace("_", " ").title(),
-                    "message": f"Maintenance recommended in {hours_until_maintenance} hours",
-                    "priority": "MEDIUM",
-                    "type": "UPCOMING",
-                    "action_required": "Plan maintenance in next 2 weeks",
-                    "estimated_cost": f"₹{random.randint(150, 500)}"
-                })
+                alerts.append(MaintenanceAlert(
+                    device.replace("_", " ").title(),
+                    f"Maintenance recommended in {hours_until_maintenance} hours",
+                    "MEDIUM",
+                    "UPCOMING",
+                    "Plan maintenance in next 2 weeks",
+                    f"₹{random.randint(150, 500)}"
+                ))
             
             # Check component-specific alerts
             if device == "fan":
                 if data['filter_life'] < 20:
-                    alerts.append({
-                        "device": "Fan",
-                        "message": f"Filter replacement required (life remaining: {data['filter_life']}%)",
-                        "priority": "HIGH",
-                        "type": "COMPONENT",
-                        "action_required": "Replace filter",
-                        "estimated_cost": "₹150"
-                    })
+                    alerts.append(MaintenanceAlert(
+                        "Fan",
+                        f"Filter replacement required (life remaining: {data['filter_life']}%)",
+                        "HIGH",
+                        "COMPONENT",
+                        "Replace filter",
+                        "₹150"
+                    ))
                 elif data['filter_life'] < 50:
-                    alerts.append({
-                        "device": "Fan",
-                        "message": f"Filter cleaning recommended (life: {data['filter_life']}%)",
-                        "priority": "MEDIUM",
-                        "type": "COMPONENT",
-                        "action_required": "Clean filter",
-                        "estimated_cost": "₹0 (DIY)"
-                    })
+                    alerts.append(MaintenanceAlert(
+                        "Fan",
+                        f"Filter cleaning recommended (life: {data['filter_life']}%)",
+                        "MEDIUM",
+                        "COMPONENT",
+                        "Clean filter",
+                        "₹0 (DIY)"
+                    ))
             
             elif device == "light":
                 if data['bulb_life'] < 20:
-                    alerts.append({
-                        "device": "Light",
-                        "message": f"Bulb replacement needed soon (life: {data['bulb_life']}%)",
-                        "priority": "MEDIUM",
-                        "type": "COMPONENT",
-                        "action_required": "Replace bulb",
-                        "estimated_cost": "₹200"
-                    })
+                    alerts.append(MaintenanceAlert(
+                        "Light",
+                        f"Bulb replacement needed soon (life: {data['bulb_life']}%)",
+                        "MEDIUM",
+                        "COMPONENT",
+                        "Replace bulb",
+                        "₹200"
+                    ))
             
             elif device == "ac":
                 if data['filter_life'] < 30:
-                    alerts.append({
-                        "device": "AC",
-                        "message": f"AC filter critically dirty (life: {data['filter_life']}%)",
-                        "priority": "HIGH",
-                        "type": "COMPONENT",
-                        "action_required": "Clean/replace AC filter immediately",
-                        "estimated_cost": "₹300"
-                    })
+                    alerts.append(MaintenanceAlert(
+                        "AC",
+                        f"AC filter critically dirty (life: {data['filter_life']}%)",
+                        "HIGH",
+                        "COMPONENT",
+                        "Clean/replace AC filter immediately",
+                        "₹300"
+                    ))
         
         # Sort by priority
         priority_order = {"CRITICAL": 0, "HIGH": 1, "MEDIUM": 2, "LOW": 3}
-        alerts.sort(key=lambda x: priority_order.get(x['priority'], 4))
+        alerts.sort(key=lambda x: priority_order.get(x.priority, 4))
         
         return alerts
     
@@ -179,7 +202,7 @@ class MaintenanceMonitor:
         last_maintenance = datetime.strptime(data['last_maintenance'], "%Y-%m-%d")
         # Assume 8 hours usage per day
         days_until = (data['maintenance_interval'] - data['total_hours']) / 8
-        next_date = datetime.now() + timedelta(days=max(0, days_until))
+        next_date = clock.now() + timedelta(days=max(0, days_until))
         return next_date.strftime("%Y-%m-%d")
     
     def _get_component_status(self, device: str, data: Dict) -> List[Dict]:
@@ -0,0 +1,181 @@
+import asyncio
+import functools
+import os
+import time
+from bisect import bisect_left
+from typing import Callable, Dict, Tuple
+
+# Latency buckets in seconds (upper bounds), Prometheus-style
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+# Histograms measuring something slower than a request
+BUCKETS = {
+    'schedule_fire_lateness_seconds': (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0),
+}
+
+HELP = {
+    'http_request_duration_seconds': ('histogram', 'HTTP request latency by route'),
+    'http_requests_total': ('counter', 'HTTP requests by route and status'),
+    'db_query_duration_seconds': ('histogram', 'Database call latency by operation'),
+    'event_loop_lag_seconds': ('histogram', 'Delay between scheduled and actual wake-up of the event loop'),
+    'event_loop_lag_last_seconds': ('gauge', 'Most recent event loop lag sample'),
+    'background_task_iterations_total': ('counter', 'Iterations completed by each background loop'),
+    'background_task_last_run_timestamp_seconds': ('gauge', 'Unix time of the last iteration of each background loop'),
+    'mqtt_outgoing_queue_depth': ('gauge', 'Messages queued in the MQTT client awaiting delivery'),
+    'mqtt_connected': ('gauge', '1 while connected to the MQTT broker'),
+    'mqtt_inflight_messages': ('gauge', 'QoS>0 messages in flight to the MQTT broker'),
+    'startup_duration_seconds': ('gauge', 'Time taken by the application startup handler'),
+    'device_commands_total': ('counter', 'Device commands by source and outcome (applied, noop, coalesced, rate_limited)'),
+    'sensor_readings_total': ('counter', 'Sensor readings by logging outcome (persisted or suppressed)'),
+    'energy_rollup_gaps_total': ('counter', 'Intervals between energy readings too long to include in the hourly rollup'),
+    'schedule_fire_lateness_seconds': ('histogram', 'Delay from the scheduled minute to the action being applied'),
+    'device_action_queue_seconds': ('histogram', 'Time device actions wait for a dispatch worker, by priority'),
+    'profiler_samples_total': ('counter', 'Stack samples taken by the on-demand profiler'),
+}
+
+
+class Histogram:
+    """Cumulative-bucket histogram"""
+
+    __slots__ = ('buckets', 'counts', 'sum', 'count')
+
+    def __init__(self, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class MetricsRegistry:
+    """
+    In-process metrics store rendered in Prometheus text format.
+    When disabled every recording call returns immediately and the `timed`
+    decorator leaves functions unwrapped, so instrumentation costs nothing.
+    """
+
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self.counters: Dict[Tuple[str, tuple], float] = {}
+        self.gauges: Dict[Tuple[str, tuple], float] = {}
+        self.histograms: Dict[Tuple[str, tuple], Histogram] = {}
+        self.gauge_callbacks: Dict[str, Callable[[], float]] = {}
+        # Monotonic time of each background loop's last iteration, kept even when disabled for task dumps
+        self.heartbeats: Dict[str, float] = {}
+
+    def inc(self, name: str, value: float = 1, **labels):
+        """Increment a counter"""
+        if not self.enabled:
+            return
+        key = (name, tuple(sorted(labels.items())))
+        self.counters[key] = self.counters.get(key, 0) + value
+
+    def set_gauge(self, name: str, value: float, **labels):
+        """Set a gauge to an absolute value"""
+        if not self.enabled:
+            return
+        self.gauges[(name, tuple(sorted(labels.items())))] = value
+
+    def register_gauge(self, name: str, callback: Callable[[], float]):
+        """Register a gauge whose value is read from `callback` at scrape time"""
+        self.gauge_callbacks[name] = callback
+
+    def observe(self, name: str, value: float, **labels):
+        """Record a value (seconds for latencies) in a histogram"""
+        if not self.enabled:
+            return
+        key = (name, tuple(sorted(labels.items())))
+        histogram = self.histograms.get(key)
+        if histogram is None:
+            histogram = self.histograms[key] = Histogram(BUCKETS.get(name, DEFAULT_BUCKETS))
+        histogram.observe(value)
+
+    def timed(self, name: str):
+        """Decorator recording the duration of an async function, labelled by its name"""
+        def decorator(func):
+            if not self.enabled:
+                return func
+
+            @functools.wraps(func)
+            async def wrapper(*args, **kwargs):
+                started = time.perf_counter()
+                try:
+                    return await func(*args, **kwargs)
+                finally:
+                    self.observe(name, time.perf_counter() - started, operation=func.__name__)
+            return wrapper
+        return decorator
+
+    def task_heartbeat(self, task: str):
+        """Mark one iteration of a background loop"""
+        self.heartbeats[task] = time.monotonic()
+        if not self.enabled:
+            return
+        self.inc('background_task_iterations_total', task=task)
+        self.set_gauge('background_task_last_run_timestamp_seconds', time.time(), task=task)
+
+    async def monitor_loop_lag(self, interval: float = 0.5):
+        """Measure how late the event loop wakes up compared to the requested sleep"""
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + interval
+            await asyncio.sleep(interval)
+            lag = max(0.0, loop.time() - expected)
+            self.task_heartbeat('loop_lag')
+            self.observe('event_loop_lag_seconds', lag)
+            self.set_gauge('event_loop_lag_last_seconds', lag)
+
+    def render(self) -> str:
+        """Render all metrics in Prometheus text exposition format"""
+        lines = []
+        described = set()
+
+        def describe(name):
+            if name in described or name not in HELP:
+                return
+            described.add(name)
+            kind, text = HELP[name]
+            lines.append(f"# HELP {name} {text}")
+            lines.append(f"# TYPE {name} {kind}")
+
+        for (name, labels), value in sorted(self.counters.items()):
+            describe(name)
+            lines.append(f"{name}{_format_labels(labels)} {value}")
+
+        for name, callback in sorted(self.gauge_callbacks.items()):
+            try:
+                value = callback()
+            except Exception:
+                continue
+            describe(name)
+            lines.append(f"{name} {value}")
+
+        for (name, labels), value in sorted(self.gauges.items()):
+            describe(name)
+            lines.append(f"{name}{_format_labels(labels)} {value}")
+
+        for (name, labels), histogram in sorted(self.histograms.items(), key=lambda item: item[0]):
+            describe(name)
+            cumulative = 0
+            for bound, count in zip(histogram.buckets, histogram.counts):
+                cumulative += count
+                lines.append(f"{name}_bucket{_format_labels(labels + (('le', bound),))} {cumulative}")
+            lines.append(f"{name}_bucket{_format_labels(labels + (('le', '+Inf'),))} {histogram.count}")
+            lines.append(f"{name}_sum{_format_labels(labels)} {histogram.sum}")
+            lines.append(f"{name}_count{_format_labels(labels)} {histogram.count}")
+
+        return "\n".join(lines) + "\n"
+
+
+def _format_labels(labels: tuple) -> str:
+    if not labels:
+        return ""
+    inner = ",".join(f'{key}="{str(value)}"' for key, value in labels)
+    return "{" + inner + "}"
+
+
+# Shared registry - set METRICS_ENABLED=0 to turn instrumentation off
+metrics = MetricsRegistry(enabled=os.getenv("METRICS_ENABLED", "1").lower() not in ("0", "false", "no"))
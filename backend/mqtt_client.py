@@ -2,60 +2,97 @@ import paho.mqtt.client as mqtt
 import json
 import random
 import asyncio
-from datetime import datetime
 from typing import Callable
 
+from clock import clock
+from logging_config import get_logger, sample_every
+
+log = get_logger("mqtt")
+
 class MQTTClient:
-    def __init__(self, broker="localhost", port=1883, callback: Callable = None):
+    def __init__(self, broker="localhost", port=1883, callback: Callable = None,
+                 keepalive: int = 60, min_retry_delay: int = 1, max_retry_delay: int = 60):
         self.client = mqtt.Client()
         self.broker = broker
         self.port = port
+        self.keepalive = keepalive
         self.callback = callback
+        self.loop = None
+        self.connected = False
         
         # Set up MQTT callbacks
         self.client.on_connect = self._on_connect
+        self.client.on_disconnect = self._on_disconnect
+        self.client.on_connect_fail = self._on_connect_fail
         self.client.on_message = self._on_message
+        # Reconnect attempts back off exponentially between these bounds (seconds)
+        self.client.reconnect_delay_set(min_delay=min_retry_delay, max_delay=max_retry_delay)
 
     def _on_connect(self, client, userdata, flags, rc):
-        print(f"Connected to MQTT broker with result code {rc}")
+        if rc != 0:
+            log.warning("MQTT broker refused connection with result code %s", rc)
+            return
+        self.connected = True
+        log.info("Connected to MQTT broker at %s:%s", self.broker, self.port)
         # Subscribe to device topics
         self.client.subscribe("home/fan")
         self.client.subscribe("home/light")
 
+    def _on_disconnect(self, client, userdata, rc):
+        self.connected = False
+        if rc != 0:
+            log.warning("Lost connection to MQTT broker (result code %s) - reconnecting in background", rc)
+
+    def _on_connect_fail(self, client, userdata):
+        log.warning("Could not connect to MQTT broker at %s:%s - running without broker, retrying in background",
+                    self.broker, self.port, extra=sample_every(10))
+
     def _on_message(self, client, userdata, msg):
-        if self.callback:
-            # Parse message and call the callback
+        if self.callback and self.loop:
+            # Parse message and hand the callback to the event loop (this runs on paho's network thread)
             try:
                 payload = json.loads(msg.payload.decode())
-                asyncio.create_task(self.callback(msg.topic, payload))
+                asyncio.run_coroutine_threadsafe(self.callback(msg.topic, payload), self.loop)
             except json.JSONDecodeError:
-                print(f"Invalid JSON payload received on topic {msg.topic}")
+                log.warning("Invalid JSON payload received on topic %s", msg.topic)
 
     def start(self):
+        """Connect without blocking; paho's network thread retries with backoff until the broker is up"""
         try:
-            self.client.connect(self.broker, self.port, 60)
-            self.client.loop_start()
-            print(f"[MQTT] Connected to broker at {self.broker}:{self.port}")
-        except Exception as e:
-            print(f"[MQTT] Warning: Could not connect to MQTT broker at {self.broker}:{self.port}")
-            print(f"[MQTT] Running in simulation mode without MQTT broker")
-            print(f"[MQTT] Error: {e}")
+            self.loop = asyncio.get_running_loop()
+        except RuntimeError:
+            self.loop = None
+        self.client.connect_async(self.broker, self.port, self.keepalive)
+        self.client.loop_start()
+        log.info("Connecting to MQTT broker at %s:%s in background", self.broker, self.port)
 
     def stop(self):
         try:
-            self.client.loop_stop()
+            # Disconnect first so a pending reconnect wait ends before the thread is joined
             self.client.disconnect()
+            self.client.loop_stop()
         except:
             pass
 
+    def is_connected(self) -> int:
+        return int(self.connected)
+
+    def queue_depth(self) -> int:
+        """Number of outgoing messages queued in the client"""
+        return len(getattr(self.client, '_out_messages', ()))
+
+    def inflight_messages(self) -> int:
+        """Number of QoS>0 messages awaiting broker acknowledgement"""
+        return getattr(self.client, '_inflight_messages', 0)
+
     def publish_device_state(self, device: str, state: str):
         try:
             topic = f"home/{device}"
             payload = json.dumps({"state": state})
             self.client.publish(topic, payload)
-            print(f"[MQTT] Published: {topic} -> {state}")
+            log.debug("Published: %s -> %s", topic, state, extra={'topic': topic, 'state': state})
         except Exception as e:
-            print(f"[MQTT] Could not publish (broker not connected): {e}")
+            log.warning("Could not publish (broker not connected): %s", e, extra=sample_every(100))
 
     async def simulate_energy_data(self, energy_callback: Callable):
         """Simulates periodic energy usage data"""
@@ -68,7 +105,7 @@ class MQTTClient:
                 self.client.publish(
                     "home/energy",
                     json.dumps({
-                        "timestamp": datetime.now().isoformat(),
+                        "timestamp": clock.now().isoformat(),
                         "watts": watts
                     })
                 )
@@ -80,4 +117,4 @@ class MQTTClient:
             if energy_callback:
                 await energy_callback(watts)
             
-            await asyncio.sleep(5)  # Wait 5 seconds before next update
\ No newline at end of file
+            await clock.sleep(5)  # Wait 5 seconds before next update
\ No newline at end of file
@@ -0,0 +1,199 @@
+"""
+Load-shifting optimizer: places flexible device runs into 15-minute slots of
+a day to minimize energy cost under a time-of-use tariff, without the total
+load (base load plus scheduled runs) exceeding a peak-power cap.
+
+Jobs are placed greedily, largest energy first, each at its cheapest feasible
+start inside its allowed window (ties going to the start with the lowest
+resulting peak); then every job is lifted out and re-placed against the
+others, smallest first, for as long as a pass reduces the number of unplaced
+runs or the total cost. The day is treated
+as circular so windows and runs may cross midnight, matching the scheduler's
+daily HH:MM schedules.
+
+solve() takes and returns plain data so it can run in a worker process.
+"""
+from typing import Dict, List, Optional
+
+SLOT_MINUTES = 15
+SLOTS_PER_DAY = 24 * 60 // SLOT_MINUTES
+
+
+def to_slot(hhmm: str) -> int:
+    hours, minutes = hhmm.split(':')
+    minute_of_day = int(hours) * 60 + int(minutes)
+    if not 0 <= minute_of_day < 24 * 60:
+        raise ValueError(f"Invalid time '{hhmm}'")
+    return minute_of_day // SLOT_MINUTES
+
+
+def slot_time(slot: int) -> str:
+    minutes = (slot % SLOTS_PER_DAY) * SLOT_MINUTES
+    return f"{minutes // 60:02d}:{minutes % 60:02d}"
+
+
+def slot_prices(rate_per_kwh: float, hour_multiplier: List[float]) -> List[float]:
+    """Cost of 1 kWh in each slot of the day"""
+    return [rate_per_kwh * hour_multiplier[slot * SLOT_MINUTES // 60] for slot in range(SLOTS_PER_DAY)]
+
+
+def hourly_base_load(rows: List[tuple], local_hour) -> List[float]:
+    """Average watts per slot from (hour_ms, wh) rollup rows, by local hour of day"""
+    totals, counts = [0.0] * 24, [0] * 24
+    for hour_ms, wh in rows:
+        hour = local_hour(hour_ms)
+        totals[hour] += wh
+        counts[hour] += 1
+    by_hour = [totals[h] / counts[h] if counts[h] else 0.0 for h in range(24)]
+    return [by_hour[slot * SLOT_MINUTES // 60] for slot in range(SLOTS_PER_DAY)]
+
+
+def _job_profile(job: Dict) -> List[float]:
+    if job.get('profile'):
+        return [float(watts) for watts in job['profile']]
+    slots = -(-int(job['duration_minutes']) // SLOT_MINUTES)
+    return [float(job['power_watts'])] * slots
+
+
+def _candidates(job: Dict, length: int):
+    """Start slots inside the job's window where a run of `length` slots fits"""
+    start = to_slot(job.get('window_start', '00:00'))
+    end = to_slot(job.get('window_end', '00:00'))
+    window = (end - start) % SLOTS_PER_DAY or SLOTS_PER_DAY
+    if length > window:
+        raise ValueError(f"{job['device']}: run of {length * SLOT_MINUTES} minutes does not fit its window")
+    return [(start + offset) % SLOTS_PER_DAY for offset in range(window - length + 1)]
+
+
+class _Job:
+    __slots__ = ('device', 'profile', 'energy', 'index', 'start')
+
+    def __init__(self, device, profile, index):
+        self.device = device
+        self.profile = profile
+        self.energy = float(profile.sum())
+        self.index = index  # (candidate starts, slots) matrix of slot indices
+        self.start = None  # row of `index` currently used, or None
+
+
+def solve(problem: Dict) -> Dict:
+    """
+    problem: {
+        'prices': [cost per kWh for each slot],
+        'base_load': [watts for each slot] (optional),
+        'peak_cap_watts': float or None,
+        'jobs': [{'device', 'power_watts', 'duration_minutes' | 'profile',
+                  'window_start', 'window_end'}],
+        'improve': bool (default True),
+    }
+    """
+    import time
+    import numpy as np
+
+    started = time.perf_counter()
+    prices = np.asarray(problem['prices'], dtype=np.float64) / 1000 * SLOT_MINUTES / 60  # per watt-slot
+    load = np.asarray(problem.get('base_load') or [0.0] * SLOTS_PER_DAY, dtype=np.float64)
+    cap = problem.get('peak_cap_watts')
+    cap = np.inf if cap is None else float(cap)
+
+    jobs = []
+    for spec in problem['jobs']:
+        profile = np.asarray(_job_profile(spec))
+        starts = np.asarray(_candidates(spec, len(profile)))
+        index = (starts[:, None] + np.arange(len(profile))) % SLOTS_PER_DAY
+        jobs.append(_Job(spec['device'], profile, index))
+
+    def cost_of(job: _Job):
+        # Cost and resulting peak of every candidate start, given the current load
+        return (prices[job.index] * job.profile).sum(axis=1), (load[job.index] + job.profile).max(axis=1)
+
+    def place(job: _Job) -> bool:
+        costs, peaks = cost_of(job)
+        feasible = peaks <= cap
+        if not feasible.any():
+            job.start = None
+            return False
+        # Cheapest start; among equally priced ones the lowest resulting peak, leaving headroom for later jobs
+        costs = np.round(np.where(feasible, costs, np.inf), 9)
+        best = int(np.lexsort((peaks, costs))[0])
+        job.start = best
+        np.add.at(load, job.index[best], job.profile)
+        return True
+
+    def lift(job: _Job):
+        if job.start is not None:
+            np.subtract.at(load, job.index[job.start], job.profile)
+
+    order = sorted(jobs, key=lambda job: -job.energy)
+    for job in order:
+        place(job)
+
+    def objective():
+        unplaced = sum(1 for job in jobs if job.start is None)
+        cost = sum(float((prices[job.index[job.start]] * job.profile).sum()) for job in jobs if job.start is not None)
+        return unplaced, round(cost, 6)
+
+    passes = 0
+    if problem.get('improve', True):
+        best = objective()
+        for passes in range(1, 11):
+            kept = [job.start for job in jobs]
+            # Small runs first, so they move out of the way of the large runs re-placed after them
+            for job in reversed(order):
+                lift(job)
+                place(job)
+            current = objective()
+            if current >= best:
+                # No gain: keep the previous placement
+                for job in jobs:
+                    lift(job)
+                for job, start in zip(jobs, kept):
+                    job.start = start
+                    if start is not None:
+                        np.add.at(load, job.index[start], job.profile)
+                break
+            best = current
+
+    # Report against running every job at the start of its window
+    schedule, total, baseline = [], 0.0, 0.0
+    for job in jobs:
+        if job.start is None:
+            schedule.append({'device': job.device, 'scheduled': False})
+            continue
+        first_cost = float((prices[job.index[0]] * job.profile).sum())
+        baseline += first_cost
+        slots = job.index[job.start]
+        cost = float((prices[slots] * job.profile).sum())
+        total += cost
+        schedule.append({
+            'device': job.device,
+            'scheduled': True,
+            'start': slot_time(int(slots[0])),
+            'end': slot_time(int(slots[-1]) + 1),
+            'energy_kwh': round(job.energy / 1000 * SLOT_MINUTES / 60, 3),
+            'cost': round(cost, 2),
+            'cost_at_window_start': round(first_cost, 2),
+        })
+
+    return {
+        'schedule': schedule,
+        'scheduled': sum(1 for entry in schedule if entry['scheduled']),
+        'unscheduled': [entry['device'] for entry in schedule if not entry['scheduled']],
+        'cost': round(total, 2),
+        'cost_at_window_start': round(baseline, 2),
+        'peak_watts': round(float(load.max()), 1),
+        'peak_cap_watts': None if cap == np.inf else cap,
+        'improvement_passes': passes,
+        'solve_ms': round((time.perf_counter() - started) * 1000, 2),
+    }
+
+
+def problem_for(jobs: List[Dict], prices: List[float], base_load: Optional[List[float]] = None,
+                peak_cap_watts: Optional[float] = None) -> Dict:
+    """Validate jobs up front so bad input fails in the API process, not the worker"""
+    for job in jobs:
+        length = len(_job_profile(job))
+        if not length:
+            raise ValueError(f"{job['device']}: run has no duration")
+        _candidates(job, length)
+    return {'jobs': jobs, 'prices': prices, 'base_load': base_load, 'peak_cap_watts': peak_cap_watts}
@@ -0,0 +1,182 @@
+import asyncio
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Coroutine, Dict, List, Optional, Tuple
+
+from metrics import metrics
+from logging_config import get_logger
+
+log = get_logger("profiler")
+
+# Longest window a single profile may run before it stops itself
+MAX_PROFILE_SECONDS = 300
+
+
+def _label(code) -> str:
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class SamplingProfiler:
+    """
+    Statistical profiler for a running server. While active, a background
+    thread snapshots the Python stack of the event loop thread (or every
+    thread) at a fixed interval and counts identical stacks; the result is
+    returned in collapsed-stack format (`root;caller;callee count` per line),
+    which flamegraph.pl, speedscope and inferno read directly. Nothing runs
+    while no profile is active.
+    """
+
+    def __init__(self):
+        self.thread: Optional[threading.Thread] = None
+        self.stopping = threading.Event()
+        self.counts: Counter = Counter()
+        self.labels: Dict[object, str] = {}
+        self.samples = 0
+        self.interval = 0.005
+        self.target: Optional[int] = None
+        self.started: Optional[float] = None
+        self.ended: Optional[float] = None
+
+    @property
+    def active(self) -> bool:
+        return self.thread is not None and self.thread.is_alive()
+
+    def start(self, interval: float = 0.005, seconds: float = 30, all_threads: bool = False) -> Dict:
+        """Begin sampling every `interval` seconds for at most `seconds`; the calling thread is the target"""
+        if self.active:
+            raise RuntimeError("A profile is already running")
+        self.counts = Counter()
+        self.labels = {}
+        self.samples = 0
+        self.interval = interval
+        self.target = None if all_threads else threading.get_ident()
+        self.stopping.clear()
+        self.started, self.ended = time.perf_counter(), None
+        self.thread = threading.Thread(target=self._run, args=(min(seconds, MAX_PROFILE_SECONDS),),
+                                       name="profiler", daemon=True)
+        self.thread.start()
+        log.info("Profiling %s every %.1fms for up to %ss", "all threads" if all_threads else "the event loop",
+                 interval * 1000, seconds)
+        return self.get_status()
+
+    def stop(self) -> str:
+        """End the profile (if still running) and return the collapsed stacks"""
+        if self.started is None:
+            raise RuntimeError("No profile has been started")
+        self.stopping.set()
+        if self.thread is not None:
+            self.thread.join()
+        return self.collapsed()
+
+    def _run(self, seconds: float):
+        deadline = time.perf_counter() + seconds
+        own = threading.get_ident()
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        while not self.stopping.wait(self.interval) and time.perf_counter() < deadline:
+            for ident, frame in sys._current_frames().items():
+                if ident == own or (self.target is not None and ident != self.target):
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(frame.f_code)
+                    frame = frame.f_back
+                if ident not in names:
+                    names = {thread.ident: thread.name for thread in threading.enumerate()}
+                self.counts[(names.get(ident, str(ident)), tuple(stack))] += 1
+            self.samples += 1
+        self.ended = time.perf_counter()
+        metrics.inc("profiler_samples_total", self.samples)
+
+    def collapsed(self) -> str:
+        """One `thread;outer;...;inner count` line per distinct stack"""
+        lines = []
+        for (thread, stack), count in self.counts.most_common():
+            frames = []
+            for code in reversed(stack):
+                label = self.labels.get(code)
+                if label is None:
+                    label = self.labels[code] = _label(code)
+                frames.append(label)
+            lines.append(f"{';'.join([thread] + frames)} {count}")
+        return "\n".join(lines) + "\n"
+
+    def get_status(self) -> Dict:
+        if self.started is None:
+            return {'active': False}
+        return {
+            'active': self.active,
+            'interval_ms': self.interval * 1000,
+            'threads': 'all' if self.target is None else 'event_loop',
+            'elapsed_seconds': round((self.ended or time.perf_counter()) - self.started, 2),
+            'samples': self.samples,
+            'stacks': len(self.counts),
+        }
+
+
+def _await_chain(coro) -> List[str]:
+    """Where a suspended coroutine is waiting, outermost frame first"""
+    frames = []
+    while coro is not None:
+        frame = getattr(coro, 'cr_frame', None) or getattr(coro, 'gi_frame', None)
+        if frame is None:
+            break
+        code = frame.f_code
+        frames.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+        coro = getattr(coro, 'cr_await', None) or getattr(coro, 'gi_yieldfrom', None)
+    return frames
+
+
+class TaskMonitor:
+    """
+    Keeps the background loops started at startup by name, for a task dump:
+    each task's state, the line it is suspended at, and how long since its
+    loop last came round (from `metrics.task_heartbeat`), so a loop that is
+    wedged on an await or never gets to run again stands out.
+    """
+
+    def __init__(self):
+        self.tasks: Dict[str, asyncio.Task] = {}
+
+    def spawn(self, name: str, coro: Coroutine) -> asyncio.Task:
+        task = asyncio.get_running_loop().create_task(coro)
+        self.tasks[name] = task
+        return task
+
+    @staticmethod
+    def describe(task: asyncio.Task, now: float, heartbeat: Optional[float]) -> Dict:
+        if task.cancelled():
+            state = 'cancelled'
+        elif task.done():
+            state = 'failed' if task.exception() is not None else 'finished'
+        elif task is asyncio.current_task():
+            state = 'running'
+        else:
+            state = 'waiting'
+        info = {
+            'state': state,
+            'since_heartbeat_seconds': round(now - heartbeat, 3) if heartbeat is not None else None,
+            'awaiting': _await_chain(task.get_coro()) if not task.done() else [],
+        }
+        if state == 'failed':
+            info['error'] = repr(task.exception())
+        return info
+
+    def dump(self, include_all: bool = False) -> Dict:
+        now = time.monotonic()
+        background = {name: self.describe(task, now, metrics.heartbeats.get(name))
+                      for name, task in self.tasks.items()}
+        result = {'background': background}
+        if include_all:
+            known = set(self.tasks.values())
+            others: List[Tuple[str, Dict]] = []
+            for task in asyncio.all_tasks():
+                if task not in known:
+                    coro = task.get_coro()
+                    others.append((getattr(coro, '__qualname__', repr(coro)), self.describe(task, now, None)))
+            result['other'] = [{'coroutine': name, **info} for name, info in others]
+        else:
+            result['other_tasks'] = len(asyncio.all_tasks()) - sum(not t.done() for t in self.tasks.values())
+        return result
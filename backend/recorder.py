@@ -0,0 +1,81 @@
+"""
+Recording of the inputs that drive the backend - device commands, incoming
+MQTT messages, sensor readings and schedule edits - for replay.py to feed back
+at any speed.
+
+A recording is gzip-compressed NDJSON. The first line is a header
+{"version": 1, "start": <epoch ms>}; every other line is one event
+[offset_ms, kind, data] with offset_ms counted from the start:
+
+    command   [device, state]
+    mqtt      [topic, payload]
+    sensors   [[node, temperature, humidity, motion, door_code], ...]
+    schedule  {device, time, action, enabled, days, until}
+"""
+import gzip
+import json
+import os
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from clock import clock
+from database import door_code, door_name
+from records import SensorReading
+from serialization import dumps
+from logging_config import get_logger
+
+log = get_logger("recorder")
+
+RECORDING_VERSION = 1
+EVENT_KINDS = ('command', 'mqtt', 'sensors', 'schedule')
+
+
+def pack_readings(readings: List[SensorReading]) -> List[list]:
+    return [[r.node, r.temperature, r.humidity, int(bool(r.motion)), door_code(r.door)] for r in readings]
+
+
+def unpack_readings(rows: List[list], timestamp: int) -> List[SensorReading]:
+    return [SensorReading(node, temperature, humidity, bool(motion), door_name(door), timestamp)
+            for node, temperature, humidity, motion, door in rows]
+
+
+class Recorder:
+    """Appends events to a recording file as they happen"""
+
+    def __init__(self, path: str, start_ms: Optional[int] = None):
+        self.path = path
+        self.start = clock.now_ms() if start_ms is None else start_ms
+        self.count = 0
+        self.file = gzip.open(path, 'wb', compresslevel=6)
+        self.file.write(dumps({'version': RECORDING_VERSION, 'start': self.start}) + b'\n')
+        log.info("Recording inputs to %s", path)
+
+    @classmethod
+    def from_env(cls) -> Optional['Recorder']:
+        """RECORD_FILE: path of the recording to write; unset disables recording"""
+        path = os.getenv("RECORD_FILE")
+        return cls(path) if path else None
+
+    def record(self, kind: str, data, at_ms: Optional[int] = None):
+        offset = (clock.now_ms() if at_ms is None else at_ms) - self.start
+        self.file.write(dumps([offset, kind, data]) + b'\n')
+        self.count += 1
+
+    def close(self):
+        self.file.close()
+        log.info("Recorded %d events to %s", self.count, self.path)
+
+
+def read_recording(path: str) -> Tuple[Dict, Iterator[list]]:
+    """(header, events in time order) of a recording; events are read lazily"""
+    f = gzip.open(path, 'rb')
+    header = json.loads(f.readline())
+    if header.get('version') != RECORDING_VERSION:
+        f.close()
+        raise ValueError(f"Unsupported recording version {header.get('version')}")
+
+    def events():
+        with f:
+            for line in f:
+                yield json.loads(line)
+
+    return header, events()
@@ -0,0 +1,112 @@
+"""
+Compact in-memory records for alerts and sensor readings. Each is a
+`__slots__` class - no per-instance dict, so a record costs a few pointers
+instead of a hash table with its own copy of every key - and the fields
+that take a small set of values (type, severity, location, door state) are
+interned, so every record shares one string object per value. Timestamps
+are epoch milliseconds. Records are turned into JSON-ready dicts with
+`to_dict()` only where they leave the process: API responses and snapshots.
+"""
+import sys
+from typing import Dict, Optional
+
+from database import from_epoch_ms, to_epoch_ms
+
+_intern = sys.intern
+
+
+def _timestamp(value) -> Optional[int]:
+    return None if value is None else to_epoch_ms(value)
+
+
+class SecurityAlert:
+    """A security event; it becomes an alert once SecurityMonitor.add_alert numbers it"""
+
+    __slots__ = ('type', 'status', 'location', 'severity', 'timestamp', 'id', 'acknowledged')
+
+    def __init__(self, type: str, status: str, location: str, severity: str, timestamp: Optional[int] = None,
+                 id: int = 0, acknowledged: bool = False):
+        self.type = _intern(type)
+        self.status = status
+        self.location = _intern(location)
+        self.severity = _intern(severity)
+        self.timestamp = timestamp
+        self.id = id
+        self.acknowledged = acknowledged
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'SecurityAlert':
+        return cls(data['type'], data['status'], data['location'], data['severity'],
+                   _timestamp(data.get('timestamp')), data.get('id', 0), data.get('acknowledged', False))
+
+    def to_dict(self) -> Dict:
+        data = {
+            'type': self.type,
+            'status': self.status,
+            'location': self.location,
+            'severity': self.severity,
+            'timestamp': from_epoch_ms(self.timestamp),
+        }
+        if self.id:
+            data['id'] = self.id
+            data['acknowledged'] = self.acknowledged
+        return data
+
+
+class MaintenanceAlert:
+    """A due-maintenance or detected-fault alert; detected faults carry a timestamp"""
+
+    __slots__ = ('device', 'message', 'priority', 'type', 'action_required', 'estimated_cost', 'timestamp')
+
+    def __init__(self, device: str, message: str, priority: str, type: str, action_required: str,
+                 estimated_cost: str, timestamp: Optional[int] = None):
+        self.device = _intern(device)
+        self.message = message
+        self.priority = _intern(priority)
+        self.type = _intern(type)
+        self.action_required = _intern(action_required)
+        self.estimated_cost = estimated_cost
+        self.timestamp = timestamp
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'MaintenanceAlert':
+        return cls(data['device'], data['message'], data['priority'], data['type'], data['action_required'],
+                   data['estimated_cost'], _timestamp(data.get('timestamp')))
+
+    def to_dict(self) -> Dict:
+        data = {
+            'device': self.device,
+            'message': self.message,
+            'priority': self.priority,
+            'type': self.type,
+            'action_required': self.action_required,
+            'estimated_cost': self.estimated_cost,
+        }
+        if self.timestamp is not None:
+            data['timestamp'] = from_epoch_ms(self.timestamp)
+        return data
+
+
+class SensorReading:
+    """One reading of a sensor node (node 0 for the single simulated room)"""
+
+    __slots__ = ('node', 'temperature', 'humidity', 'motion', 'door', 'timestamp')
+
+    def __init__(self, node: int, temperature: Optional[float], humidity: Optional[float], motion: bool,
+                 door: Optional[str], timestamp: int):
+        self.node = node
+        self.temperature = temperature
+        self.humidity = humidity
+        self.motion = motion
+        self.door = None if door is None else _intern(door)
+        self.timestamp = timestamp
+
+    def to_dict(self) -> Dict:
+        return {
+            'node': self.node,
+            'temperature': self.temperature,
+            'humidity': self.humidity,
+            'motion': self.motion,
+            'door': self.door,
+            'timestamp': from_epoch_ms(self.timestamp),
+        }
@@ -0,0 +1,127 @@
+"""
+Replays a recording (see recorder.py) against the backend on an accelerated
+clock: the app starts in-process with its scheduler and energy loop running,
+and every recorded command, MQTT message, sensor tick and schedule edit is
+fed in at its original simulated time. MQTT and the simulated sensor loop are
+off; the recording supplies those inputs.
+
+    cd backend
+    python replay.py recording.ndjson.gz --speed 100
+
+The report covers replay fidelity (how late events were delivered), database
+rows written per real second and scheduler firing accuracy.
+"""
+import argparse
+import asyncio
+import json
+import os
+import sqlite3
+import tempfile
+import time
+from typing import Awaitable, Callable, Dict, Iterable
+
+from clock import clock
+from recorder import EVENT_KINDS, read_recording, unpack_readings
+
+COUNTED_TABLES = ('energy_logs', 'sensor_logs', 'device_events', 'power_samples')
+
+
+class Replayer:
+    """Dispatches recorded events to per-kind async handlers when the clock reaches their time"""
+
+    def __init__(self, handlers: Dict[str, Callable[..., Awaitable]]):
+        self.handlers = handlers
+
+    async def run(self, start_ms: int, events: Iterable[list]) -> Dict:
+        counts = {kind: 0 for kind in EVENT_KINDS}
+        lag_total, lag_max = 0, 0
+        for offset, kind, data in events:
+            due = start_ms + offset
+            wait = (due - clock.now_ms()) / 1000
+            if wait > 0:
+                await clock.sleep(wait)
+            lag = max(0, clock.now_ms() - due)
+            lag_total += lag
+            lag_max = max(lag_max, lag)
+            await self.handlers[kind](data)
+            counts[kind] += 1
+        events_run = sum(counts.values())
+        return {
+            'events': counts,
+            'mean_lag_ms': round(lag_total / events_run, 1) if events_run else None,
+            'max_lag_ms': lag_max,
+        }
+
+
+def table_counts(db_path: str) -> Dict[str, int]:
+    with sqlite3.connect(db_path) as conn:
+        return {table: conn.execute(f'SELECT COUNT(*) FROM {table}').fetchone()[0] for table in COUNTED_TABLES}
+
+
+async def replay(path: str, speed: float, db_path: str) -> Dict:
+    """Run the backend against a recording; returns the benchmark report"""
+    header, events = read_recording(path)
+    # Inputs come from the recording only; read when main is imported
+    os.environ["ENABLE_MQTT"] = "0"
+    os.environ["ENABLE_SIMULATOR"] = "0"
+    import main
+    from command_guard import RateLimited
+
+    async def command(data):
+        try:
+            await main.submit_command(*data)
+        except RateLimited:
+            pass
+
+    async def schedule(data):
+        main.scheduler.add_schedule(data['device'], data['time'], data['action'], data.get('enabled', True),
+                                    data.get('days'), data.get('until'))
+
+    handlers = {
+        'command': command,
+        'mqtt': lambda data: main.handle_mqtt_message(*data),
+        'sensors': lambda data: main.log_sensor_batch(unpack_readings(data, clock.now_ms())),
+        'schedule': schedule,
+    }
+
+    main.db.db_path = db_path
+    clock.accelerate(speed, header['start'] / 1000)
+    await main.startup_event()
+    # Start simulated time over once the app is up, so startup doesn't count as replay lag
+    clock.accelerate(speed, header['start'] / 1000)
+    energy = asyncio.create_task(main.simulate_energy_data())
+    before = table_counts(db_path)
+
+    real_start, sim_start = time.perf_counter(), clock.time()
+    result = await Replayer(handlers).run(header['start'], events)
+    real_seconds, sim_seconds = time.perf_counter() - real_start, clock.time() - sim_start
+
+    energy.cancel()
+    await main.shutdown_event()
+    written = {table: count - before[table] for table, count in table_counts(db_path).items()}
+    return {
+        'speed': speed,
+        'simulated_seconds': round(sim_seconds, 1),
+        'real_seconds': round(real_seconds, 2),
+        'achieved_speed': round(sim_seconds / real_seconds, 1) if real_seconds else None,
+        'replay': result,
+        'rows_written': written,
+        'rows_per_second': round(sum(written.values()) / real_seconds, 1) if real_seconds else None,
+        'scheduler': main.scheduler.get_stats(),
+    }
+
+
+def run():
+    parser = argparse.ArgumentParser(description="Replay a recording against the backend at N x speed")
+    parser.add_argument('recording')
+    parser.add_argument('--speed', type=float, default=100.0)
+    parser.add_argument('--db', help="database to replay into (default: a new temporary file)")
+    args = parser.parse_args()
+
+    db_path = args.db or os.path.join(tempfile.mkdtemp(prefix='replay-'), 'replay.db')
+    report = asyncio.run(replay(args.recording, args.speed, db_path))
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    run()
@@ -1,6 +1,12 @@
 import asyncio
-from datetime import datetime
-from typing import Dict, Callable, List
+from datetime import datetime, timedelta
+from typing import Dict, Callable, List, Optional
+
+from clock import clock
+from metrics import metrics
+from logging_config import get_logger
+
+log = get_logger("scheduler")
 
 class DeviceScheduler:
     """Manages automated device scheduling"""
@@ -21,29 +27,73 @@ class DeviceScheduler:
                 'days': ['monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday', 'sunday']
             }
         }
+        # Firing accuracy: seconds between a schedule's minute starting and its action running
+        self.stats = {'fired': 0, 'lateness_total': 0.0, 'lateness_max': 0.0}
     
     async def check_schedules(self, control_callback: Callable):
-        """Check and execute schedules every minute"""
-        print("[SCHEDULER] Started automatic scheduling service")
+        """
+        Execute schedules at the start of each minute. A check that wakes late
+        (e.g. the loop was busy) also runs any minutes it skipped, up to an hour.
+        """
+        log.info("Started automatic scheduling service")
+        checked = clock.now().replace(second=0, microsecond=0) - timedelta(minutes=1)
         while True:
             try:
-                current_time = datetime.now().strftime('%H:%M')
-                current_day = datetime.now().strftime('%A').lower()
-                
-                for device, schedule in self.schedules.items():
-                    if (schedule['enabled'] and 
-                        schedule['time'] == current_time and
-                        current_day in schedule['days']):
-                        await control_callback(device, schedule['action'])
-                        print(f"[SCHEDULER] Auto {schedule['action']}: {device} at {current_time}")
+                metrics.task_heartbeat('scheduler')
+                now = clock.now()
+                minute = now.replace(second=0, microsecond=0)
+                checked = max(checked, minute - timedelta(minutes=60))
+                while checked < minute:
+                    checked += timedelta(minutes=1)
+                    await self._run_minute(checked, control_callback)
                 
-                await asyncio.sleep(60)  # Check every minute
+                # Sleep to the start of the next minute
+                await clock.sleep(60 - (clock.now() - minute).total_seconds() % 60)
             except Exception as e:
-                print(f"[SCHEDULER] Error: {e}")
-                await asyncio.sleep(60)
+                log.exception("Schedule check failed: %s", e)
+                await clock.sleep(60)
+    
+    async def _run_minute(self, minute: datetime, control_callback: Callable):
+        """Fire every schedule due in `minute` together; the callback bounds the concurrency"""
+        current_time = minute.strftime('%H:%M')
+        current_day = minute.strftime('%A').lower()
+        due = []
+        for device, schedule in list(self.schedules.items()):
+            if not schedule['enabled'] or current_day not in schedule['days']:
+                continue
+            if schedule['time'] == current_time:
+                due.append((device, schedule['action']))
+            elif schedule.get('until') == current_time:
+                # End of a timed run: switch back
+                due.append((device, 'OFF' if schedule['action'] == 'ON' else 'ON'))
+        if due:
+            await asyncio.gather(*(self._fire(minute, device, action, control_callback) for device, action in due))
+    
+    async def _fire(self, minute: datetime, device: str, action: str, control_callback: Callable):
+        try:
+            await control_callback(device, action)
+        except Exception as e:
+            log.error("Scheduled %s for %s failed: %s", action, device, e, extra={'device': device, 'action': action})
+            return
+        lateness = (clock.now() - minute).total_seconds()
+        self.stats['fired'] += 1
+        self.stats['lateness_total'] += lateness
+        self.stats['lateness_max'] = max(self.stats['lateness_max'], lateness)
+        metrics.observe('schedule_fire_lateness_seconds', lateness)
+        log.info("Auto %s: %s at %s", action, device, minute.strftime('%H:%M'),
+                 extra={'device': device, 'action': action})
     
-    def add_schedule(self, device: str, time: str, action: str, enabled: bool = True, days: List[str] = None):
-        """Add or update a device schedule"""
+    def get_stats(self) -> Dict:
+        fired = self.stats['fired']
+        return {
+            'fired': fired,
+            'mean_lateness_seconds': round(self.stats['lateness_total'] / fired, 3) if fired else None,
+            'max_lateness_seconds': round(self.stats['lateness_max'], 3),
+        }
+    
+    def add_schedule(self, device: str, time: str, action: str, enabled: bool = True, days: List[str] = None,
+                     until: Optional[str] = None, source: str = 'user'):
+        """Add or update a device schedule; with `until`, the opposite action runs at that time"""
         if days is None:
             days = ['monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday', 'sunday']
         
@@ -51,10 +101,19 @@ class DeviceScheduler:
             'time': time,
             'action': action,
             'enabled': enabled,
-            'days': days
+            'days': days,
+            'until': until,
+            'source': source
         }
         return self.schedules[device]
     
+    def export_state(self) -> Dict:
+        """All schedules, for warm-restart snapshots"""
+        return {'schedules': self.schedules}
+    
+    def restore_state(self, state: Dict):
+        self.schedules = state['schedules']
+    
     def remove_schedule(self, device: str):
         """Remove a device schedule"""
         if device in self.schedules:
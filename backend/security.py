@@ -1,73 +1,78 @@
-from datetime import datetime
-from typing import List, Dict
+from typing import Callable, List, Dict, Optional
 import random
 
+from clock import clock
+from database import from_epoch_ms
+from records import SecurityAlert
+
 class SecurityMonitor:
     """Security monitoring and alert management system"""
     
-    def __init__(self):
-        self.alerts = []
+    def __init__(self, on_alert: Optional[Callable[[SecurityAlert], None]] = None):
+        self.alerts: List[SecurityAlert] = []
         self.security_status = "ARMED"
-        self.last_check = datetime.now()
+        self.last_check = clock.now()
+        # Called with each new alert, e.g. to act on it
+        self.on_alert = on_alert
     
     def check_security(self) -> Dict:
         """Perform security checks and return current status"""
         events = []
         
         # Simulate various security events for demo
-        current_hour = datetime.now().hour
+        current_hour = clock.now().hour
         
         # Door sensor simulation
         if random.random() > 0.92:
-            events.append({
-                "type": "DOOR",
-                "status": "OPENED" if random.random() > 0.5 else "CLOSED",
-                "location": random.choice(["Main Door", "Back Door", "Garage Door"]),
-                "timestamp": datetime.now().isoformat(),
-                "severity": "INFO"
-            })
+            events.append(SecurityAlert(
+                "DOOR",
+                "OPENED" if random.random() > 0.5 else "CLOSED",
+                random.choice(["Main Door", "Back Door", "Garage Door"]),
+                "INFO",
+                clock.now_ms()
+            ))
         
         # Motion detection simulation
         if random.random() > 0.88:
-            events.append({
-                "type": "MOTION",
-                "status": "DETECTED",
-                "location": random.choice(["Living Room", "Kitchen", "Bedroom", "Hallway"]),
-                "timestamp": datetime.now().isoformat(),
-                "severity": "INFO"
-            })
+            events.append(SecurityAlert(
+                "MOTION",
+                "DETECTED",
+                random.choice(["Living Room", "Kitchen", "Bedroom", "Hallway"]),
+                "INFO",
+                clock.now_ms()
+            ))
         
         # Window sensor simulation
         if random.random() > 0.95:
-            events.append({
-                "type": "WINDOW",
-                "status": "OPENED",
-                "location": random.choice(["Living Room Window", "Bedroom Window", "Kitchen Window"]),
-                "timestamp": datetime.now().isoformat(),
-                "severity": "WARNING"
-            })
+            events.append(SecurityAlert(
+                "WINDOW",
+                "OPENED",
+                random.choice(["Living Room Window", "Bedroom Window", "Kitchen Window"]),
+                "WARNING",
+                clock.now_ms()
+            ))
         
         # Suspicious activity during night hours
         if 22 <= current_hour or current_hour <= 6:
             if random.random() > 0.96:
-                events.append({
-                    "type": "SUSPICIOUS",
-                    "status": "DETECTED",
-                    "location": "Backyard",
-                    "timestamp": datetime.now().isoformat(),
-                    "severity": "CRITICAL"
-                })
+                events.append(SecurityAlert(
+                    "SUSPICIOUS",
+                    "DETECTED",
+                    "Backyard",
+                    "CRITICAL",
+                    clock.now_ms()
+                ))
         
         # Add events to alerts if they are warnings or critical
         for event in events:
-            if event['severity'] in ['WARNING', 'CRITICAL']:
+            if event.severity in ['WARNING', 'CRITICAL']:
                 self.add_alert(event)
         
-        self.last_check = datetime.now()
+        self.last_check = clock.now()
         
         return {
             "security_status": self.security_status,
-            "recent_events": events,
+            "recent_events": [event.to_dict() for event in events],
             "cameras_active": 2,
             "sensors_active": 5,
             "doors_locked": 3,
@@ -76,61 +81,72 @@ class SecurityMonitor:
             "last_check": self.last_check.isoformat()
         }
     
-    def get_alerts(self) -> List[Dict]:
+    def get_alerts(self) -> List[SecurityAlert]:
         """Get all security alerts"""
         return self.alerts
     
-    def add_alert(self, alert: Dict):
+    def add_alert(self, alert: SecurityAlert):
         """Add a security alert"""
-        alert['id'] = len(self.alerts) + 1
-        alert['timestamp'] = datetime.now().isoformat()
-        alert['acknowledged'] = False
+        alert.id = len(self.alerts) + 1
+        alert.timestamp = clock.now_ms()
+        alert.acknowledged = False
         self.alerts.insert(0, alert)  # Add to beginning
         
         # Keep only last 50 alerts
         if len(self.alerts) > 50:
             self.alerts = self.alerts[:50]
+        
+        if self.on_alert is not None:
+            self.on_alert(alert)
+    
+    def export_state(self) -> Dict:
+        """Alerts and mode, for warm-restart snapshots"""
+        return {'alerts': [alert.to_dict() for alert in self.alerts], 'security_status': self.security_status}
+    
+    def restore_state(self, state: Dict):
+        self.alerts = [SecurityAlert.from_dict(alert) for alert in state['alerts'][:50]]
+        self.security_status = state['security_status']
     
     def acknowledge_alert(self, alert_id: int):
         """Acknowledge a security alert"""
         for alert in self.alerts:
-            if alert.get('id') == alert_id:
-                alert['acknowledged'] = True
+            if alert.id == alert_id:
+                alert.acknowledged = True
                 return True
         return False
     
     def clear_alerts(self):
         """Clear all acknowledged alerts"""
-        self.alerts = [alert for alert in self.alerts if not alert.get('acknowledged', False)]
+        self.alerts = [alert for alert in self.alerts if not alert.acknowledged]
     
     def set_security_mode(self, mode: str):
         """Set security system mode (ARMED, DISARMED, STAY, AWAY)"""
         valid_modes = ["ARMED", "DISARMED", "STAY", "AWAY"]
         if mode.upper() in valid_modes:
             self.security_status = mode.upper()
-            self.add_alert({
-                "type": "SYSTEM",
-                "status": f"Security mode changed to {mode.upper()}",
-                "location": "System",
-                "severity": "INFO"
-            })
+            self.add_alert(SecurityAlert(
+                "SYSTEM",
+                f"Security mode changed to {mode.upper()}",
+                "System",
+                "INFO"
+            ))
             return True
         return False
     
     def get_security_stats(self) -> Dict:
         """Get security system statistics"""
         total_alerts = len(self.alerts)
-        critical_alerts = len([a for a in self.alerts if a.get('severity') == 'CRITICAL'])
-        warning_alerts = len([a for a in self.alerts if a.get('severity') == 'WARNING'])
+        critical_alerts = len([a for a in self.alerts if a.severity == 'CRITICAL'])
+        warning_alerts = len([a for a in self.alerts if a.severity == 'WARNING'])
         
         return {
             "total_alerts": total_alerts,
             "critical_alerts": critical_alerts,
             "warning_alerts": warning_alerts,
             "info_alerts": total_alerts - critical_alerts - warning_alerts,
-            "acknowledged_alerts": len([a for a in self.alerts if a.get('acknowledged', False)]),
+            "acknowledged_alerts": len([a for a in self.alerts if a.acknowledged]),
             "uptime": "99.8%",
-            "last_incident": self.alerts[0]['timestamp'] if self.alerts else None
+            "last_incident": from_epoch_ms(self.alerts[0].timestamp) if self.alerts else None
         }
     
     def get_camera_feeds(self) -> List[Dict]:
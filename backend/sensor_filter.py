@@ -0,0 +1,89 @@
+import os
+from typing import Dict, List, Optional
+
+from clock import clock
+from metrics import metrics
+from records import SensorReading
+
+
+class SensorChangeFilter:
+    """
+    Decides which sensor readings are worth persisting. A reading is kept when
+    temperature or humidity moved beyond its deadband since the last persisted
+    row for that node, when motion or door state changed, or when the heartbeat
+    interval elapsed. Persisted rows therefore form a step series: each row's
+    values hold until the next row.
+    """
+
+    def __init__(self, temperature_deadband: float = 0.5, humidity_deadband: float = 2.0,
+                 heartbeat_seconds: float = 300.0, enabled: bool = True):
+        self.temperature_deadband = temperature_deadband
+        self.humidity_deadband = humidity_deadband
+        self.heartbeat_seconds = heartbeat_seconds
+        self.enabled = enabled
+        # node -> (last persisted reading, monotonic time it was persisted)
+        self.last: Dict[int, tuple] = {}
+        self.persisted = 0
+        self.suppressed = 0
+
+    @classmethod
+    def from_env(cls) -> 'SensorChangeFilter':
+        """SENSOR_LOG_MODE=delta|full, SENSOR_DEADBAND_TEMP, SENSOR_DEADBAND_HUMIDITY, SENSOR_HEARTBEAT (seconds)"""
+        return cls(
+            temperature_deadband=float(os.getenv("SENSOR_DEADBAND_TEMP", "0.5")),
+            humidity_deadband=float(os.getenv("SENSOR_DEADBAND_HUMIDITY", "2.0")),
+            heartbeat_seconds=float(os.getenv("SENSOR_HEARTBEAT", "300")),
+            enabled=os.getenv("SENSOR_LOG_MODE", "delta").lower() != "full"
+        )
+
+    def should_persist(self, reading: SensorReading, now: Optional[float] = None) -> bool:
+        """Check a reading against the last persisted one for its node, recording it if kept"""
+        if now is None:
+            now = clock.monotonic()
+        node = reading.node
+        previous = self.last.get(node)
+        keep = (
+            not self.enabled
+            or previous is None
+            or self._changed(previous[0], reading)
+            or now - previous[1] >= self.heartbeat_seconds
+        )
+        if keep:
+            self.last[node] = (reading, now)
+            self.persisted += 1
+        else:
+            self.suppressed += 1
+        metrics.inc("sensor_readings_total", result="persisted" if keep else "suppressed")
+        return keep
+
+    def filter(self, readings: List[SensorReading], now: Optional[float] = None) -> List[SensorReading]:
+        """The subset of a tick's readings that should be persisted"""
+        if now is None:
+            now = clock.monotonic()
+        return [reading for reading in readings if self.should_persist(reading, now)]
+
+    def _changed(self, previous: SensorReading, reading: SensorReading) -> bool:
+        return (
+            bool(previous.motion) != bool(reading.motion)
+            or previous.door != reading.door
+            or _moved(previous.temperature, reading.temperature, self.temperature_deadband)
+            or _moved(previous.humidity, reading.humidity, self.humidity_deadband)
+        )
+
+    def get_stats(self) -> Dict:
+        total = self.persisted + self.suppressed
+        return {
+            'mode': 'delta' if self.enabled else 'full',
+            'temperature_deadband': self.temperature_deadband,
+            'humidity_deadband': self.humidity_deadband,
+            'heartbeat_seconds': self.heartbeat_seconds,
+            'persisted': self.persisted,
+            'suppressed': self.suppressed,
+            'write_ratio': round(self.persisted / total, 3) if total else None
+        }
+
+
+def _moved(previous: Optional[float], current: Optional[float], deadband: float) -> bool:
+    if previous is None or current is None:
+        return previous is not current
+    return abs(current - previous) >= deadband
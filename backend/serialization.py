@@ -0,0 +1,100 @@
+import json
+from datetime import datetime
+from typing import Any, List, Tuple
+
+from starlette.responses import JSONResponse, Response
+
+from database import DOOR_STATES, from_epoch_ms
+
+try:
+    import orjson
+except ImportError:  # optional - falls back to the standard library encoder
+    orjson = None
+
+# Local UTC offsets are resolved per 15-minute bucket; DST transitions fall on these boundaries
+OFFSET_BUCKET_MS = 15 * 60 * 1000
+
+
+def dumps(content: Any) -> bytes:
+    """Compact JSON bytes, using orjson when installed"""
+    if orjson is not None:
+        return orjson.dumps(content)
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, separators=(',', ':')).encode('utf-8')
+
+
+def loads(data: bytes) -> Any:
+    """Parse JSON bytes, using orjson when installed"""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse rendered with orjson when available"""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+class RawJSONResponse(Response):
+    """Response whose body is already-encoded JSON bytes"""
+
+    media_type = 'application/json'
+
+
+def _numbers(column: tuple) -> List[str]:
+    if None not in column:
+        return list(map(repr, column))
+    return ['null' if value is None else repr(value) for value in column]
+
+
+def _local_offset_ms(ms: int) -> int:
+    return round(datetime.fromtimestamp(ms / 1000).astimezone().utcoffset().total_seconds() * 1000)
+
+
+def _timestamps(column: tuple) -> List[str]:
+    """
+    Render epoch milliseconds exactly as from_epoch_ms does, vectorized, with
+    the local UTC offset looked up once per bucket.
+    """
+    if None in column:
+        return ['null' if value is None else f'"{from_epoch_ms(value)}"' for value in column]
+    import numpy as np  # deferred: only history endpoints need it, and it is slow to import
+
+    ms = np.fromiter(column, dtype=np.int64, count=len(column))
+    buckets, inverse = np.unique(ms // OFFSET_BUCKET_MS, return_inverse=True)
+    offsets = np.array([_local_offset_ms(int(b) * OFFSET_BUCKET_MS) for b in buckets], dtype=np.int64)
+    local = (ms + offsets[inverse]).astype('datetime64[ms]')
+    return ['"%s"' % text for text in np.datetime_as_string(local, unit='ms').tolist()]
+
+
+def _doors(column: tuple) -> List[str]:
+    names = ['"%s"' % name for name in DOOR_STATES]
+    return ['null' if value is None else names[value] for value in column]
+
+
+def _strings(column: tuple) -> List[str]:
+    return [json.dumps(value, ensure_ascii=False) for value in column]
+
+
+_COLUMN_ENCODERS = {'int': _numbers, 'float': _numbers, 'timestamp': _timestamps, 'door': _doors, 'str': _strings}
+
+
+class RowEncoder:
+    """
+    Encode database row tuples straight to a JSON array of objects, without
+    building a dict per row. Values are encoded a column at a time, then
+    spliced into a per-row template. `columns` are (name, kind) pairs as in
+    export.py; output matches the dicts the database layer would return.
+    """
+
+    def __init__(self, columns: List[Tuple[str, str]]):
+        self.template = '{' + ','.join(f'"{name}":%s' for name, _ in columns) + '}'
+        self.encoders = [_COLUMN_ENCODERS[kind] for _, kind in columns]
+
+    def encode(self, rows: List[tuple]) -> bytes:
+        if not rows:
+            return b'[]'
+        columns = [encode(column) for encode, column in zip(self.encoders, zip(*rows))]
+        template = self.template
+        return ('[' + ','.join([template % values for values in zip(*columns)]) + ']').encode('utf-8')
@@ -0,0 +1,125 @@
+import asyncio
+import os
+import time
+import zlib
+from typing import Any, Dict, List, Tuple
+
+from clock import clock
+from components import LazyComponent
+from metrics import metrics
+from logging_config import get_logger
+from serialization import dumps, loads
+
+log = get_logger("snapshot")
+
+
+class SnapshotStore:
+    """
+    Warm-restart snapshots of state that otherwise lives only in memory
+    (security alerts, schedules, maintenance usage, simulated sensors). Each
+    registered component provides `export_state()` returning plain JSON data
+    and `restore_state(state)`; its state is stored as one zlib-compressed
+    JSON blob per component in the `snapshots` table - no pickle, so a
+    snapshot can't run code when loaded.
+
+    State is encoded on the event loop, where it can't change mid-read, and
+    compressed in a worker thread; components whose state hasn't changed
+    since the last save aren't rewritten. Lazily built components restore
+    when first built, and keep their stored snapshot until then.
+    """
+
+    def __init__(self, db, interval: float = 60.0, level: int = 6):
+        self.db = db
+        self.interval = interval
+        self.level = level
+        self.components: Dict[str, Any] = {}
+        self.stored: Dict[str, bytes] = {}
+        self.saved: Dict[str, bytes] = {}
+        self.stats = {'saves': 0, 'written': 0, 'restored': 0, 'failed': 0,
+                      'last_save_ms': None, 'restore_ms': None, 'bytes': {}}
+
+    @classmethod
+    def from_env(cls, db) -> 'SnapshotStore':
+        """SNAPSHOT_INTERVAL (seconds between saves, default 60; 0 saves at shutdown only)"""
+        return cls(db, interval=float(os.getenv("SNAPSHOT_INTERVAL", "60")))
+
+    def register(self, name: str, component: Any):
+        """Include a component (or a LazyComponent wrapping one) in snapshots"""
+        self.components[name] = component
+
+    async def load(self):
+        """Read stored snapshots and restore the components that are already built"""
+        started = time.perf_counter()
+        self.stored = await self.db.get_snapshots()
+        for name, component in self.components.items():
+            if not isinstance(component, LazyComponent):
+                self.restored(name, component)
+        self.stats['restore_ms'] = round((time.perf_counter() - started) * 1000, 2)
+        if self.stored or self.stats['restored']:
+            log.info("Restored %d snapshots in %.1fms", self.stats['restored'], self.stats['restore_ms'])
+
+    def restored(self, name: str, instance: Any) -> Any:
+        """Apply the stored snapshot for `name`, if any, to a freshly built component; returns it"""
+        blob = self.stored.pop(name, None)
+        if blob is not None:
+            try:
+                raw = zlib.decompress(blob)
+                instance.restore_state(loads(raw))
+                self.saved[name] = raw
+                self.stats['restored'] += 1
+            except Exception as e:
+                # A snapshot that can't be applied only costs the warm start
+                log.warning("Ignoring unreadable %s snapshot: %s", name, e)
+                self.stats['failed'] += 1
+        return instance
+
+    def _encode(self) -> List[Tuple[str, bytes]]:
+        changed = []
+        for name, component in self.components.items():
+            if isinstance(component, LazyComponent):
+                if not component.loaded:
+                    continue
+                component = component.get()
+            raw = dumps(component.export_state())
+            if self.saved.get(name) != raw:
+                changed.append((name, raw))
+        return changed
+
+    def _compress(self, changed: List[Tuple[str, bytes]]) -> List[Tuple[str, bytes]]:
+        return [(name, zlib.compress(raw, self.level)) for name, raw in changed]
+
+    async def save(self):
+        """Write every built component whose state changed since the last save"""
+        started = time.perf_counter()
+        changed = self._encode()
+        if changed:
+            blobs = await asyncio.get_running_loop().run_in_executor(None, self._compress, changed)
+            await self.db.save_snapshots(blobs)
+            for (name, raw), (_, blob) in zip(changed, blobs):
+                self.saved[name] = raw
+                self.stats['bytes'][name] = len(blob)
+            self.stats['written'] += len(changed)
+        self.stats['saves'] += 1
+        self.stats['last_save_ms'] = round((time.perf_counter() - started) * 1000, 2)
+        metrics.observe("snapshot_save_seconds", time.perf_counter() - started)
+
+    async def run(self):
+        """Save periodically until cancelled"""
+        if self.interval <= 0:
+            return
+        while True:
+            await clock.sleep(self.interval)
+            metrics.task_heartbeat("snapshot")
+            try:
+                await self.save()
+            except Exception as e:
+                log.exception("Snapshot save failed: %s", e)
+
+    def get_stats(self) -> Dict:
+        return {
+            'interval_seconds': self.interval,
+            'components': list(self.components),
+            'pending_restore': list(self.stored),
+            **self.stats,
+        }
+
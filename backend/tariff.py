@@ -0,0 +1,226 @@
+import json
+import os
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple
+
+from database import from_epoch_ms, local_hour_start
+
+# A residential slab tariff with a time-of-day surcharge/rebate on the energy charge
+DEFAULT_TARIFF = {
+    'currency': '₹',
+    # (monthly kWh up to, rate per kWh); null marks the last, open-ended slab
+    'slabs': [[100, 4.5], [300, 6.5], [None, 8.0]],
+    # (name, start hour, end hour, multiplier) in local time; bands may wrap past midnight
+    'bands': [['peak', 18, 22, 1.2], ['off_peak', 22, 6, 0.9]],
+    'default_band': 'normal',
+    # Per billing period (calendar month)
+    'fixed_charge': 120.0,
+}
+
+
+def month_start(ms: int) -> int:
+    """Start of the local calendar month (billing period) containing `ms`"""
+    moment = datetime.fromtimestamp(ms / 1000)
+    return int(moment.replace(day=1, hour=0, minute=0, second=0, microsecond=0).timestamp() * 1000)
+
+
+def next_month_start(ms: int) -> int:
+    moment = datetime.fromtimestamp(month_start(ms) / 1000)
+    if moment.month == 12:
+        moment = moment.replace(year=moment.year + 1, month=1)
+    else:
+        moment = moment.replace(month=moment.month + 1)
+    return int(moment.timestamp() * 1000)
+
+
+class Tariff:
+    """Slab rates on monthly consumption, time-of-use multipliers and a fixed monthly charge"""
+
+    def __init__(self, slabs: List[list], bands: List[list], fixed_charge: float = 0.0,
+                 currency: str = '₹', default_band: str = 'normal'):
+        if not slabs or slabs[-1][0] is not None:
+            raise ValueError("The last slab must be open-ended (limit null)")
+        self.slabs = [(limit, float(rate)) for limit, rate in slabs]
+        self.bands = [(name, int(start), int(end), float(multiplier)) for name, start, end, multiplier in bands]
+        self.fixed_charge = float(fixed_charge)
+        self.currency = currency
+        self.default_band = default_band
+        self.band_names = [default_band] + [band[0] for band in self.bands]
+
+        # Band index and multiplier for each local hour of the day
+        self.hour_band = [0] * 24
+        self.hour_multiplier = [1.0] * 24
+        for index, (_, start, end, multiplier) in enumerate(self.bands, 1):
+            hour = start
+            while True:
+                self.hour_band[hour] = index
+                self.hour_multiplier[hour] = multiplier
+                hour = (hour + 1) % 24
+                if hour == end % 24:
+                    break
+
+    @classmethod
+    def from_env(cls) -> 'Tariff':
+        """TARIFF_FILE: JSON with the keys of DEFAULT_TARIFF; missing keys keep their defaults"""
+        config = dict(DEFAULT_TARIFF)
+        path = os.getenv("TARIFF_FILE")
+        if path:
+            with open(path, encoding='utf-8') as f:
+                config.update(json.load(f))
+        return cls(**config)
+
+    def describe(self) -> Dict:
+        return {
+            'currency': self.currency,
+            'slabs': [{'up_to_kwh': limit, 'rate': rate} for limit, rate in self.slabs],
+            'bands': [{'name': name, 'from_hour': start, 'to_hour': end, 'multiplier': multiplier}
+                      for name, start, end, multiplier in self.bands],
+            'fixed_charge': self.fixed_charge,
+        }
+
+    def marginal_rate(self, month_kwh: float) -> float:
+        """Slab rate of the next kWh, given consumption so far in the billing month"""
+        for limit, rate in self.slabs:
+            if limit is None or month_kwh < limit:
+                return rate
+        return self.slabs[-1][1]
+
+    def energy_charges(self, hours: List[int], kwh: List[float]):
+        """
+        Energy charge per hour for one billing period, given its hourly
+        consumption in time order. Slabs apply to consumption accumulated since
+        the period started; each hour's charge is then scaled by its band.
+        Returns (charges, band index per hour) as NumPy arrays.
+        """
+        import numpy as np  # deferred: only cost queries need it
+
+        kwh = np.asarray(kwh, dtype=np.float64)
+        used_after = np.cumsum(kwh)
+        used_before = used_after - kwh
+
+        # kWh of each hour falling into each slab: overlap of [before, after] with [lower, upper]
+        limits = [limit for limit, _ in self.slabs[:-1]]
+        lower = np.array([0.0] + limits)
+        upper = np.array(limits + [np.inf])
+        rates = np.array([rate for _, rate in self.slabs])
+        in_slab = (np.clip(used_after[:, None], lower, upper) - np.clip(used_before[:, None], lower, upper))
+        base = in_slab @ rates
+
+        local_hours = np.array([datetime.fromtimestamp(hour / 1000).hour for hour in hours], dtype=np.int64)
+        band = np.asarray(self.hour_band, dtype=np.int64)[local_hours]
+        return base * np.asarray(self.hour_multiplier)[local_hours], band
+
+
+class PeriodCost:
+    """Hourly consumption and charges of one billing period"""
+
+    __slots__ = ('start', 'end', 'hours', 'kwh', 'charges', 'bands', 'used_kwh', 'rate')
+
+    def __init__(self, start: int, end: int, hours, kwh, charges, bands):
+        self.start = start
+        self.end = end
+        self.hours = hours
+        self.kwh = kwh
+        self.charges = charges
+        self.bands = bands
+        # Effective energy rate so far in the period, None before any usage
+        self.used_kwh = total = float(kwh.sum())
+        self.rate = float(charges.sum()) / total if total else None
+
+
+class CostCalculator:
+    """
+    Costs energy history under a tariff, one billing period at a time. Period
+    results are cached; refreshes of the hourly rollup invalidate only the
+    periods whose hours changed, so repeated queries over closed months are
+    served from memory and the open month is recomputed from at most ~744 rows.
+    """
+
+    def __init__(self, tariff: Tariff, load_hours: Callable):
+        self.tariff = tariff
+        self.load_hours = load_hours
+        self.cache: Dict[int, PeriodCost] = {}
+
+    def invalidate(self, touched: Optional[Tuple[int, int]]):
+        """Drop cached periods overlapping the (first, last) rollup hours that changed"""
+        if touched is None:
+            return
+        first, last = month_start(touched[0]), touched[1]
+        for start in [start for start in self.cache if first <= start <= last]:
+            del self.cache[start]
+
+    def clear(self):
+        self.cache.clear()
+
+    async def _period(self, start: int) -> PeriodCost:
+        period = self.cache.get(start)
+        if period is None:
+            import numpy as np
+
+            end = next_month_start(start)
+            rows = await self.load_hours(start, end)
+            hours = np.array([hour for hour, _ in rows], dtype=np.int64)
+            kwh = np.array([wh / 1000 for _, wh in rows], dtype=np.float64)
+            charges, bands = self.tariff.energy_charges(hours.tolist(), kwh)
+            period = self.cache[start] = PeriodCost(start, end, hours, kwh, charges, bands)
+        return period
+
+    async def period_rate(self, at: int) -> Optional[float]:
+        """Effective rate per kWh of the billing period containing `at`, from the cached period"""
+        return (await self._period(month_start(at))).rate
+
+    async def marginal_rate(self, at: int) -> float:
+        """Price per kWh used at `at`: the slab reached so far in its billing period, scaled by the hour's band"""
+        period = await self._period(month_start(at))
+        hour = datetime.fromtimestamp(at / 1000).hour
+        return self.tariff.marginal_rate(period.used_kwh) * self.tariff.hour_multiplier[hour]
+
+    async def cost(self, start: int, end: int) -> Dict:
+        """Energy, energy charge (by band) and prorated fixed charge for [start, end)"""
+        import numpy as np
+
+        tariff = self.tariff
+        periods = []
+        band_kwh = np.zeros(len(tariff.band_names))
+        band_charge = np.zeros(len(tariff.band_names))
+        period_start = month_start(start)
+        while period_start < end:
+            period = await self._period(period_start)
+            low, high = max(start, period.start), min(end, period.end)
+            selected = (period.hours >= local_hour_start(low)) & (period.hours < high)
+            kwh = float(period.kwh[selected].sum())
+            charge = float(period.charges[selected].sum())
+            band_kwh += np.bincount(period.bands[selected], weights=period.kwh[selected], minlength=len(band_kwh))
+            band_charge += np.bincount(period.bands[selected], weights=period.charges[selected],
+                                       minlength=len(band_charge))
+            fixed = tariff.fixed_charge * (high - low) / (period.end - period.start)
+            periods.append({
+                'period': datetime.fromtimestamp(period.start / 1000).strftime('%Y-%m'),
+                'from': from_epoch_ms(low),
+                'to': from_epoch_ms(high),
+                'energy_kwh': round(kwh, 3),
+                'energy_charge': round(charge, 2),
+                'fixed_charge': round(fixed, 2),
+                'total': round(charge + fixed, 2),
+                'complete': low == period.start and high == period.end,
+            })
+            period_start = period.end
+
+        energy_kwh = sum(p['energy_kwh'] for p in periods)
+        energy_charge = sum(p['energy_charge'] for p in periods)
+        fixed_charge = sum(p['fixed_charge'] for p in periods)
+        return {
+            'from': from_epoch_ms(start),
+            'to': from_epoch_ms(end),
+            'currency': tariff.currency,
+            'energy_kwh': round(energy_kwh, 3),
+            'energy_charge': round(energy_charge, 2),
+            'fixed_charge': round(fixed_charge, 2),
+            'total': round(energy_charge + fixed_charge, 2),
+            'effective_rate': round(energy_charge / energy_kwh, 3) if energy_kwh else None,
+            'by_band': {
+                name: {'energy_kwh': round(float(band_kwh[i]), 3), 'energy_charge': round(float(band_charge[i]), 2)}
+                for i, name in enumerate(tariff.band_names)
+            },
+            'periods': periods,
+        }
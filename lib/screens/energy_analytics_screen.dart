@@ -1,5 +1,8 @@
+import 'dart:async';
+
 import 'package:flutter/material.dart';
 import 'package:fl_chart/fl_chart.dart';
+import '../services/smart_home_api.dart';
 
 class EnergyAnalyticsScreen extends StatefulWidget {
   const EnergyAnalyticsScreen({super.key});
@@ -11,19 +14,84 @@ class EnergyAnalyticsScreen extends StatefulWidget {
 class _EnergyAnalyticsScreenState extends State<EnergyAnalyticsScreen>
     with TickerProviderStateMixin {
   late TabController _tabController;
+  final SmartHomeApiService _api = SmartHomeApiService();
+  Timer? _refreshTimer;
+
+  // Today's consumption per local hour, built from energy log rows. Only rows
+  // after [_energyCursor] (the last row id seen) are fetched on each refresh.
+  final List<double> _hourlyKwh = List.filled(24, 0.0);
+  int _energyCursor = 0;
+  DateTime? _lastReadingAt;
+  double _lastWatts = 0;
+  bool _hasLiveData = false;
+  bool _syncing = false;
+
+  // Readings further apart than this are a gap (server down), not usage
+  static const Duration _maxReadingGap = Duration(minutes: 1);
 
   @override
   void initState() {
     super.initState();
     _tabController = TabController(length: 3, vsync: this);
+    _syncEnergy();
+    _refreshTimer = Timer.periodic(
+      const Duration(seconds: 30),
+      (_) => _syncEnergy(),
+    );
   }
 
   @override
   void dispose() {
+    _refreshTimer?.cancel();
     _tabController.dispose();
     super.dispose();
   }
 
+  Future<void> _syncEnergy() async {
+    if (_syncing) return;
+    _syncing = true;
+    var added = false;
+    try {
+      while (mounted) {
+        final page = await _api.getEnergySince(_energyCursor);
+        final rows = page['rows'] as List;
+        for (final row in rows) {
+          _addReading(
+            DateTime.parse(row['timestamp'] as String),
+            (row['watts'] as num).toDouble(),
+          );
+        }
+        added = added || rows.isNotEmpty;
+        _energyCursor = page['cursor'] as int;
+        if (page['more'] != true) break;
+      }
+    } finally {
+      _syncing = false;
+    }
+    if (added && mounted) {
+      setState(() => _hasLiveData = true);
+    }
+  }
+
+  // Charges the interval since the previous reading at its power to the hour
+  // it started in; only intervals starting today are kept.
+  void _addReading(DateTime at, double watts) {
+    final previous = _lastReadingAt;
+    _lastReadingAt = at;
+    final power = _lastWatts;
+    _lastWatts = watts;
+    if (previous == null) return;
+
+    final now = DateTime.now();
+    final today = DateTime(now.year, now.month, now.day);
+    if (previous.isBefore(today)) return;
+    final elapsed = at.difference(previous);
+    if (elapsed.isNegative || elapsed > _maxReadingGap) return;
+    _hourlyKwh[previous.hour] += power * elapsed.inMilliseconds / 3600000 / 1000;
+  }
+
+  double get _todayKwh => _hourlyKwh.fold(0.0, (sum, kwh) => sum + kwh);
+
   @override
   Widget build(BuildContext context) {
     return Scaffold(
@@ -60,7 +128,12 @@ class _EnergyAnalyticsScreenState extends State<EnergyAnalyticsScreen>
       child: Column(
         crossAxisAlignment: CrossAxisAlignment.start,
         children: [
-          _buildEnergyOverview('Today', '18.4', 'kWh', Colors.blue),
+          _buildEnergyOverview(
+            'Today',
+            _hasLiveData ? _todayKwh.toStringAsFixed(1) : '18.4',
+            'kWh',
+            Colors.blue,
+          ),
           const SizedBox(height: 24),
           _buildHourlyChart(),
           const SizedBox(height: 24),
@@ -242,7 +315,7 @@ class _EnergyAnalyticsScreenState extends State<EnergyAnalyticsScreen>
             child: BarChart(
               BarChartData(
                 alignment: BarChartAlignment.spaceAround,
-                maxY: 3,
+                maxY: _hasLiveData ? null : 3,
                 barTouchData: BarTouchData(enabled: true),
                 titlesData: FlTitlesData(
                   bottomTitles: AxisTitles(
@@ -317,7 +390,10 @@ class _EnergyAnalyticsScreenState extends State<EnergyAnalyticsScreen>
   }
 
   double _getHourlyValue(int hour) {
-    // Simulate realistic hourly consumption pattern
+    if (_hasLiveData) {
+      return _hourlyKwh[hour] + _hourlyKwh[hour + 1];
+    }
+    // Simulate realistic hourly consumption pattern until the backend answers
     final values = [0.5, 0.3, 0.2, 0.2, 0.3, 0.8, 1.5, 2.2, 2.8, 2.5, 2.0, 1.8];
     return values[hour ~/ 2];
   }
@@ -32,6 +32,26 @@ class SmartHomeApiService {
     }
   }
 
+  // Parses free text on the server and applies every device action in one call
+  Future<Map<String, dynamic>> sendCommand(String text) async {
+    try {
+      final response = await http.post(
+        Uri.parse('$baseUrl/command'),
+        headers: {'Content-Type': 'application/json'},
+        body: jsonEncode({'text': text}),
+      );
+
+      if (response.statusCode == 200) {
+        return jsonDecode(response.body);
+      } else {
+        throw Exception('Failed to send command: ${response.statusCode}');
+      }
+    } catch (e) {
+      print('Error sending command: $e');
+      rethrow;
+    }
+  }
+
   Future<List<dynamic>> getDeviceStatus() async {
     try {
       final response = await http.get(Uri.parse('$baseUrl/device/status'));
@@ -63,6 +83,25 @@ class SmartHomeApiService {
     }
   }
 
+  // Returns energy log rows newer than [cursor] (the last row id seen) and the
+  // cursor to pass next time, so refreshes only transfer new rows.
+  Future<Map<String, dynamic>> getEnergySince(int cursor, {int limit = 1000}) async {
+    try {
+      final response = await http.get(
+        Uri.parse('$baseUrl/energy/since?cursor=$cursor&limit=$limit'),
+      );
+
+      if (response.statusCode == 200) {
+        return jsonDecode(response.body);
+      } else {
+        throw Exception('Failed to get energy updates');
+      }
+    } catch (e) {
+      print('Error getting energy updates: $e');
+      return {'rows': [], 'cursor': cursor, 'more': false};
+    }
+  }
+
   // AI Prediction APIs
   Future<Map<String, dynamic>> getAIPredictions() async {
     try {
@@ -435,6 +474,23 @@ class SmartHomeApiService {
     }
   }
 
+  Future<Map<String, dynamic>> getSensorsSince(int cursor, {int limit = 1000}) async {
+    try {
+      final response = await http.get(
+        Uri.parse('$baseUrl/sensors/since?cursor=$cursor&limit=$limit'),
+      );
+      
+      if (response.statusCode == 200) {
+        return jsonDecode(response.body);
+      } else {
+        throw Exception('Failed to get sensor updates');
+      }
+    } catch (e) {
+      print('Error getting sensor updates: $e');
+      return {'rows': [], 'cursor': cursor, 'more': false};
+    }
+  }
+
   Future<Map<String, dynamic>> getHardwareStatus() async {
     try {
       final response = await http.get(Uri.parse('$baseUrl/hardware/status'));